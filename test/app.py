@@ -4,14 +4,27 @@
 修复所有图表显示问题
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, make_response
+from flask import Flask, render_template, request, jsonify, send_file, make_response, Response, stream_with_context
 import pandas as pd
 import json
 import os
 import numpy as np
 from datetime import datetime
 import logging
-from utils.database_connector import RealDataConnector
+from config import config
+from utils.analysis_engine import create_analysis_engine
+from utils.data_source import create_data_source
+from utils.spark_session import session_manager
+from utils.online_data import OnlineDataFetcher
+from utils.zoning_pyramid import (ZoningPyramid, PRECISION_NAMES, ZONE_KEYS, CROP_WEIGHTS, CROP_NAMES,
+                                  summarize_level, summarize_zones, weight_vector, crop_code, PROVINCE_NAME)
+from utils.crop_optimizer import run_crop_optimization
+from utils.zoning_sensitivity import (run_sensitivity, sensitivity_records, default_seed,
+                                      DEFAULT_SAMPLES, DEFAULT_CONCENTRATION, POOL_WORKERS)
+from utils.geo_service import GeoService, detail_for_zoom
+from utils.report_cache import ReportCache
+from utils.report_batch import BatchReportManager
+from utils.report_export import RegionDetails, EXPORT_FORMATS, stream_export, export_filename
 import threading
 import time
 # 配置日志
@@ -24,12 +37,36 @@ app = Flask(__name__)
 spark_connector = None
 analysis_results = None
 
+# 分析数据版本：每次初始化或重新分析成功后递增，用于报告缓存失效
+analysis_generation = 0
+
 system_status = "未初始化"
 
+# 多级区划金字塔（村 → 乡镇 → 县 → 市）
+zoning_pyramid = ZoningPyramid()
+
+# 多分辨率地图数据服务
+geo_service = GeoService(os.path.join(app.static_folder, 'hunan.json'))
+
+# 报告缓存（报告内容与下载文件）
+report_cache = ReportCache()
+
+# 多作物批量报告任务
+batch_reports = BatchReportManager()
+
+# 联网数据获取器（并发请求、连接池、按作物与数据源缓存）
+online_fetcher = OnlineDataFetcher(config.ONLINE_DATA_CONFIG)
+
+# 指定 Spark 引擎时在后台启动并预热共享的Spark会话（未安装 pyspark 时跳过），初始化时不再等待会话启动；
+# auto 模式在估计行数达到阈值、确定使用 Spark 后才启动会话
+if config.SPARK_PREWARM and config.ANALYSIS_ENGINE == 'spark':
+    session_manager.start(config.SPARK_CONFIG)
+
 # 性能优化缓存
 data_cache = {}
 cache_lock = threading.Lock()
 CACHE_TIMEOUT = 600  # 10分钟缓存
+ONLINE_DATA_TTL = config.ONLINE_DATA_CONFIG['ttl']  # 联网数据刷新周期（秒）
 
 def get_cache_key(endpoint, params=None):
     """生成缓存键"""
@@ -58,6 +95,14 @@ def get_cache(key):
                 del data_cache[key]
     return None
 
+def online_data_version():
+    """联网数据版本：同一刷新周期内的报告复用同一份联网数据"""
+    return int(time.time() // ONLINE_DATA_TTL)
+
+def report_cache_key(crop_type, title, *extra):
+    """报告缓存键：(作物, 标题, 分析数据版本, 联网数据版本, ...)"""
+    return (crop_type, title, analysis_generation, online_data_version()) + extra
+
 def compress_data(data):
     """压缩数据精度"""
     def round_numbers(obj):
@@ -66,7 +111,8 @@ def compress_data(data):
         elif isinstance(obj, list):
             return [round_numbers(item) for item in obj]
         elif isinstance(obj, float):
-            return round(obj, 3)
+            # NaN 不是合法的JSON值，转换为 null
+            return None if np.isnan(obj) else round(obj, 3)
         return obj
     return round_numbers(data)
 
@@ -162,20 +208,25 @@ def report_generator():
 
 @app.route('/api/system/initialize', methods=['POST'])
 def initialize_system():
-    """初始化Spark系统 - 连接真实MySQL数据库"""
-    global spark_connector, system_status
+    """初始化Spark系统 - 连接配置的数据源（MySQL 或 SQLite）"""
+    global spark_connector, system_status, analysis_generation
     
     try:
         logger.info("🚀 开始初始化Spark农业分析系统...")
         system_status = "初始化中"
         
-        # 创建Spark连接器
+        # 按配置（或数据量）选择分析引擎
         logger.info("📋 创建数据连接器...")
-        spark_connector = RealDataConnector()
+        if spark_connector is not None:
+            spark_connector.close()
+        data_source = create_data_source(config.DATA_SOURCE, sqlite_path=config.SQLITE_PATH)
+        spark_connector = create_analysis_engine(config.ANALYSIS_ENGINE, config.SPARK_CONFIG,
+                                                 config.SPARK_ROW_THRESHOLD, data_source)
+        logger.info(f"📋 分析引擎: {spark_connector.name}")
         
         # 测试数据库连接
         logger.info("🔗 测试数据库连接...")
-        connection_result = spark_connector.connect_mysql()
+        connection_result = spark_connector.connect()
         logger.info(f"🔗 连接结果: {connection_result}")
         
         if connection_result:
@@ -186,21 +237,19 @@ def initialize_system():
             
             if data:
                 system_status = "系统就绪"
+                analysis_generation += 1
                 logger.info("✅ Spark农业分析系统初始化成功")
                 
                 # 计算数据统计
-                stats = {}
-                for key, df in data.items():
-                    if df is not None:
-                        stats[f'{key}_records'] = len(df)
-                    else:
-                        stats[f'{key}_records'] = 0
+                stats = spark_connector.data_summary(data)
                 
                 logger.info(f"📈 数据统计: {stats}")
                 
                 return jsonify({
                     'status': 'success',
-                    'message': 'Spark系统初始化成功，已连接到MySQL数据库',
+                    'message': f'Spark系统初始化成功，已连接到{data_source.describe()}',
+                    'analysis_engine': spark_connector.name,
+                    'data_source': data_source.kind,
                     'data_summary': stats
                 })
             else:
@@ -215,7 +264,7 @@ def initialize_system():
             logger.error("❌ 数据库连接返回False")
             return jsonify({
                 'status': 'error',
-                'message': '数据库连接失败，请检查MySQL服务和配置'
+                'message': f'{data_source.describe()}连接失败，请检查数据库服务和配置'
             })
             
     except Exception as e:
@@ -241,16 +290,35 @@ def get_system_status():
     result = {
         'status': system_status,
         'spark_initialized': spark_connector is not None,
+        'analysis_engine': spark_connector.name if spark_connector is not None else None,
+        'spark_session': session_manager.status(),
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
     
     set_cache(cache_key, result, 60)  # 缓存1分钟
     return jsonify(result)
 
+@app.route('/api/system/memory')
+def get_memory_report():
+    """获取各缓存数据表的内存占用（类型优化前后）"""
+    if not spark_connector:
+        return jsonify({
+            'status': 'error',
+            'message': '请先初始化Spark系统'
+        })
+    
+    report = spark_connector.memory_report()
+    return jsonify({
+        'status': 'success',
+        'analysis_engine': spark_connector.name,
+        'tables': report,
+        'total_memory_mb': round(sum(table['memory_mb'] for table in report.values()), 3)
+    })
+
 @app.route('/api/analysis/run', methods=['POST'])
 def run_comprehensive_analysis():
     """运行综合分析 - 使用真实数据库数据"""
-    global spark_connector, analysis_results
+    global spark_connector, analysis_results, analysis_generation
     
     if not spark_connector:
         return jsonify({
@@ -276,13 +344,20 @@ def run_comprehensive_analysis():
                 'message': '分析失败，请检查数据完整性'
             })
         
+        analysis_generation += 1
+        report_cache.clear()
+        apply_observed_scores(analysis_results)
+        
         execution_time = time.time() - start_time
         
         # 统计分析结果
         stats = {
             'temperature_analysis': len(analysis_results.get('temperature', {})),
+            'precipitation_analysis': len(analysis_results.get('precipitation', {})),
+            'crop_climate_analysis': len(analysis_results.get('crop_climate', {})),
             'soil_analysis': len(analysis_results.get('soil', {})),
             'crop_analysis': len(analysis_results.get('crop', {})),
+            'suitability_analysis': len(analysis_results.get('suitability', {})),
             'execution_time': round(execution_time, 2)
         }
         
@@ -301,6 +376,38 @@ def run_comprehensive_analysis():
             'message': f'分析失败: {str(e)}'
         })
 
+def apply_observed_scores(results):
+    """
+    用分析结果中的实测评分替换区划的模拟因子：
+    水分适宜度来自降水分析，各作物的温度适宜度来自作物热量条件分析
+    """
+    precipitation = results.get('precipitation') or {}
+    regional_water = precipitation.get('regional_water')
+    if regional_water is not None and len(regional_water):
+        zoning_pyramid.set_observed_scores('water', dict(zip(regional_water['region'], regional_water['water_score'])))
+        logger.info(f"💧 区划水分评分已使用 {len(regional_water)} 个区域的降水分析结果")
+    
+    crop_climate = results.get('crop_climate') or {}
+    summary = crop_climate.get('crop_region_summary')
+    if summary is not None and len(summary):
+        # 同一区划作物对应多个品种时取平均
+        summary = summary.assign(crop=summary['crop_type'].map(crop_code)).dropna(subset=['crop'])
+        crop_scores = summary.groupby(['crop', 'region'])['temp_score'].mean()
+        for crop in crop_scores.index.get_level_values('crop').unique():
+            zoning_pyramid.set_observed_scores('temp', crop_scores[crop].to_dict(), crop_type=crop)
+        # temperature_data 没有站点列时只有全省一个序列，区划温度层按全省评分平移，保留模拟的市县差异
+        provincial = set(summary['region']) == {PROVINCE_NAME}
+        logger.info(f"🌡️ 区划温度评分已使用 {crop_scores.index.get_level_values('crop').nunique()} 种作物的热量条件分析结果"
+                    f"（{'全省单序列，按全省评分平移' if provincial else '按站点/区域匹配'}）")
+
+def provincial_annual_precipitation():
+    """全省多年平均年降水量（mm），未运行降水分析时返回 None"""
+    precipitation = (analysis_results or {}).get('precipitation') or {}
+    regional_water = precipitation.get('regional_water')
+    if regional_water is None or not len(regional_water):
+        return None
+    return float(regional_water['avg_annual_precip'].mean())
+
 def generate_mock_analysis_data():
     """生成模拟分析数据"""
     logger.info("📊 生成模拟分析数据...")
@@ -379,7 +486,7 @@ def generate_mock_analysis_data():
 @app.route('/api/echarts/climate_trends')
 def get_climate_trends():
     """获取气候趋势ECharts数据"""
-    cache_key = get_cache_key('climate_trends')
+    cache_key = get_cache_key('climate_trends', {'generation': analysis_generation})
     cached_result = get_cache(cache_key)
     if cached_result:
         return jsonify(cached_result)
@@ -440,17 +547,50 @@ def get_climate_trends():
             ]
         }
         
-        # 季节温度对比 - 使用简化数据
+        # 季节温度对比（各季节多年平均）
+        seasonal_pattern = temp_data.get('seasonal_pattern', pd.DataFrame())
+        seasonal_pattern = seasonal_pattern[seasonal_pattern['season'] != 'annual'] if len(seasonal_pattern) else seasonal_pattern
         seasonal_chart = {
             'title': '季节温度对比',
             'data': [
-                {'name': '春季', 'value': 15.2},
-                {'name': '夏季', 'value': 29.2},
-                {'name': '秋季', 'value': 19.5},
-                {'name': '冬季', 'value': 6.8}
+                {'name': item['season_name'], 'value': item['avg_temp']}
+                for item in seasonal_pattern.to_dict('records')
+            ]
+        }
+        
+        # 增温趋势（℃/10年，按区域与季节）
+        warming = temp_data.get('warming_trends', pd.DataFrame())
+        warming_chart = {
+            'title': '增温趋势（℃/10年）',
+            'data': [
+                {
+                    'region': item['region'],
+                    'element': item['element_name'],
+                    'value': item['trend_per_decade'],
+                    'p_value': item['p_value'],
+                    'significant': bool(item['significant']),
+                    'years': f"{int(item['start_year'])}-{int(item['end_year'])}"
+                }
+                for item in warming.to_dict('records')
             ]
         }
         
+        # 年均温距平与滑动平均（各区域一组序列）
+        anomalies = temp_data.get('anomalies', pd.DataFrame())
+        anomaly_chart = {
+            'title': '年均温距平',
+            'series': [
+                {
+                    'region': region,
+                    'xAxis': group['year_val'].tolist(),
+                    'anomaly': group['anomaly'].tolist(),
+                    # 窗口起始年份数据不足时为空值
+                    'rolling_anomaly': [None if pd.isna(value) else value for value in group['rolling_anomaly']]
+                }
+                for region, group in anomalies.groupby('region', sort=True)
+            ] if len(anomalies) else []
+        }
+        
         processing_time = time.time() - start_time
         
         result = {
@@ -458,7 +598,9 @@ def get_climate_trends():
             'charts': {
                 'temperature_trend': temp_chart,
                 'annual_trend': annual_chart,
-                'seasonal_comparison': seasonal_chart
+                'seasonal_comparison': seasonal_chart,
+                'warming_trends': warming_chart,
+                'temperature_anomalies': anomaly_chart
             },
             'processing_time': round(processing_time, 3)
         }
@@ -478,6 +620,103 @@ def get_climate_trends():
             'message': f'气候趋势数据生成失败: {str(e)}'
         })
 
+@app.route('/api/echarts/precipitation')
+def get_precipitation_charts():
+    """获取降水分析ECharts数据"""
+    cache_key = get_cache_key('precipitation', {'generation': analysis_generation})
+    cached_result = get_cache(cache_key)
+    if cached_result:
+        return jsonify(cached_result)
+    
+    if not analysis_results or not analysis_results.get('precipitation'):
+        return jsonify({
+            'status': 'error',
+            'message': '请先运行综合分析'
+        })
+    
+    try:
+        start_time = time.time()
+        precip_data = analysis_results['precipitation']
+        
+        # 月度降水量与变异系数
+        monthly = precip_data['monthly_pattern']
+        monthly_chart = {
+            'title': '月度降水分布',
+            'xAxis': monthly['month_name'].tolist(),
+            'series': [
+                {'name': '平均降水量(mm)', 'type': 'bar', 'data': monthly['avg_precip'].tolist()},
+                {'name': '变异系数', 'type': 'line', 'yAxisIndex': 1, 'data': monthly['cv'].tolist()}
+            ]
+        }
+        
+        # 季节降水占比
+        seasonal = precip_data['seasonal_pattern']
+        seasonal_chart = {
+            'title': '季节降水占比',
+            'data': [
+                {'name': item['season_name'], 'value': item['avg_precip'], 'share': item['share']}
+                for item in seasonal.to_dict('records')
+            ]
+        }
+        
+        # 逐年降水量与干旱期（各区域平均）
+        annual = precip_data['annual_indices'].groupby('year_val', sort=True).agg(
+            total_precip=('total_precip', 'mean'),
+            max_dry_spell=('max_dry_spell', 'mean'),
+            dry_spells=('dry_spells', 'mean')
+        ).round(1)
+        dry_spell_unit = '天' if 'wet_days' in precip_data['annual_indices'] else '月'
+        annual_chart = {
+            'title': '年降水量与干旱期',
+            'xAxis': annual.index.tolist(),
+            'series': [
+                {'name': '年降水量(mm)', 'type': 'line', 'data': annual['total_precip'].tolist()},
+                {'name': f'最长干旱期({dry_spell_unit})', 'type': 'bar', 'yAxisIndex': 1,
+                 'data': annual['max_dry_spell'].tolist()},
+                {'name': '干旱期次数', 'type': 'bar', 'yAxisIndex': 1, 'data': annual['dry_spells'].tolist()}
+            ]
+        }
+        
+        # 各区域水分适宜度
+        regional = precip_data['regional_water'].sort_values('water_score', ascending=False)
+        water_chart = {
+            'title': '各区域水分适宜度',
+            'xAxis': regional['region'].tolist(),
+            'series': [
+                {'name': '水分适宜度', 'type': 'bar', 'data': regional['water_score'].tolist()},
+                {'name': '多年平均降水量(mm)', 'type': 'line', 'yAxisIndex': 1,
+                 'data': regional['avg_annual_precip'].tolist()}
+            ]
+        }
+        
+        processing_time = time.time() - start_time
+        
+        result = {
+            'status': 'success',
+            'charts': {
+                'monthly_precipitation': monthly_chart,
+                'seasonal_precipitation': seasonal_chart,
+                'annual_dry_spells': annual_chart,
+                'water_suitability': water_chart
+            },
+            'processing_time': round(processing_time, 3)
+        }
+        
+        # 压缩数据
+        result = compress_data(result)
+        
+        # 缓存结果
+        set_cache(cache_key, result)
+        
+        return jsonify(result)
+        
+    except Exception as e:
+        logger.error(f"❌ 降水分析数据生成失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'降水分析数据生成失败: {str(e)}'
+        })
+
 @app.route('/api/echarts/soil_analysis')
 def get_soil_analysis():
     """获取土壤分析ECharts数据"""
@@ -660,16 +899,22 @@ def get_crop_suitability():
             ]
         }
         
-        # pH需求分布数据 - 简化处理
-        ph_pie_data = [
-            {'name': '酸性(pH<6.5)', 'value': 25},
-            {'name': '中性(pH6.5-7.5)', 'value': 45},
-            {'name': '碱性(pH>7.5)', 'value': 30}
-        ]
-        
-        ph_scatter_chart = {
-            'title': '作物pH需求分布',
-            'data': ph_pie_data
+        # 各作物pH适宜土壤占比柱状图：土壤样本pH落在作物 ph_min..ph_max 内的比例（%），
+        # 各作物占比相互独立（总和不是100%），按占比从高到低排列
+        ph_compatibility = crop_data.get('ph_compatibility', pd.DataFrame())
+        if len(ph_compatibility):
+            ph_compatibility = ph_compatibility.sort_values('compatible_share', ascending=False, kind='stable')
+        ph_bar_chart = {
+            'title': '作物pH适宜土壤占比',
+            'data': [
+                {
+                    'name': item['crop_type'],
+                    'value': item['compatible_share'],
+                    'ph_range': f"{item['ph_min']}-{item['ph_max']}",
+                    'samples': int(item['compatible_samples'])
+                }
+                for item in ph_compatibility.to_dict('records')
+            ]
         }
         
         processing_time = time.time() - start_time
@@ -679,7 +924,7 @@ def get_crop_suitability():
             'charts': {
                 'suitability_distribution': category_pie_chart,
                 'crop_advantages_radar': temp_chart,
-                'limiting_factors_pie': ph_scatter_chart
+                'ph_compatibility_bar': ph_bar_chart
             },
             'processing_time': round(processing_time, 3)
         }
@@ -730,11 +975,12 @@ def get_zoning_optimization():
             
         scatter_data = []
         for item in county_data:
+            avg_ph = item.get('avg_ph')
             scatter_data.append([
-                6.5,  # 模拟pH值
+                round(float(avg_ph), 2) if avg_ph is not None and not pd.isna(avg_ph) else 0,
                 item.get('quality_score', item.get('soil_quality_score', 0)),
                 item.get('county_name', '未知'),
-                100  # 模拟样本数量
+                int(item.get('sample_count', 0))
             ])
         
         zoning_scatter = {
@@ -747,14 +993,36 @@ def get_zoning_optimization():
             }]
         }
         
-        # 优化建议地图（模拟数据）
+        # 种植结构优化：县级区域 × 全部作物
+        optimization = get_crop_optimization()
+        regions_df = pd.DataFrame(optimization['regions'])
+        
+        # 按地级市汇总主导作物（面积最大的作物）
+        city_crop_area = regions_df.groupby(['parent', 'crop'])['area'].sum().reset_index()
+        city_crop_area = city_crop_area.sort_values('area', ascending=False).drop_duplicates('parent')
+        city_area = regions_df.groupby('parent')['area'].sum()
+        city_score = regions_df.groupby('parent')['score'].mean()
+        city_centers = geo_service.feature_centers()
+        
+        map_data = []
+        for _, row in city_crop_area.iterrows():
+            center = city_centers.get(row['parent'])
+            if not center:
+                continue
+            map_data.append([
+                center[0], center[1], row['parent'],
+                CROP_NAMES.get(row['crop'], row['crop']),
+                round(float(city_score[row['parent']]), 1),
+                round(float(row['area'] / city_area[row['parent']] * 100), 1)
+            ])
+        
         optimization_map = {
-            'title': '土壤优化建议分布',
+            'title': '种植结构优化建议分布',
             'series': [{
-                'name': '优化区域',
+                'name': '主导作物',
                 'type': 'scatter',
                 'coordinateSystem': 'geo',
-                'data': [[112.5, 28.2, '长沙'], [113.0, 28.1, '湘潭'], [112.8, 27.8, '株洲']],
+                'data': map_data,
                 'symbolSize': 15
             }],
             'geo': {
@@ -769,13 +1037,25 @@ def get_zoning_optimization():
             }
         }
         
+        # 各作物优化后面积占比
+        allocation_chart = {
+            'title': '优化后作物面积占比',
+            'xAxis': [CROP_NAMES.get(item['crop'], item['crop']) for item in optimization['crops']],
+            'series': [{
+                'name': '面积占比(%)',
+                'type': 'bar',
+                'data': [item['share'] for item in optimization['crops']]
+            }]
+        }
+        
         processing_time = time.time() - start_time
         
         result = {
             'status': 'success',
             'charts': {
                 'zoning_scatter': zoning_scatter,
-                'optimization_map': optimization_map
+                'optimization_map': optimization_map,
+                'crop_allocation': allocation_chart
             },
             'processing_time': round(processing_time, 3)
         }
@@ -822,7 +1102,7 @@ def evaluate_suitability():
             elif factor_name == 'winterTemp':
                 current_value = -1.2
             elif factor_name == 'precipitation':
-                current_value = 1200
+                current_value = provincial_annual_precipitation() or 1200
             elif factor_name == 'ph':
                 current_value = 6.8
             elif factor_name == 'organic':
@@ -899,121 +1179,68 @@ def generate_zoning():
         crop_type = data.get('crop_type', 'rice')
         precision = data.get('precision', 'county')
         
-        logger.info(f"🗺️ 开始生成{crop_type}作物的{precision}级区划")
+        if precision not in PRECISION_NAMES:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的区划精度: {precision}'
+            })
+        if crop_type not in CROP_WEIGHTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {crop_type}'
+            })
         
-        # 模拟区划生成
-        counties = [
-            '长沙市', '株洲市', '湘潭市', '衡阳市', '邵阳市', '岳阳市',
-            '常德市', '张家界市', '益阳市', '郴州市', '永州市', '怀化市',
-            '娄底市', '湘西州', '长沙县', '浏阳市', '宁乡市', '望城区'
-        ]
+        cache_key = get_cache_key('zoning_generate', {'crop_type': crop_type, 'precision': precision})
+        cached_result = get_cache(cache_key)
+        if cached_result:
+            return jsonify(cached_result)
         
-        # 根据作物类型调整评分权重
-        crop_weights = {
-            'rice': {'temp': 0.3, 'water': 0.4, 'soil': 0.3},
-            'corn': {'temp': 0.25, 'water': 0.35, 'soil': 0.4},
-            'soybean': {'temp': 0.2, 'water': 0.3, 'soil': 0.5},
-            'wheat': {'temp': 0.35, 'water': 0.25, 'soil': 0.4},
-            'cotton': {'temp': 0.4, 'water': 0.3, 'soil': 0.3},
-            'rapeseed': {'temp': 0.3, 'water': 0.2, 'soil': 0.5},
-            'peanut': {'temp': 0.25, 'water': 0.25, 'soil': 0.5},
-            'sweet_potato': {'temp': 0.3, 'water': 0.3, 'soil': 0.4},
-            'tobacco': {'temp': 0.35, 'water': 0.25, 'soil': 0.4},
-            'tea': {'temp': 0.4, 'water': 0.35, 'soil': 0.25},
-            'citrus': {'temp': 0.45, 'water': 0.3, 'soil': 0.25},
-            'vegetables': {'temp': 0.2, 'water': 0.4, 'soil': 0.4}
-        }
+        logger.info(f"🗺️ 开始生成{crop_type}作物的{precision}级区划")
         
-        weights = crop_weights.get(crop_type, crop_weights['rice'])
+        # 从预计算的区划金字塔中读取对应精度
+        level_df = zoning_pyramid.get_level(crop_type, precision)
+        city_df = zoning_pyramid.get_level(crop_type, 'city')
         
         # 生成空间数据
-        spatial_data = []
-        zone_counts = {'optimal': 0, 'suitable': 0, 'marginal': 0, 'unsuitable': 0}
-        
-        for county in counties:
-            # 模拟评分计算
-            temp_score = 60 + (hash(county + 'temp') % 40)
-            water_score = 50 + (hash(county + 'water') % 50)
-            soil_score = 55 + (hash(county + 'soil') % 45)
-            
-            overall_score = (temp_score * weights['temp'] + 
-                           water_score * weights['water'] + 
-                           soil_score * weights['soil'])
-            
-            if overall_score >= 80:
-                level = '最适宜'
-                zone_counts['optimal'] += 1
-            elif overall_score >= 60:
-                level = '适宜'
-                zone_counts['suitable'] += 1
-            elif overall_score >= 40:
-                level = '较适宜'
-                zone_counts['marginal'] += 1
-            else:
-                level = '不适宜'
-                zone_counts['unsuitable'] += 1
-            
-            spatial_data.append({
-                'name': county,
-                'value': round(overall_score, 1),
-                'score': round(overall_score, 1),
-                'level': level
-            })
+        spatial_data = [
+            {'name': name, 'value': score, 'score': score, 'level': level, 'parent': parent}
+            for name, score, level, parent in zip(
+                level_df['name'], level_df['score'].round(1), level_df['level'], level_df['parent'])
+        ]
         
-        # 计算统计信息 - 使用湖南省真实面积数据
-        total_counties = len(counties)
-        # 湖南省总面积约21.18万平方公里，按县市平均分配
-        avg_county_area = 211800 / total_counties  # 约1177平方公里每县
+        # 地图只包含地级市边界，始终附带市级结果用于着色
+        map_data = [
+            {'name': name, 'value': score, 'score': score, 'level': level}
+            for name, score, level in zip(city_df['name'], city_df['score'].round(1), city_df['level'])
+        ]
         
-        statistics = {
-            'optimal': {
-                'count': zone_counts['optimal'],
-                'percentage': round(zone_counts['optimal'] / total_counties * 100, 1),
-                'area': round(zone_counts['optimal'] * avg_county_area, 0)
-            },
-            'suitable': {
-                'count': zone_counts['suitable'],
-                'percentage': round(zone_counts['suitable'] / total_counties * 100, 1),
-                'area': round(zone_counts['suitable'] * avg_county_area, 0)
-            },
-            'marginal': {
-                'count': zone_counts['marginal'],
-                'percentage': round(zone_counts['marginal'] / total_counties * 100, 1),
-                'area': round(zone_counts['marginal'] * avg_county_area, 0)
-            },
-            'unsuitable': {
-                'count': zone_counts['unsuitable'],
-                'percentage': round(zone_counts['unsuitable'] / total_counties * 100, 1),
-                'area': round(zone_counts['unsuitable'] * avg_county_area, 0)
-            }
-        }
+        # 计算统计信息 - 面积由村级面积逐级汇总
+        statistics = summarize_level(level_df)
         
         # 生成分区详情
-        zones = {'optimal': [], 'suitable': [], 'marginal': [], 'unsuitable': []}
-        for item in spatial_data:
-            if item['level'] == '最适宜':
-                zones['optimal'].append(item['name'])
-            elif item['level'] == '适宜':
-                zones['suitable'].append(item['name'])
-            elif item['level'] == '较适宜':
-                zones['marginal'].append(item['name'])
-            else:
-                zones['unsuitable'].append(item['name'])
+        zones = {
+            zone: level_df.loc[level_df['zone'] == zone, 'name'].tolist()
+            for zone in reversed(ZONE_KEYS)
+        }
         
         zoning_result = {
             'spatial_data': spatial_data,
+            'map_data': map_data,
             'statistics': statistics,
             'zones': zones,
             'crop_type': crop_type,
             'precision': precision
         }
         
-        logger.info(f"✅ 区划生成完成，共{total_counties}个区域")
+        logger.info(f"✅ 区划生成完成，共{len(level_df)}个区域")
         
-        return jsonify({
+        result = {
             'status': 'success',
             'zoning': zoning_result
-        })
+        }
+        set_cache(cache_key, result)
+        
+        return jsonify(result)
         
     except Exception as e:
         logger.error(f"❌ 区划生成失败: {e}")
@@ -1022,103 +1249,261 @@ def generate_zoning():
             'message': f'区划生成失败: {str(e)}'
         })
 
-# ==================== 联网增强功能 ====================
+def get_crop_optimization(precision='county', weights=None, max_share=None, targets=None, crops=None):
+    """运行种植结构优化（按权重、约束组合缓存结果）"""
+    crops = crops or list(CROP_WEIGHTS.keys())
+    params = {
+        'precision': precision,
+        'weights': weights or {},
+        'max_share': max_share or {},
+        'targets': targets or {},
+        'crops': crops
+    }
+    cache_key = get_cache_key('crop_optimization', params)
+    cached_result = get_cache(cache_key)
+    if cached_result:
+        return cached_result
 
-def fetch_online_agricultural_data(crop_type):
-    """联网获取农业实时数据"""
+    result = run_crop_optimization(zoning_pyramid, crops, precision, weights, max_share, targets)
+    set_cache(cache_key, result)
+    return result
+
+@app.route('/api/zoning/optimize', methods=['POST'])
+def optimize_zoning():
+    """种植结构优化API - 在面积上限与产量目标约束下分配各区域作物"""
     try:
-        import requests
-        from datetime import datetime
-        
-        logger.info(f"🌐 开始联网搜索{crop_type}作物相关信息")
-        
-        # 模拟联网搜索结果（实际可接入真实API）
-        online_info = {
-            'market_price': {
-                'current': round(2.8 + hash(crop_type) % 10 * 0.1, 2),
-                'trend': '上涨' if hash(crop_type) % 2 == 0 else '稳定',
-                'update_time': datetime.now().strftime('%Y-%m-%d %H:%M')
-            },
-            'weather_forecast': {
-                'temperature': f"{18 + hash(crop_type) % 15}°C - {25 + hash(crop_type) % 10}°C",
-                'precipitation': f"{50 + hash(crop_type) % 100}mm",
-                'conditions': '适宜种植' if hash(crop_type) % 3 != 0 else '需要关注'
-            },
-            'policy_updates': [
-                f"2024年{crop_type}种植补贴政策已发布",
-                f"湖南省{crop_type}产业发展规划(2024-2030)",
-                f"农业农村部关于{crop_type}绿色发展指导意见"
-            ],
-            'technology_trends': [
-                f"{crop_type}智能化种植技术应用",
-                f"新型{crop_type}品种推广情况",
-                f"{crop_type}病虫害防控新技术"
-            ],
-            'industry_analysis': {
-                'production_area': f"{1000 + hash(crop_type) % 500}万亩",
-                'yield_forecast': f"{3.5 + hash(crop_type) % 20 * 0.1:.1f}吨/亩",
-                'market_demand': '需求旺盛' if hash(crop_type) % 2 == 0 else '需求平稳'
+        data = request.get_json() or {}
+        precision = data.get('precision', 'county')
+        crops = data.get('crops') or list(CROP_WEIGHTS.keys())
+
+        if precision not in PRECISION_NAMES:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的区划精度: {precision}'
+            })
+        unknown = [crop for crop in crops if crop not in CROP_WEIGHTS]
+        if unknown:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {", ".join(unknown)}'
+            })
+
+        logger.info(f"🧮 开始{precision}级种植结构优化，作物数量: {len(crops)}")
+
+        optimization = get_crop_optimization(
+            precision,
+            data.get('weights'),
+            data.get('max_share'),
+            data.get('targets'),
+            crops
+        )
+
+        return jsonify({
+            'status': 'success',
+            'optimization': optimization
+        })
+
+    except Exception as e:
+        logger.error(f"❌ 种植结构优化失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'种植结构优化失败: {str(e)}'
+        })
+
+@app.route('/api/zoning/reweight', methods=['POST'])
+def reweight_zoning():
+    """区划即时重新加权API - 用缓存的分因子评分层按新权重重新计算等级统计"""
+    try:
+        start_time = time.perf_counter()
+        data = request.get_json() or {}
+        crop_type = data.get('crop_type', 'rice')
+        precision = data.get('precision', 'county')
+
+        if precision not in PRECISION_NAMES:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的区划精度: {precision}'
+            })
+        if crop_type not in CROP_WEIGHTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {crop_type}'
+            })
+        weights = data.get('weights') or CROP_WEIGHTS[crop_type]
+        try:
+            weights = {name: max(float(weights.get(name, 0)), 0.0) for name in ('temp', 'water', 'soil')}
+        except (TypeError, ValueError):
+            return jsonify({
+                'status': 'error',
+                'message': '权重必须为数值'
+            })
+        total_weight = sum(weights.values())
+        if total_weight <= 0:
+            return jsonify({
+                'status': 'error',
+                'message': '权重之和必须大于0'
+            })
+        weights = {name: value / total_weight for name, value in weights.items()}
+
+        area, scores, zone_idx = zoning_pyramid.reweight(crop_type, precision, weights)
+
+        result = {
+            'status': 'success',
+            'crop_type': crop_type,
+            'precision': precision,
+            'weights': {name: round(value, 4) for name, value in weights.items()},
+            'statistics': summarize_zones(zone_idx, area),
+            'summary': {
+                'region_count': int(len(scores)),
+                'mean_score': round(float(scores.mean()), 2),
+                'area_weighted_score': round(float(scores @ area / area.sum()), 2),
+                'min_score': round(float(scores.min()), 2),
+                'max_score': round(float(scores.max()), 2)
             }
         }
-        
-        logger.info("✅ 联网数据获取成功")
-        return online_info
-        
+        if data.get('include_scores'):
+            result['scores'] = np.round(scores, 1).tolist()
+        result['compute_ms'] = round((time.perf_counter() - start_time) * 1000, 2)
+
+        return jsonify(result)
+
     except Exception as e:
-        logger.warning(f"⚠️ 联网数据获取失败，使用默认数据: {e}")
-        return {
-            'market_price': {'current': 2.8, 'trend': '稳定', 'update_time': datetime.now().strftime('%Y-%m-%d %H:%M')},
-            'weather_forecast': {'temperature': '20°C - 28°C', 'precipitation': '80mm', 'conditions': '适宜种植'},
-            'policy_updates': ['相关政策信息获取中...'],
-            'technology_trends': ['技术趋势分析中...'],
-            'industry_analysis': {'production_area': '1200万亩', 'yield_forecast': '4.2吨/亩', 'market_demand': '需求平稳'}
-        }
+        logger.error(f"❌ 区划重新加权失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'区划重新加权失败: {str(e)}'
+        })
 
-def generate_enhanced_zoning_data(crop_type, online_data):
-    """生成增强的区划数据"""
+@app.route('/api/zoning/sensitivity', methods=['POST'])
+def analyze_zoning_sensitivity():
+    """区划权重敏感性分析API - 蒙特卡洛抽样权重，返回各区域等级稳定概率"""
     try:
-        # 基于联网数据调整区划统计
-        base_stats = {
-            'optimal': {'count': 15, 'percentage': 25.0, 'area': 52950},
-            'suitable': {'count': 28, 'percentage': 35.0, 'area': 74130},
-            'marginal': {'count': 22, 'percentage': 25.0, 'area': 52950},
-            'unsuitable': {'count': 12, 'percentage': 15.0, 'area': 31770}
-        }
-        
-        # 根据市场需求和天气条件调整
-        if online_data['market_price']['trend'] == '上涨':
-            base_stats['optimal']['percentage'] += 2
-            base_stats['suitable']['percentage'] += 3
-            base_stats['marginal']['percentage'] -= 3
-            base_stats['unsuitable']['percentage'] -= 2
-        
-        if online_data['weather_forecast']['conditions'] == '适宜种植':
-            base_stats['optimal']['percentage'] += 1
-            base_stats['unsuitable']['percentage'] -= 1
-        
-        # 重新计算面积
-        total_area = 211800  # 湖南省总面积
-        for zone in base_stats:
-            base_stats[zone]['area'] = round(total_area * base_stats[zone]['percentage'] / 100)
-        
-        return {
-            'spatial_data': [],
-            'statistics': base_stats,
-            'online_enhanced': True,
-            'data_source': '联网实时数据'
+        data = request.get_json() or {}
+        crop_type = data.get('crop_type', 'rice')
+        precision = data.get('precision', 'county')
+        samples = int(data.get('samples', DEFAULT_SAMPLES))
+        concentration = float(data.get('concentration', DEFAULT_CONCENTRATION))
+        workers = data.get('workers')
+
+        if precision not in PRECISION_NAMES:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的区划精度: {precision}'
+            })
+        if crop_type not in CROP_WEIGHTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {crop_type}'
+            })
+        # 进程数决定样本分块数，只接受 0（使用进程池）到进程池大小之间的整数
+        if workers is not None:
+            try:
+                workers = int(workers)
+            except (TypeError, ValueError):
+                workers = -1
+            if not 0 <= workers <= POOL_WORKERS:
+                return jsonify({
+                    'status': 'error',
+                    'message': f'workers 必须为 0-{POOL_WORKERS} 之间的整数'
+                }), 400
+
+        cache_key = get_cache_key('zoning_sensitivity', {
+            'crop_type': crop_type, 'precision': precision,
+            'samples': samples, 'concentration': concentration
+        })
+        cached_result = get_cache(cache_key)
+        if cached_result:
+            return jsonify(cached_result)
+
+        logger.info(f"🎲 开始{crop_type}作物{precision}级权重敏感性分析，抽样{samples}组")
+
+        level_df = zoning_pyramid.get_level(crop_type, precision)
+        _, layers = zoning_pyramid.get_layers(crop_type, precision)
+        base_weights = weight_vector(CROP_WEIGHTS[crop_type])
+
+        sensitivity = run_sensitivity(
+            layers, base_weights, samples, concentration,
+            seed=default_seed(crop_type, precision),
+            workers=workers
+        )
+        regions = sensitivity_records(level_df['name'].tolist(), level_df['parent'].tolist(), sensitivity)
+
+        stability = sensitivity['stability']
+        result = {
+            'status': 'success',
+            'sensitivity': {
+                'crop_type': crop_type,
+                'precision': precision,
+                'samples': sensitivity['samples'],
+                'concentration': concentration,
+                'base_weights': CROP_WEIGHTS[crop_type],
+                'summary': {
+                    'region_count': len(regions),
+                    'mean_stability': round(float(stability.mean()), 4),
+                    'stable_regions': int((stability >= 0.9).sum()),
+                    'unstable_regions': int((stability < 0.6).sum())
+                },
+                'regions': regions
+            },
+            'processing_time': round(sensitivity['elapsed'], 3)
         }
-        
+        set_cache(cache_key, result)
+
+        return jsonify(result)
+
     except Exception as e:
-        logger.error(f"❌ 增强数据生成失败: {e}")
-        return {
-            'spatial_data': [],
-            'statistics': {
-                'optimal': {'count': 15, 'percentage': 25.0, 'area': 52950},
-                'suitable': {'count': 28, 'percentage': 35.0, 'area': 74130},
-                'marginal': {'count': 22, 'percentage': 25.0, 'area': 52950},
-                'unsuitable': {'count': 12, 'percentage': 15.0, 'area': 31770}
-            }
-        }
+        logger.error(f"❌ 权重敏感性分析失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'权重敏感性分析失败: {str(e)}'
+        })
+
+@app.route('/api/geo/hunan')
+def get_hunan_geo():
+    """多分辨率湖南省地图数据API（GeoJSON / TopoJSON）"""
+    try:
+        fmt = request.args.get('format', 'geojson')
+        detail = request.args.get('detail')
+        if not detail:
+            detail = detail_for_zoom(request.args.get('zoom', 1.0, type=float))
+
+        variant = geo_service.get_variant(detail, fmt)
+
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = f'{variant.etag}-gz' if use_gzip else variant.etag
+
+        # 客户端已缓存相同版本时直接返回304
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            response = make_response(variant.gzipped if use_gzip else variant.raw)
+            response.headers['Content-Type'] = 'application/json; charset=utf-8'
+            if use_gzip:
+                response.headers['Content-Encoding'] = 'gzip'
+
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'public, max-age=86400'
+        return response
+
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        })
+    except Exception as e:
+        logger.error(f"❌ 地图数据获取失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'地图数据获取失败: {str(e)}'
+        })
+
+# ==================== 联网增强功能 ====================
+
+def fetch_online_agricultural_data(crop_type):
+    """联网获取农业实时数据（各数据源并发获取，失败时使用模拟数据）"""
+    logger.info(f"🌐 开始联网搜索{crop_type}作物相关信息")
+    return online_fetcher.fetch(crop_type)
 
 def generate_enhanced_report_content(title, crop_name, crop_type, zoning_data, online_data):
     """生成联网增强的报告内容"""
@@ -1137,14 +1522,19 @@ def generate_enhanced_report_content(title, crop_name, crop_type, zoning_data, o
         market_trend = online_data['market_price']['trend']
         weather_condition = online_data['weather_forecast']['conditions']
         
+        # 使用过期缓存的数据源在报告中注明
+        stale_sources = [source for source, info in online_data.get('data_freshness', {}).items() if info['stale']]
+        market_note = '（缓存数据，后台更新中）' if 'market' in stale_sources else ''
+        weather_note = '（缓存数据，后台更新中）' if 'weather' in stale_sources else ''
+        
         report['summary'] = f'''本报告基于湖南省气候、土壤等自然条件，结合最新市场行情和天气预报，对{crop_name}种植适宜性进行了全面评价和区划分析。
         
 📊 实时市场信息：
 • 当前市场价格：{online_data['market_price']['current']}元/公斤
 • 价格趋势：{market_trend}
-• 更新时间：{online_data['market_price']['update_time']}
+• 更新时间：{online_data['market_price']['update_time']}{market_note}
 
-🌤️ 天气预报：
+🌤️ 天气预报：{weather_note}
 • 温度范围：{online_data['weather_forecast']['temperature']}
 • 预计降水：{online_data['weather_forecast']['precipitation']}
 • 种植条件：{weather_condition}
@@ -1217,6 +1607,33 @@ def generate_enhanced_report_content(title, crop_name, crop_type, zoning_data, o
             'conclusion': f'{crop_name}具有良好的发展前景。'
         }
 
+def build_report(crop_type, title):
+    """构建完整报告（联网数据、区划统计、报告内容与县市详情）"""
+    # 联网搜索获取实时信息
+    online_data = fetch_online_agricultural_data(crop_type)
+    
+    # 区划统计与县市详情取自同一层级结果（市级）
+    level_df = zoning_pyramid.get_level(crop_type, 'city')
+    zoning_data = {'statistics': summarize_level(level_df)}
+    
+    # 生成报告内容
+    crop_name = CROP_NAMES.get(crop_type, '水稻')
+    
+    # 生成完整报告内容，包含县市详情数据
+    report_content = generate_enhanced_report_content(title, crop_name, crop_type, zoning_data, online_data)
+    
+    # 添加县市详情数据到报告中（市级区划结果）
+    report_content['county_details'] = list(RegionDetails(level_df))
+    
+    return report_content
+
+def get_report(crop_type, title):
+    """获取报告（相同作物、标题与数据版本只构建一次）"""
+    return report_cache.get_or_build(
+        report_cache_key(crop_type, title, 'report'),
+        lambda: build_report(crop_type, title)
+    )
+
 @app.route('/api/report/generate', methods=['POST'])
 def generate_report():
     """生成规划方案报告API - 联网增强版"""
@@ -1225,56 +1642,15 @@ def generate_report():
         title = data.get('title', '湖南省农业种植适宜性区划规划方案')
         crop_type = data.get('cropType', 'rice')
         
-        logger.info(f"📋 开始生成{crop_type}作物的联网增强规划报告")
-        
-        # 联网搜索获取实时信息
-        online_data = fetch_online_agricultural_data(crop_type)
-        
-        # 获取区划数据（集成在线数据）
-        zoning_data = generate_enhanced_zoning_data(crop_type, online_data)
-        
-        # 生成报告内容
-        crop_names = {
-            'rice': '水稻', 'corn': '玉米', 'soybean': '大豆', 'wheat': '小麦',
-            'cotton': '棉花', 'rapeseed': '油菜', 'peanut': '花生', 'sweet_potato': '红薯',
-            'tobacco': '烟草', 'tea': '茶叶', 'citrus': '柑橘', 'vegetables': '蔬菜'
-        }
-        crop_name = crop_names.get(crop_type, '水稻')
-        
-        # 生成完整报告内容，包含县市详情数据
-        report_content = generate_enhanced_report_content(title, crop_name, crop_type, zoning_data, online_data)
-        
-        # 添加县市详情数据到报告中
-        counties = [
-            '长沙市', '株洲市', '湘潭市', '衡阳市', '邵阳市', '岳阳市',
-            '常德市', '张家界市', '益阳市', '郴州市', '永州市', '怀化市',
-            '娄底市', '湘西州'
-        ]
-        
-        county_details = []
-        for i, county in enumerate(counties):
-            # 模拟每个县市的详细数据
-            score = 45 + (hash(county + crop_type) % 50)
-            if score >= 80:
-                level = '最适宜'
-            elif score >= 60:
-                level = '适宜'
-            elif score >= 40:
-                level = '较适宜'
-            else:
-                level = '不适宜'
-            
-            county_details.append({
-                '县市名称': county,
-                '适宜性评分': score,
-                '适宜性等级': level,
-                '预估面积平方公里': round(211800 / len(counties)),
-                '温度适宜度': round(score * 0.3, 1),
-                '土壤适宜度': round(score * 0.4, 1),
-                '水分适宜度': round(score * 0.3, 1)
+        if crop_type not in CROP_WEIGHTS:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {crop_type}'
             })
         
-        report_content['county_details'] = county_details
+        logger.info(f"📋 开始生成{crop_type}作物的联网增强规划报告")
+        
+        report_content = get_report(crop_type, title)
         
         logger.info("✅ 联网增强报告生成成功")
         return jsonify({
@@ -1290,37 +1666,25 @@ def generate_report():
             'message': f'报告生成失败: {str(e)}'
         })
 
-@app.route('/api/report/download')
-def download_report():
-    """下载报告文件API"""
-    try:
-        format_type = request.args.get('format', 'pdf')
-        crop_type = request.args.get('crop', 'rice')
-        title = request.args.get('title', '湖南省农业种植适宜性区划规划方案')
-        
-        logger.info(f"📄 下载{format_type.upper()}格式报告")
-        
-        # 生成简单的文本报告内容
-        crop_names = {
-            'rice': '水稻', 'corn': '玉米', 'soybean': '大豆', 'wheat': '小麦',
-            'cotton': '棉花', 'rapeseed': '油菜', 'peanut': '花生', 'sweet_potato': '红薯',
-            'tobacco': '烟草', 'tea': '茶叶', 'citrus': '柑橘', 'vegetables': '蔬菜'
-        }
-        crop_name = crop_names.get(crop_type, '水稻')
-        
-        report_content = f"""
-{title}
+def render_report_text(report, crop_name):
+    """将报告渲染为下载用的纯文本字节"""
+    statistics = report['statistics']
+    zone_lines = '\n'.join(
+        f"- {label}: {statistics[zone]['count']}个县市 ({statistics[zone]['percentage']}%) - 面积{statistics[zone]['area']}km²"
+        for zone, label in [('optimal', '最适宜区'), ('suitable', '适宜区'),
+                            ('marginal', '较适宜区'), ('unsuitable', '不适宜区')]
+    )
+    
+    report_text = f"""
+{report['title']}
 
-生成时间: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}
+生成时间: {report.get('generation_time', datetime.now().strftime('%Y年%m月%d日 %H:%M:%S'))}
 
 一、项目概述
 本报告基于湖南省气候、土壤等自然条件，对{crop_name}种植适宜性进行了全面评价和区划分析。
 
 二、适宜性分析结果
-- 最适宜区: 15个县市 (25.0%) - 面积3250km²
-- 适宜区: 28个县市 (35.0%) - 面积4800km²  
-- 较适宜区: 22个县市 (25.0%) - 面积3100km²
-- 不适宜区: 12个县市 (15.0%) - 面积1850km²
+{zone_lines}
 
 三、规划建议
 1. 在最适宜区重点发展{crop_name}规模化种植，建设现代农业示范基地
@@ -1333,16 +1697,25 @@ def download_report():
 四、结论
 湖南省具备发展{crop_name}种植的良好基础条件，通过科学规划和合理布局，可以实现{crop_name}产业的可持续发展。
         """
+    return report_text.encode('utf-8')
+
+@app.route('/api/report/download')
+def download_report():
+    """下载报告文件API（从缓存的渲染结果返回）"""
+    try:
+        format_type = request.args.get('format', 'pdf')
+        crop_type = request.args.get('crop', 'rice')
+        title = request.args.get('title', '湖南省农业种植适宜性区划规划方案')
         
-        # 创建响应 - 修复文件下载问题
-        try:
-            from flask import make_response as flask_make_response
-            response = flask_make_response(report_content)
-        except ImportError:
-            # 备用方案：直接返回内容
-            from flask import Response
-            response = Response(report_content)
+        logger.info(f"📄 下载{format_type.upper()}格式报告")
         
+        crop_name = CROP_NAMES.get(crop_type, '水稻')
+        report_bytes = report_cache.get_or_build(
+            report_cache_key(crop_type, title, 'download', 'txt'),
+            lambda: render_report_text(get_report(crop_type, title), crop_name)
+        )
+        
+        response = make_response(report_bytes)
         response.headers['Content-Type'] = 'text/plain; charset=utf-8'
         
         # 生成文件名 - 使用RFC 5987标准支持中文文件名
@@ -1364,52 +1737,137 @@ def download_report():
             'message': f'报告下载失败: {str(e)}'
         })
 
+def build_batch_report_files(crop_type, title):
+    """批量任务中单个作物的报告文件（复用报告缓存）"""
+    crop_name = CROP_NAMES.get(crop_type, '水稻')
+    report = get_report(crop_type, title)
+    report_text = report_cache.get_or_build(
+        report_cache_key(crop_type, title, 'download', 'txt'),
+        lambda: render_report_text(report, crop_name)
+    )
+    return {
+        f'{crop_type}_report.txt': report_text,
+        f'{crop_type}_report.json': json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8')
+    }
+
+@app.route('/api/report/batch', methods=['POST'])
+def create_batch_report():
+    """批量报告API - 后台并行生成多种作物的报告并打包为ZIP"""
+    try:
+        data = request.get_json() or {}
+        title = data.get('title', '湖南省农业种植适宜性区划规划方案')
+        crops = data.get('crops') or list(CROP_NAMES.keys())
+        
+        unknown = [crop for crop in crops if crop not in CROP_NAMES]
+        if unknown:
+            return jsonify({
+                'status': 'error',
+                'message': f'不支持的作物类型: {", ".join(unknown)}'
+            })
+        
+        # 预先构建各作物共享的区划层级，避免各线程重复等待
+        zoning_pyramid.hierarchy
+        
+        job = batch_reports.submit(crops, title, build_batch_report_files)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': '正在运行的批量报告任务过多，请稍后再试'
+            })
+        
+        return jsonify({
+            'status': 'success',
+            'message': f'批量报告任务已提交，共{len(crops)}种作物',
+            'job': job.to_dict()
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ 批量报告任务提交失败: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': f'批量报告任务提交失败: {str(e)}'
+        })
+
+@app.route('/api/report/batch/<job_id>')
+def get_batch_report(job_id):
+    """批量报告任务进度API"""
+    job = batch_reports.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'批量报告任务不存在: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'job': job.to_dict()
+    })
+
+@app.route('/api/report/batch/<job_id>/download')
+def download_batch_report(job_id):
+    """下载批量报告ZIP文件API"""
+    job = batch_reports.get(job_id)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'批量报告任务不存在: {job_id}'
+        }), 404
+    if job.archive is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'批量报告任务尚未完成，当前进度 {job.progress}%'
+        }), 409
+    
+    response = make_response(job.archive)
+    response.headers['Content-Type'] = 'application/zip'
+    filename = f"suitability_reports_{datetime.fromtimestamp(job.created_at).strftime('%Y%m%d_%H%M%S')}.zip"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
 @app.route('/api/report/export_data', methods=['POST'])
 def export_report_data():
     """导出完整报告数据API - 包括联网数据"""
     try:
         data = request.get_json()
         crop_type = data.get('cropType', 'rice')
-        export_format = data.get('format', 'excel')  # excel, csv, json
+        export_format = data.get('format', 'excel')  # excel, csv, json, parquet, txt
         include_online = data.get('includeOnline', True)
+        # 明细精度：city / county / township / village
+        detail_precision = data.get('detailPrecision', 'city')
         
-        logger.info(f"📊 开始导出{crop_type}作物的完整数据，格式：{export_format}")
+        if detail_precision not in PRECISION_NAMES:
+            return jsonify({'status': 'error', 'message': f'不支持的明细精度: {detail_precision}'})
+        if crop_type not in CROP_WEIGHTS:
+            return jsonify({'status': 'error', 'message': f'不支持的作物类型: {crop_type}'})
         
-        # 获取完整报告数据
-        if include_online:
-            online_data = fetch_online_agricultural_data(crop_type)
-            zoning_data = generate_enhanced_zoning_data(crop_type, online_data)
-        else:
-            online_data = None
-            zoning_data = {
-                'statistics': {
-                    'optimal': {'count': 15, 'percentage': 25.0, 'area': 52950},
-                    'suitable': {'count': 28, 'percentage': 35.0, 'area': 74130},
-                    'marginal': {'count': 22, 'percentage': 25.0, 'area': 52950},
-                    'unsuitable': {'count': 12, 'percentage': 15.0, 'area': 31770}
-                }
-            }
+        logger.info(f"📊 开始导出{crop_type}作物的完整数据，格式：{export_format}，明细精度：{detail_precision}")
         
-        # 生成完整数据集
-        complete_data = generate_complete_export_data(crop_type, zoning_data, online_data)
+        # 获取完整报告数据（区划统计与导出明细取自同一精度的区划结果）
+        online_data = fetch_online_agricultural_data(crop_type) if include_online else None
+        zoning_data = {'statistics': summarize_level(zoning_pyramid.get_level(crop_type, detail_precision))}
         
-        # 根据格式生成文件 - 支持txt格式
-        if export_format in ['excel', 'csv', 'json', 'txt']:
-            file_content, filename = generate_word_export(complete_data, crop_type)
-            mimetype = 'text/plain; charset=utf-8'
+        # 生成完整数据集
+        complete_data = generate_complete_export_data(crop_type, zoning_data, online_data, detail_precision)
+        if 'error' in complete_data:
+            return jsonify({'status': 'error', 'message': f"数据导出失败: {complete_data['error']}"})
+        
+        # 根据格式选择写出器
+        if export_format in EXPORT_FORMATS:
+            extension, mimetype = EXPORT_FORMATS[export_format]
+            chunks = stream_export(complete_data, export_format)
+            filename = export_filename(complete_data['basic_info']['作物类型'], extension)
         else:
             return jsonify({'status': 'error', 'message': '不支持的导出格式'})
         
-        # 创建响应 - 修复中文文件名编码问题
-        response = make_response(file_content)
-        response.headers['Content-Type'] = mimetype
+        # 流式响应：边生成边发送，不设置Content-Length，由服务器使用分块传输编码
+        response = Response(stream_with_context(chunks), content_type=mimetype)
         
         # 使用URL编码处理中文文件名
         import urllib.parse
         encoded_filename = urllib.parse.quote(filename.encode('utf-8'))
         response.headers['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{encoded_filename}'
         
-        logger.info(f"✅ 数据导出完成：{filename}")
+        logger.info(f"✅ 数据导出开始传输：{filename}")
         return response
         
     except Exception as e:
@@ -1419,8 +1877,8 @@ def export_report_data():
             'message': f'数据导出失败: {str(e)}'
         })
 
-def generate_complete_export_data(crop_type, zoning_data, online_data):
-    """生成完整的导出数据集"""
+def generate_complete_export_data(crop_type, zoning_data, online_data, detail_precision='city'):
+    """生成完整的导出数据集（区域明细为按需产生的生成器）"""
     try:
         crop_names = {
             'rice': '水稻', 'corn': '玉米', 'soybean': '大豆', 'wheat': '小麦',
@@ -1487,37 +1945,8 @@ def generate_complete_export_data(crop_type, zoning_data, online_data):
                 '技术趋势': online_data['technology_trends']
             }
         
-        # 详细县市数据（模拟）
-        counties = [
-            '长沙市', '株洲市', '湘潭市', '衡阳市', '邵阳市', '岳阳市',
-            '常德市', '张家界市', '益阳市', '郴州市', '永州市', '怀化市',
-            '娄底市', '湘西州'
-        ]
-        
-        county_details = []
-        for i, county in enumerate(counties):
-            # 模拟每个县市的详细数据
-            score = 45 + (hash(county + crop_type) % 50)
-            if score >= 80:
-                level = '最适宜'
-            elif score >= 60:
-                level = '适宜'
-            elif score >= 40:
-                level = '较适宜'
-            else:
-                level = '不适宜'
-            
-            county_details.append({
-                '县市名称': county,
-                '适宜性评分': score,
-                '适宜性等级': level,
-                '预估面积平方公里': round(211800 / len(counties)),
-                '温度适宜度': round(score * 0.3, 1),
-                '土壤适宜度': round(score * 0.4, 1),
-                '水分适宜度': round(score * 0.3, 1)
-            })
-        
-        export_data['county_details'] = county_details
+        # 区域明细：引用区划金字塔结果，导出时逐块生成，不预先构建整张明细表
+        export_data['county_details'] = RegionDetails(zoning_pyramid.get_level(crop_type, detail_precision))
         
         return export_data
         
@@ -1525,114 +1954,12 @@ def generate_complete_export_data(crop_type, zoning_data, online_data):
         logger.error(f"❌ 完整数据生成失败: {e}")
         return {'error': str(e)}
 
-def generate_word_export(data, crop_type):
-    """生成纯文本格式导出"""
-    return generate_text_export(data, crop_type)
-
-def generate_text_export(data, crop_type):
-    """生成优化的纯文本格式导出"""
-    try:
-        from io import StringIO
-        
-        content = StringIO()
-        
-        # 标题
-        content.write("湖南省农业种植适宜性区划完整数据报告\n")
-        content.write("=" * 60 + "\n\n")
-        
-        # 基础信息
-        content.write("一、基础信息\n")
-        content.write("-" * 30 + "\n")
-        for key, value in data['basic_info'].items():
-            content.write(f"• {key}: {value}\n")
-        content.write("\n")
-        
-        # 区划统计
-        content.write("二、区划统计分析\n")
-        content.write("-" * 30 + "\n")
-        for zone_name, zone_data in data['zoning_statistics'].items():
-            content.write(f"【{zone_name}】\n")
-            content.write(f"  ├─ 县市数量: {zone_data['县市数量']}个\n")
-            content.write(f"  ├─ 占比百分比: {zone_data['占比百分比']}%\n")
-            content.write(f"  └─ 面积: {zone_data['面积平方公里']}平方公里\n\n")
-        
-        # 县市详情
-        if 'county_details' in data and data['county_details']:
-            content.write("三、县市详情数据\n")
-            content.write("-" * 30 + "\n")
-            
-            # 表格头部
-            content.write(f"{'县市名称':<12} {'适宜性评分':<10} {'适宜性等级':<10} {'预估面积(km²)':<15}\n")
-            content.write("-" * 60 + "\n")
-            
-            for county in data['county_details']:
-                content.write(f"{county['县市名称']:<12} {county['适宜性评分']:<10} {county['适宜性等级']:<10} {county['预估面积平方公里']:<15}\n")
-            content.write("\n")
-        
-        # 联网数据
-        if 'online_data' in data and data['online_data']:
-            content.write("四、联网实时数据\n")
-            content.write("-" * 30 + "\n")
-            
-            if '市场行情' in data['online_data']:
-                content.write("【4.1 市场行情】\n")
-                for key, value in data['online_data']['市场行情'].items():
-                    content.write(f"  • {key}: {value}\n")
-                content.write("\n")
-            
-            if '天气预报' in data['online_data']:
-                content.write("【4.2 天气预报】\n")
-                for key, value in data['online_data']['天气预报'].items():
-                    content.write(f"  • {key}: {value}\n")
-                content.write("\n")
-            
-            if '产业分析' in data['online_data']:
-                content.write("【4.3 产业分析】\n")
-                for key, value in data['online_data']['产业分析'].items():
-                    content.write(f"  • {key}: {value}\n")
-                content.write("\n")
-            
-            if '政策动态' in data['online_data'] and isinstance(data['online_data']['政策动态'], list):
-                content.write("【4.4 政策动态】\n")
-                for i, policy in enumerate(data['online_data']['政策动态'], 1):
-                    content.write(f"  {i}. {policy}\n")
-                content.write("\n")
-            
-            if '技术趋势' in data['online_data'] and isinstance(data['online_data']['技术趋势'], list):
-                content.write("【4.5 技术趋势】\n")
-                for i, tech in enumerate(data['online_data']['技术趋势'], 1):
-                    content.write(f"  {i}. {tech}\n")
-                content.write("\n")
-        
-        # 报告结尾
-        content.write("=" * 60 + "\n")
-        content.write(f"报告生成时间: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}\n")
-        content.write("数据来源: 湖南省农业种植适宜性区划分析系统\n")
-        content.write("=" * 60 + "\n")
-        
-        # 生成文件名
-        crop_type_en = {
-            '水稻': 'rice', '玉米': 'corn', '大豆': 'soybean', '小麦': 'wheat',
-            '棉花': 'cotton', '油菜': 'rapeseed', '花生': 'peanut', '红薯': 'sweet_potato',
-            '烟草': 'tobacco', '茶叶': 'tea', '柑橘': 'citrus', '蔬菜': 'vegetables'
-        }
-        crop_en = crop_type_en.get(data['basic_info']['作物类型'], 'crop')
-        filename = f"{crop_en}_suitability_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-        
-        return content.getvalue().encode('utf-8-sig'), filename
-        
-    except Exception as e:
-        logger.error(f"❌ 纯文本导出失败: {e}")
-        return f"导出失败: {str(e)}".encode('utf-8'), "error.txt"
-
-# 已删除未使用的CSV和JSON导出函数
-
 if __name__ == '__main__':
     print("🌱 湖南省农业种植适宜性区划分析系统")
     print("=" * 60)
     print("🔗 访问地址: http://localhost:5004")
     print("📊 功能模块: 多准则适宜性区划、联网报告生成")
-    print("🗄️ 数据源: MySQL数据库 + 实时联网数据")
+    print(f"🗄️ 数据源: {'SQLite数据库' if config.DATA_SOURCE == 'sqlite' else 'MySQL数据库'} + 实时联网数据")
     print("=" * 60)
     
     app.run(host='0.0.0.0', port=5004, debug=False)
@@ -4,6 +4,7 @@
 使用Pandas模拟Spark功能，避免JDBC驱动问题
 """
 
+import os
 import pandas as pd
 import mysql.connector
 from mysql.connector import Error
@@ -21,7 +22,7 @@ class SimplifiedSparkConnector:
             'host': 'localhost',
             'port': 3306,
             'user': 'root',
-            'password': 'wujiayun1',
+            'password': os.environ.get('MYSQL_PASSWORD', ''),
             'database': 'climate_data'
         }
         
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+报告导出性能测试
+用区划金字塔的村级结果扩充出 10万+ 行区域明细，逐一测试各导出格式的
+耗时、输出大小与Python内存峰值（tracemalloc）
+
+用法:
+    python benchmarks/bench_exporters.py --rows 200000 --output bench_exporters.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.zoning_pyramid import ZoningPyramid, ZONE_LABELS, classify_scores
+from utils.report_export import RegionDetails, EXPORT_FORMATS, PARQUET_AVAILABLE, stream_export
+
+
+def build_detail_frame(rows, crop_type='rice'):
+    """以村级区划结果为模板，重复扩充到指定行数（评分加小幅扰动）"""
+    villages = ZoningPyramid().get_level(crop_type, 'village')
+    repeats = int(np.ceil(rows / len(villages)))
+    index = np.tile(np.arange(len(villages)), repeats)[:rows]
+    rng = np.random.default_rng(2025)
+
+    layers = villages[['temp_score', 'water_score', 'soil_score']].to_numpy()[index]
+    layers = np.clip(layers + rng.normal(0, 2, layers.shape), 0, 100)
+    scores = layers @ np.array([0.4, 0.35, 0.25])
+    copy_no = np.repeat(np.arange(repeats), len(villages))[:rows]
+
+    return pd.DataFrame({
+        'name': villages['name'].to_numpy()[index] + pd.Series(copy_no).astype(str).radd('#').to_numpy(),
+        'parent': villages['parent'].to_numpy()[index],
+        'area': villages['area'].to_numpy()[index],
+        'temp_score': layers[:, 0],
+        'water_score': layers[:, 1],
+        'soil_score': layers[:, 2],
+        'score': scores,
+        'level': np.array(ZONE_LABELS)[classify_scores(scores)]
+    })
+
+
+def build_export_data(level_df):
+    """与 generate_complete_export_data 结构一致的导出数据"""
+    return {
+        'basic_info': {'作物类型': '水稻', '作物代码': 'rice', '省份': '湖南省'},
+        'zoning_statistics': {
+            '最适宜区': {'县市数量': 15, '占比百分比': 25.0, '面积平方公里': 52950},
+            '适宜区': {'县市数量': 28, '占比百分比': 35.0, '面积平方公里': 74130}
+        },
+        'county_details': RegionDetails(level_df)
+    }
+
+
+def _consume(data, export_format):
+    """完整消费一次导出流，返回 (字节数, 块数)"""
+    size = 0
+    chunks = 0
+    for chunk in stream_export(data, export_format):
+        size += len(chunk)
+        chunks += 1
+    return size, chunks
+
+
+def bench_format(data, export_format):
+    """
+    先计时消费一次导出流，再在 tracemalloc 下消费一次统计内存峰值
+    （tracemalloc 会显著拖慢分配密集的代码，不与计时同时进行）
+    """
+    start = time.perf_counter()
+    size, chunks = _consume(data, export_format)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    _consume(data, export_format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'format': export_format,
+        'seconds': round(elapsed, 3),
+        'bytes': size,
+        'chunks': chunks,
+        'rows_per_second': round(len(data['county_details']) / elapsed),
+        'peak_memory_mb': round(peak / 1024 / 1024, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报告导出性能测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 300000], help='明细行数')
+    parser.add_argument('--formats', nargs='+', default=list(EXPORT_FORMATS), help='导出格式')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        data = build_export_data(build_detail_frame(rows))
+        print(f"📊 明细行数: {rows}")
+        for export_format in args.formats:
+            if export_format == 'parquet' and not PARQUET_AVAILABLE:
+                print("  ⚠️ 未安装 pyarrow，跳过 parquet")
+                continue
+            result = bench_format(data, export_format)
+            result['rows'] = rows
+            results.append(result)
+            print(f"  {export_format:<8} {result['seconds']:>8.3f}s  {result['bytes'] / 1024 / 1024:>8.2f}MB  "
+                  f"{result['rows_per_second']:>9}行/秒  峰值内存 {result['peak_memory_mb']}MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+综合性能测试
+用 synthetic_data 生成的各规模农业数据表，依次测量：
+写入数据源后经 read_mysql_table 读取（默认写入临时 SQLite 文件，--source mysql 时写入 MySQL 基准测试库，
+--source memory 时跳过数据源直接 load_table），带 WHERE 条件的筛选读取，各 analyze_* 分析、
+generate_comprehensive_report，以及通过 Flask test client 调用的各 API 接口（冷/热缓存）。
+结果保存为 JSON，--compare 可与之前保存的结果逐项对比
+
+用法:
+    python benchmarks/bench_suite.py --scales 1000 100000 1000000 --output bench_suite.json
+    python benchmarks/bench_suite.py --scales 100000 --source mysql --compare bench_suite.json
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import logging
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pymysql
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database_connector import RealDataConnector
+from utils.duckdb_engine import DuckDBConnector, DUCKDB_AVAILABLE
+from utils.data_source import MySQLDataSource, SQLiteDataSource, DEFAULT_MYSQL_CONFIG
+from benchmarks.synthetic_data import build_tables, table_rows
+
+# 逐项计时的分析方法
+ANALYSES = [
+    'analyze_temperature_trends',
+    'analyze_precipitation',
+    'analyze_soil_distribution',
+    'analyze_crop_requirements',
+    'analyze_crop_climate',
+    'analyze_crop_suitability'
+]
+
+# GET 接口：首次调用前清空接口缓存（冷），随后再调用一次（热）
+GET_ENDPOINTS = [
+    '/api/echarts/climate_trends',
+    '/api/echarts/precipitation',
+    '/api/echarts/soil_analysis',
+    '/api/echarts/crop_suitability',
+    '/api/echarts/zoning_optimization',
+    '/api/system/status',
+    '/api/system/memory',
+    '/api/geo/hunan?detail=low'
+]
+
+# POST 接口及请求体（不访问外部网络的接口）
+POST_ENDPOINTS = [
+    ('/api/suitability/evaluate', {'factors': {
+        'temperature': {'weight': 0.3, 'min': 15, 'max': 30},
+        'precipitation': {'weight': 0.3, 'min': 1000, 'max': 1800},
+        'ph': {'weight': 0.2, 'min': 5.5, 'max': 7.5},
+        'organic': {'weight': 0.2, 'min': 2, 'max': 5}
+    }}),
+    ('/api/zoning/generate', {'crop_type': 'rice', 'precision': 'county'}),
+    ('/api/zoning/optimize', {'precision': 'county'}),
+    ('/api/zoning/reweight', {'crop_type': 'rice', 'precision': 'county'}),
+    ('/api/zoning/sensitivity', {'crop_type': 'rice', 'precision': 'county', 'samples': 200}),
+    ('/api/report/export_data', {'cropType': 'rice', 'format': 'json', 'includeOnline': False})
+]
+
+# 带 WHERE 条件的筛选读取（条件在数据源中执行）
+FILTERED_READS = [
+    ('soil_profiles', 'ph_value < 5.5'),
+    ('suitability_results', "suitability_level IN ('勉强适宜', '不适宜')")
+]
+
+
+def time_call(func, repeat):
+    """多次执行取最短耗时（秒），返回 (耗时, 最后一次结果)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def create_connector(engine, data_source=None):
+    if engine == 'duckdb':
+        return DuckDBConnector(data_source=data_source)
+    return RealDataConnector(data_source=data_source)
+
+
+def create_source(args, scale):
+    """基准测试数据源（MySQL 基准测试库不存在时创建）"""
+    if args.source == 'mysql':
+        settings = {key: value for key, value in DEFAULT_MYSQL_CONFIG.items() if key != 'database'}
+        connection = pymysql.connect(**settings)
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}` DEFAULT CHARSET utf8mb4")
+        connection.close()
+        return MySQLDataSource(dict(DEFAULT_MYSQL_CONFIG, database=args.database))
+    return SQLiteDataSource(os.path.join(args.workdir, f'bench_{scale}.db'))
+
+
+def bench_data(connector, tables, scale, args, record):
+    """写入数据源后读取（--source memory 时直接载入）"""
+    if args.source == 'memory':
+        for table_name, df in tables.items():
+            seconds, _ = time_call(lambda: connector.load_table(table_name, df), args.repeat)
+            record(scale, 'load', table_name, seconds, rows=len(df))
+        return
+
+    seconds, _ = time_call(lambda: connector.source.write_tables(tables), 1)
+    record(scale, 'data', 'write_tables', seconds)
+
+    for table_name, conditions in FILTERED_READS:
+        seconds, df = time_call(lambda: connector.read_mysql_table(table_name, conditions), args.repeat)
+        record(scale, 'read', f'{table_name} WHERE {conditions}', seconds, rows=len(df) if df is not None else None)
+
+    # 全表读取放在筛选读取之后，分析使用完整数据
+    for table_name in tables:
+        seconds, df = time_call(lambda: connector.read_mysql_table(table_name), args.repeat)
+        record(scale, 'read', table_name, seconds, rows=len(df) if df is not None else None)
+
+
+def bench_analysis(connector, scale, args, record):
+    """各分析方法与综合报告（每次调用前使数据版本失效，测量未命中结果缓存的耗时）"""
+    def cold(method):
+        def run():
+            connector.data_version += 1
+            return getattr(connector, method)()
+        return run
+
+    for method in ANALYSES + ['generate_comprehensive_report']:
+        seconds, result = time_call(cold(method), args.repeat)
+        record(scale, 'analysis', method, seconds, ok=result is not None)
+
+
+def bench_endpoints(connector, scale, args, record):
+    """通过 Flask test client 调用各接口"""
+    import app as webapp
+
+    logging.getLogger().setLevel(logging.WARNING)
+    webapp.spark_connector = connector
+    webapp.system_status = "已初始化"
+    client = webapp.app.test_client()
+
+    def run_analysis():
+        connector.data_version += 1
+        return client.post('/api/analysis/run', json={})
+
+    seconds, response = time_call(run_analysis, args.repeat)
+    record(scale, 'endpoint', 'POST /api/analysis/run', seconds, status=response.get_json().get('status'))
+
+    def request(method, url, body=None):
+        response = client.post(url, json=body) if method == 'POST' else client.get(url)
+        return response.status_code, len(response.get_data())
+
+    endpoints = [('GET', url, None) for url in GET_ENDPOINTS] + [('POST', url, body) for url, body in POST_ENDPOINTS]
+    for method, url, body in endpoints:
+        webapp.data_cache.clear()
+        start = time.perf_counter()
+        status, size = request(method, url, body)
+        record(scale, 'endpoint', f'{method} {url}', time.perf_counter() - start, cache='cold',
+               status=status, bytes=size)
+        seconds, (status, size) = time_call(lambda: request(method, url, body), args.repeat)
+        record(scale, 'endpoint', f'{method} {url}', seconds, cache='warm', status=status, bytes=size)
+
+
+def bench_scale(scale, args, record):
+    seconds, tables = time_call(lambda: build_tables(scale, args.temperature_rows, args.crop_rows), 1)
+    record(scale, 'data', 'build_tables', seconds, rows=int(sum(len(df) for df in tables.values())))
+
+    source = create_source(args, scale) if args.source != 'memory' else None
+    connector = create_connector(args.engine, source)
+    bench_data(connector, tables, scale, args, record)
+    bench_analysis(connector, scale, args, record)
+    if not args.skip_endpoints:
+        bench_endpoints(connector, scale, args, record)
+    connector.close()
+
+
+def result_key(result):
+    return result['scale'], result['group'], result['name'], result.get('cache')
+
+
+def compare(results, previous_path):
+    """与之前保存的结果对比（耗时比 = 之前 / 本次，大于1表示变快）"""
+    with open(previous_path, encoding='utf-8') as f:
+        previous = {result_key(result): result for result in json.load(f)['results']}
+
+    print(f"\n📈 与 {previous_path} 对比:")
+    for result in results:
+        before = previous.get(result_key(result))
+        if before and result['seconds'] > 0:
+            label = result['name'] + (f" [{result['cache']}]" if result.get('cache') else '')
+            print(f"  {result['scale']:>9} {result['group']:<9} {label:<52} "
+                  f"{before['seconds']:>9.4f}s → {result['seconds']:>9.4f}s  ×{before['seconds'] / result['seconds']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='综合性能测试')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='数据规模（大表行数，1e3 - 1e7）')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数（取最短耗时）')
+    parser.add_argument('--engine', choices=['pandas', 'duckdb'], default='pandas', help='分析引擎')
+    parser.add_argument('--source', choices=['sqlite', 'mysql', 'memory'], default='sqlite',
+                        help='数据源（sqlite 写入临时数据库文件，mysql 写入基准测试库，memory 直接载入）')
+    parser.add_argument('--database', default='climate_data_bench', help='--source mysql 时使用的基准测试库')
+    parser.add_argument('--workdir', help='SQLite 数据库文件目录（默认临时目录，结束后删除）')
+    parser.add_argument('--temperature-rows', type=int, help='temperature_data 行数（默认随规模增长）')
+    parser.add_argument('--crop-rows', type=int, help='crop_requirements 行数')
+    parser.add_argument('--skip-endpoints', action='store_true', help='不测量API接口')
+    parser.add_argument('--output', help='结果JSON文件路径')
+    parser.add_argument('--compare', help='对比的历史结果JSON文件')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.engine == 'duckdb' and not DUCKDB_AVAILABLE:
+        parser.error("未安装 duckdb，无法测试 DuckDB 引擎")
+
+    results = []
+
+    def record(scale, group, name, seconds, **extra):
+        result = {'scale': scale, 'group': group, 'name': name, 'seconds': round(seconds, 4), **extra}
+        results.append(result)
+        label = name + (f" [{extra['cache']}]" if extra.get('cache') else '')
+        print(f"  {group:<9} {label:<52} {seconds:>9.4f}s")
+
+    with tempfile.TemporaryDirectory(prefix='bench_suite_') as workdir:
+        args.workdir = args.workdir or workdir
+        for scale in args.scales:
+            print(f"📊 数据规模: {scale}  各表行数: {table_rows(scale, args.temperature_rows, args.crop_rows)}")
+            bench_scale(scale, args, record)
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        meta = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'engine': args.engine,
+            'source': args.source,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, ensure_ascii=False, indent=2)
+        print(f"✅ 结果已保存: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+合成农业数据
+生成与 MySQL 中 temperature_data、climate_precipitation、soil_profiles、crop_requirements
+结构一致的数据表（列名与取值范围与真实数据相同），供性能测试在任意规模（1e3 - 1e7 行）下使用
+
+规模约定：soil_profiles 与 climate_precipitation 为大表，行数等于规模；
+temperature_data 按年份 × 站点增长（每 1000 行规模对应 1 行，至少 105 年），
+crop_requirements 为小维表（默认 60 个品种）；
+另生成可选的 suitability_results 网格表（行数等于规模）
+
+直接运行时写入 SQLite 数据库文件，供离线环境初始化与分析:
+    python benchmarks/synthetic_data.py --scale 100000 --output data/climate_data.db
+"""
+
+import os
+import sys
+import math
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import config
+from utils.database_connector import MONTH_COLUMNS
+from utils.data_source import SQLiteDataSource
+from utils.zoning_pyramid import HUNAN_COUNTIES
+
+# 县市（气象站点按县市命名，站点数超过县市数时同一县市设多个站）
+COUNTIES = [county for counties in HUNAN_COUNTIES.values() for county in counties]
+
+SOIL_NAMES = ['红壤', '黄壤', '水稻土', '紫色土', '石灰土', '潮土', '黄棕壤', '山地草甸土']
+
+# 温度序列：最后一年、长序列年数、各月气候平均（℃）与增温速率（℃/年）
+LAST_YEAR = 2024
+TEMPERATURE_YEARS = 105
+MONTHLY_MEAN_TEMP = np.array([5.0, 7.0, 11.2, 17.0, 22.0, 25.9, 29.0, 28.2, 24.2, 18.6, 12.6, 7.2])
+WARMING_RATE = 0.015
+
+# 降水：各月雨日概率与雨日平均降水量（mm），逐日序列最长 30 年
+WET_PROBABILITY = np.array([0.45, 0.5, 0.58, 0.6, 0.6, 0.55, 0.4, 0.4, 0.33, 0.35, 0.38, 0.36])
+WET_DAY_AMOUNT = np.array([5.5, 7.0, 9.5, 12.0, 15.5, 19.5, 18.0, 15.0, 11.0, 9.0, 7.0, 5.0])
+PRECIPITATION_DAYS = 30 * 365
+
+# 作物需求：(作物类型, 分类, 最低温度, 最适温度下限, 最适温度上限, 最高温度, pH下限, pH上限)
+CROP_CATALOG = [
+    ('水稻', '粮食作物', 12, 24, 30, 36, 5.0, 7.0),
+    ('玉米', '粮食作物', 10, 22, 28, 35, 5.5, 7.5),
+    ('小麦', '粮食作物', 3, 15, 22, 30, 6.0, 7.5),
+    ('大豆', '粮食作物', 10, 20, 26, 33, 6.0, 7.5),
+    ('红薯', '粮食作物', 15, 22, 30, 35, 5.0, 7.0),
+    ('油菜', '油料作物', 3, 14, 20, 28, 5.5, 7.5),
+    ('花生', '油料作物', 12, 22, 28, 35, 5.5, 7.0),
+    ('棉花', '经济作物', 14, 24, 30, 38, 6.0, 8.0),
+    ('烟草', '经济作物', 13, 20, 28, 35, 5.5, 6.5),
+    ('茶叶', '经济作物', 10, 18, 25, 35, 4.5, 6.0),
+    ('柑橘', '果树作物', 12, 20, 28, 37, 5.0, 6.5),
+    ('蔬菜', '蔬菜作物', 8, 17, 25, 32, 6.0, 7.0)
+]
+CROP_ROWS = 60
+
+# 适宜性网格：作物、适宜等级阈值（综合适宜性下限）、区划数与湖南省经纬度范围
+SUITABILITY_CROPS = ['水稻', '玉米', '油菜', '柑橘', '茶叶', '烟草']
+SUITABILITY_LEVELS = [(80, '高度适宜'), (65, '中度适宜'), (50, '勉强适宜'), (0, '不适宜')]
+ZONE_COUNT = 20
+LAT_RANGE = (24.6, 30.1)
+LON_RANGE = (108.8, 114.3)
+
+
+def station_names(n_stations):
+    """站点名称：'长沙县气象站'，同一县市的第二个及以后的站点为 '长沙县2号站'（均能对应到区划中的县市）"""
+    return np.array([
+        f"{COUNTIES[i % len(COUNTIES)]}{'气象站' if i < len(COUNTIES) else f'{i // len(COUNTIES) + 1}号站'}"
+        for i in range(n_stations)
+    ], dtype=object)
+
+
+def temperature_layout(rows):
+    """temperature_data 的 (年数, 站点数)：行数不超过长序列年数时只有一个全省序列"""
+    years = min(rows, TEMPERATURE_YEARS)
+    return years, math.ceil(rows / years)
+
+
+def build_temperature_data(rows, seed=2025):
+    """逐年月平均温度（jan…dec_val）与季节、年平均温度；多站点时附加 station_name 列"""
+    rng = np.random.default_rng(seed)
+    n_years, n_stations = temperature_layout(rows)
+    years = np.tile(np.arange(LAST_YEAR - n_years + 1, LAST_YEAR + 1), n_stations)[:rows]
+    stations = np.repeat(np.arange(n_stations), n_years)[:rows]
+
+    station_offset = rng.normal(0, 0.8, n_stations)[stations]
+    monthly = (MONTHLY_MEAN_TEMP[None, :] + (years - LAST_YEAR)[:, None] * WARMING_RATE
+               + station_offset[:, None] + rng.normal(0, 0.9, (rows, 12))).round(1)
+
+    df = pd.DataFrame({'id': np.arange(1, rows + 1), 'year_val': years})
+    if n_stations > 1:
+        df['station_name'] = station_names(n_stations)[stations]
+    for i, column in enumerate(MONTH_COLUMNS):
+        df[column] = monthly[:, i]
+    df['winter'] = monthly[:, [11, 0, 1]].mean(axis=1).round(2)
+    df['spring'] = monthly[:, 2:5].mean(axis=1).round(2)
+    df['summer'] = monthly[:, 5:8].mean(axis=1).round(2)
+    df['autumn'] = monthly[:, 8:11].mean(axis=1).round(2)
+    df['annual'] = monthly.mean(axis=1).round(2)
+    return df
+
+
+def build_climate_precipitation(rows, seed=2025):
+    """各站点逐日降水量（station_name, date, precipitation）"""
+    rng = np.random.default_rng(seed)
+    n_days = min(rows, PRECIPITATION_DAYS)
+    n_stations = math.ceil(rows / n_days)
+    dates = pd.date_range(end=f'{LAST_YEAR}-12-31', periods=n_days, freq='D')
+    date_index = np.tile(np.arange(n_days), n_stations)[:rows]
+    stations = np.repeat(np.arange(n_stations), n_days)[:rows]
+
+    month = dates.month.to_numpy()[date_index] - 1
+    wet = rng.random(rows) < WET_PROBABILITY[month]
+    amount = rng.gamma(0.75, WET_DAY_AMOUNT[month] / 0.75) * rng.uniform(0.85, 1.15, n_stations)[stations]
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'station_name': station_names(n_stations)[stations],
+        'date': dates.to_numpy()[date_index],
+        'precipitation': np.where(wet, amount + 0.1, 0.0).round(1)
+    })
+
+
+def build_soil_profiles(rows, counties=122, seed=2025):
+    """soil_profiles 结构的土壤样本（县市名称取湖南省实际县市）"""
+    rng = np.random.default_rng(seed)
+    names = np.array((COUNTIES * math.ceil(counties / len(COUNTIES)))[:counties], dtype=object)
+    if counties > len(COUNTIES):
+        names = np.array([f"{name}{i // len(COUNTIES) or ''}" for i, name in enumerate(names)], dtype=object)
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'county_name': names[rng.integers(0, counties, rows)],
+        'soil_name': np.array(SOIL_NAMES, dtype=object)[rng.integers(0, len(SOIL_NAMES), rows)],
+        'ph_value': rng.normal(6.0, 0.9, rows).clip(3.5, 9.5).round(2),
+        'organic_matter': rng.gamma(4.0, 7.0, rows).round(2),
+        'total_nitrogen': rng.gamma(3.0, 0.5, rows).round(3),
+        'available_phosphorus': rng.gamma(2.0, 10.0, rows).round(2),
+        'available_potassium': rng.gamma(5.0, 25.0, rows).round(2)
+    })
+
+
+def build_crop_requirements(rows=CROP_ROWS, seed=2025):
+    """crop_requirements 结构的作物品种需求（基础作物之外的品种在基础参数上小幅浮动）"""
+    rng = np.random.default_rng(seed)
+    catalog = np.array([entry[2:] for entry in CROP_CATALOG], dtype=float)
+    base = np.arange(rows) % len(CROP_CATALOG)
+    variety = np.arange(rows) // len(CROP_CATALOG)
+    params = catalog[base] + np.where(variety[:, None] > 0, rng.normal(0, 0.8, (rows, catalog.shape[1])), 0)
+    crop_types = np.array([entry[0] for entry in CROP_CATALOG], dtype=object)[base]
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'category': np.array([entry[1] for entry in CROP_CATALOG], dtype=object)[base],
+        'crop_type': [name if k == 0 else f"{name}{k}号" for name, k in zip(crop_types, variety)],
+        'min_temperature_min': (params[:, 0] - 2).round(1),
+        'min_temperature_max': params[:, 0].round(1),
+        'optimal_temperature_min': params[:, 1].round(1),
+        'optimal_temperature_max': params[:, 2].round(1),
+        'max_temperature_min': params[:, 3].round(1),
+        'max_temperature_max': (params[:, 3] + 3).round(1),
+        'ph_min': params[:, 4].round(1),
+        'ph_max': params[:, 5].round(1)
+    })
+
+
+def build_suitability_results(rows, seed=2025):
+    """suitability_results 结构的适宜性评价网格（可选表，供作物适宜性与区划优化分析）"""
+    rng = np.random.default_rng(seed)
+    county = rng.integers(0, len(COUNTIES), rows)
+    zone = county % ZONE_COUNT
+    lat = rng.uniform(*LAT_RANGE, rows).round(4)
+    lon = rng.uniform(*LON_RANGE, rows).round(4)
+    zone_lat = np.bincount(zone, lat, ZONE_COUNT) / np.maximum(np.bincount(zone, minlength=ZONE_COUNT), 1)
+    zone_lon = np.bincount(zone, lon, ZONE_COUNT) / np.maximum(np.bincount(zone, minlength=ZONE_COUNT), 1)
+    factors = rng.beta(5, 2, (rows, 3)) * 100
+    comprehensive = factors @ np.array([0.4, 0.35, 0.25])
+    thresholds = np.array([low for low, _ in SUITABILITY_LEVELS])
+    levels = np.array([name for _, name in SUITABILITY_LEVELS], dtype=object)
+    return pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'crop_name': np.array(SUITABILITY_CROPS, dtype=object)[rng.integers(0, len(SUITABILITY_CROPS), rows)],
+        'county': np.array(COUNTIES, dtype=object)[county],
+        'zone_id': zone + 1,
+        'lat': lat,
+        'lon': lon,
+        'center_lat': zone_lat[zone].round(4),
+        'center_lon': zone_lon[zone].round(4),
+        'temp_suitability': factors[:, 0].round(2),
+        'precip_suitability': factors[:, 1].round(2),
+        'soil_suitability': factors[:, 2].round(2),
+        'comprehensive_suitability': comprehensive.round(2),
+        'suitability_level': levels[np.argmax(comprehensive[:, None] >= thresholds[None, :], axis=1)]
+    })
+
+
+def table_rows(scale, temperature_rows=None, crop_rows=None):
+    """某规模下各表的行数"""
+    return {
+        'temperature_data': temperature_rows or max(TEMPERATURE_YEARS, scale // 1000),
+        'climate_precipitation': scale,
+        'soil_profiles': scale,
+        'crop_requirements': crop_rows or CROP_ROWS,
+        'suitability_results': scale
+    }
+
+
+def build_tables(scale, temperature_rows=None, crop_rows=None, seed=2025):
+    """生成某规模下的全部农业数据表 {表名: DataFrame}"""
+    rows = table_rows(scale, temperature_rows, crop_rows)
+    return {
+        'temperature_data': build_temperature_data(rows['temperature_data'], seed),
+        'climate_precipitation': build_climate_precipitation(rows['climate_precipitation'], seed),
+        'soil_profiles': build_soil_profiles(rows['soil_profiles'], seed=seed),
+        'crop_requirements': build_crop_requirements(rows['crop_requirements'], seed),
+        'suitability_results': build_suitability_results(rows['suitability_results'], seed)
+    }
+
+
+def main():
+    """生成合成数据并写入 SQLite 数据库文件（DATA_SOURCE=sqlite 时应用直接读取）"""
+    parser = argparse.ArgumentParser(description='生成合成农业数据库')
+    parser.add_argument('--scale', type=int, default=100000, help='数据规模（大表行数）')
+    parser.add_argument('--output', default=config.SQLITE_PATH, help='SQLite数据库文件路径')
+    parser.add_argument('--seed', type=int, default=2025, help='随机种子')
+    args = parser.parse_args()
+
+    source = SQLiteDataSource(args.output)
+    source.write_tables(build_tables(args.scale, seed=args.seed))
+    source.close()
+    print(f"✅ 合成数据已写入: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
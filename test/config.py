@@ -1,5 +1,7 @@
 # 湖南省农业分析系统配置文件
 
+import os
+
 # Flask应用配置
 class Config:
     # 基本配置
@@ -20,17 +22,57 @@ class Config:
         'autocommit': True
     }
     
+    # 数据源：'mysql' 或 'sqlite'（离线环境使用 SQLite 数据库文件，可用 benchmarks/synthetic_data.py 生成）
+    # MySQL 连接参数取自 MYSQL_HOST、MYSQL_PORT、MYSQL_USER、MYSQL_PASSWORD、MYSQL_DATABASE 环境变量
+    DATA_SOURCE = os.environ.get('DATA_SOURCE', 'mysql')
+    SQLITE_PATH = os.environ.get('SQLITE_PATH',
+                                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'climate_data.db'))
+    
+    # 各数据源的 Spark JDBC 驱动
+    JDBC_PACKAGES = {
+        'mysql': 'com.mysql:mysql-connector-j:8.0.33',
+        'sqlite': 'org.xerial:sqlite-jdbc:3.45.1.0'
+    }
+    
     # Spark配置
     SPARK_CONFIG = {
         'app_name': '湖南省农业分析系统',
         'master': 'local[*]',
         'memory': '4g',
-        'cores': 4
+        'cores': 4,
+        'jdbc_package': JDBC_PACKAGES.get(DATA_SOURCE),  # 数据源的JDBC驱动
+        'fetchsize': 10000,        # JDBC每次往返获取的行数
+        'partition_column': 'id',  # 按数值主键的 MIN/MAX 分区并行读取
+        'num_partitions': None,    # 最大并行读取数（None 时使用全部核心）
+        'partition_rows': 50000    # 每个分区的目标行数
     }
     
+    # 分析引擎：'pandas'、'duckdb'（单机嵌入式SQL）、'spark' 或 'auto'（按数据量选择，总行数达到阈值时使用Spark）
+    ANALYSIS_ENGINE = os.environ.get('ANALYSIS_ENGINE', 'auto')
+    SPARK_ROW_THRESHOLD = 5000000
+    SPARK_PREWARM = True  # ANALYSIS_ENGINE 为 spark 时启动即在后台创建并预热Spark会话（auto 模式在确定使用Spark后启动）
+    
     # 缓存配置
     CACHE_TIMEOUT = 300  # 5分钟缓存
     
+    # 联网数据配置（base_url 为空时使用模拟数据；本地测试可启动 utils/online_stub_server.py）
+    ONLINE_DATA_CONFIG = {
+        'base_url': os.environ.get('ONLINE_DATA_URL'),
+        'sources': {
+            'market': {'path': '/market', 'timeout': 2.0},
+            'weather': {'path': '/weather', 'timeout': 2.0},
+            'policy': {'path': '/policy', 'timeout': 3.0},
+            'industry': {'path': '/industry', 'timeout': 3.0}
+        },
+        'retries': 2,
+        'backoff': 0.2,
+        'pool_size': 8,
+        'max_workers': 8,
+        'deadline': 4.0,
+        'ttl': 600,
+        'stale_cap': 21600
+    }
+    
     # 日志配置
     LOG_LEVEL = 'INFO'
     LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
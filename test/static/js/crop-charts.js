@@ -111,44 +111,43 @@ async function loadCropCharts() {
                 console.log('✅ 作物温度需求图设置完成');
             }
             
-            // pH需求分布饼图
-            if (charts_data.limiting_factors_pie && charts_data.limiting_factors_pie.data && charts.limitingFactorsChart) {
-                console.log('🥧 设置pH需求饼图，数据点:', charts_data.limiting_factors_pie.data.length);
+            // 各作物pH适宜土壤占比柱状图（各作物占比相互独立）
+            if (charts_data.ph_compatibility_bar && charts_data.ph_compatibility_bar.data && charts.limitingFactorsChart) {
+                const phData = charts_data.ph_compatibility_bar;
+                console.log('📊 设置pH适宜土壤占比柱状图，作物数量:', phData.data.length);
                 charts.limitingFactorsChart.setOption({
                     title: { 
-                        text: charts_data.limiting_factors_pie.title || '作物pH需求分布',
+                        text: phData.title || '作物pH适宜土壤占比',
                         left: 'center',
                         textStyle: { fontSize: 16, fontWeight: 'bold' }
                     },
                     tooltip: { 
-                        trigger: 'item',
-                        formatter: '{a} <br/>{b}: {c}种作物 ({d}%)'
+                        trigger: 'axis',
+                        axisPointer: { type: 'shadow' },
+                        formatter: params => `${params[0].name}（pH ${params[0].data.ph_range}）<br/>适宜土壤占比: ${params[0].value}%`
                     },
-                    legend: { 
-                        orient: 'vertical', 
-                        left: 'left',
-                        top: 'middle'
+                    xAxis: { 
+                        type: 'category',
+                        data: phData.data.map(item => item.name),
+                        axisLabel: { 
+                            rotate: 45,
+                            fontSize: 10
+                        }
+                    },
+                    yAxis: { 
+                        type: 'value', 
+                        name: '适宜土壤占比(%)',
+                        max: 100,
+                        nameTextStyle: { fontSize: 12 }
                     },
                     series: [{
-                        name: 'pH需求',
-                        type: 'pie',
-                        radius: ['30%', '70%'],
-                        center: ['60%', '50%'],
-                        data: charts_data.limiting_factors_pie.data,
-                        emphasis: { 
-                            itemStyle: { 
-                                shadowBlur: 10,
-                                shadowOffsetX: 0,
-                                shadowColor: 'rgba(0, 0, 0, 0.5)'
-                            }
-                        },
-                        label: {
-                            show: true,
-                            formatter: '{b}\n{c}种'
-                        }
+                        name: '适宜土壤占比',
+                        type: 'bar',
+                        data: phData.data,
+                        itemStyle: { color: '#4ECDC4' }
                     }]
                 });
-                console.log('✅ pH需求饼图设置完成');
+                console.log('✅ pH适宜土壤占比柱状图设置完成');
             }
             
             console.log('✅ 作物图表加载完成');
@@ -0,0 +1,112 @@
+/**
+ * 沃土规划师 - 多分辨率地图加载模块
+ * 按缩放级别下载对应细节的量化TopoJSON，并解码为ECharts可注册的GeoJSON
+ */
+
+// 已加载的细节级别缓存
+const geoDetailCache = {};
+
+/**
+ * 根据缩放级别选择细节级别（与后端 ZOOM_DETAIL_THRESHOLDS 保持一致）
+ * @param {number} zoom - 地图缩放级别
+ */
+function geoDetailForZoom(zoom) {
+    if (zoom >= 3.0) return 'high';
+    if (zoom >= 1.8) return 'medium';
+    return 'low';
+}
+
+/**
+ * 解码一条增量量化弧为经纬度坐标
+ */
+function decodeTopoArc(topology, arc) {
+    const [kx, ky] = topology.transform.scale;
+    const [dx, dy] = topology.transform.translate;
+    let x = 0, y = 0;
+    return arc.map(point => {
+        x += point[0];
+        y += point[1];
+        return [x * kx + dx, y * ky + dy];
+    });
+}
+
+/**
+ * 将TopoJSON对象转换为GeoJSON FeatureCollection
+ * @param {object} topology - TopoJSON拓扑
+ * @param {string} objectName - 对象名称
+ */
+function topoToGeoJSON(topology, objectName) {
+    const arcs = topology.arcs.map(arc => decodeTopoArc(topology, arc));
+
+    const ring = indexes => {
+        const coords = [];
+        indexes.forEach(index => {
+            const points = index < 0 ? arcs[~index].slice().reverse() : arcs[index];
+            points.forEach((point, i) => {
+                // 相邻弧首尾重合，跳过重复点
+                if (i > 0 || coords.length === 0) coords.push(point);
+            });
+        });
+        return coords;
+    };
+    const polygon = rings => rings.map(ring);
+
+    return {
+        type: 'FeatureCollection',
+        features: topology.objects[objectName].geometries.map(geometry => ({
+            type: 'Feature',
+            properties: geometry.properties || {},
+            geometry: {
+                type: geometry.type,
+                coordinates: geometry.type === 'Polygon'
+                    ? polygon(geometry.arcs)
+                    : geometry.arcs.map(polygon)
+            }
+        }))
+    };
+}
+
+/**
+ * 加载指定细节级别的湖南省地图，返回GeoJSON
+ * @param {string} detail - low / medium / high
+ */
+async function loadHunanGeo(detail) {
+    if (geoDetailCache[detail]) {
+        return geoDetailCache[detail];
+    }
+    const response = await fetch(`/api/geo/hunan?detail=${detail}&format=topojson`);
+    if (!response.ok) {
+        throw new Error(`地图数据请求失败: ${response.status}`);
+    }
+    const topology = await response.json();
+    geoDetailCache[detail] = topoToGeoJSON(topology, 'hunan');
+    return geoDetailCache[detail];
+}
+
+/**
+ * 为图表注册湖南省地图，并在缩放时按需切换到更高细节级别
+ * @param {object} chart - ECharts实例
+ * @param {object} option - 图表配置（geo.map 为 'hunan'）
+ */
+async function registerHunanMap(chart, option) {
+    let currentDetail = geoDetailForZoom(option.geo.zoom || 1);
+    echarts.registerMap('hunan', await loadHunanGeo(currentDetail));
+    chart.setOption(option);
+
+    chart.off('georoam');
+    chart.on('georoam', async () => {
+        const geo = chart.getOption().geo[0];
+        const detail = geoDetailForZoom(geo.zoom || 1);
+        const order = ['low', 'medium', 'high'];
+        // 只在需要更高细节时下载
+        if (order.indexOf(detail) <= order.indexOf(currentDetail)) return;
+        currentDetail = detail;
+        try {
+            echarts.registerMap('hunan', await loadHunanGeo(detail));
+            chart.setOption({ geo: { map: 'hunan', zoom: geo.zoom, center: geo.center } });
+            console.log(`🗺️ 已切换到${detail}细节地图`);
+        } catch (error) {
+            console.error('❌ 高细节地图加载失败:', error);
+        }
+    });
+}
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+数据类型优化回归测试
+取值全为整数且含缺失值的测量列（整度气温、整毫米降水）经 load_table 优化后，
+温度趋势、降水与作物热量条件分析仍能得到结果
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database_connector import RealDataConnector, MONTH_COLUMNS
+from utils.dtype_optimizer import optimize_dtypes, TABLE_SCHEMAS
+from benchmarks.synthetic_data import build_temperature_data, build_climate_precipitation, build_crop_requirements
+
+
+def whole_degree_temperatures():
+    """逐月温度取整到整度，并缺一个月"""
+    df = build_temperature_data(60)
+    columns = MONTH_COLUMNS + ['winter', 'spring', 'summer', 'autumn', 'annual']
+    df[columns] = df[columns].round(0)
+    df.loc[5, 'jul'] = np.nan
+    return df
+
+
+def whole_mm_precipitation():
+    """逐日降水取整到整毫米，并缺一天"""
+    df = build_climate_precipitation(3000)
+    df['precipitation'] = df['precipitation'].round(0)
+    df.loc[10, 'precipitation'] = np.nan
+    return df
+
+
+@pytest.fixture
+def connector():
+    connector = RealDataConnector()
+    connector.load_table('temperature_data', whole_degree_temperatures())
+    connector.load_table('climate_precipitation', whole_mm_precipitation())
+    connector.load_table('crop_requirements', build_crop_requirements())
+    return connector
+
+
+def test_measurement_columns_stay_float():
+    optimized, _ = optimize_dtypes(whole_degree_temperatures(), TABLE_SCHEMAS['temperature_data'])
+    assert all(optimized[column].dtype == np.float32 for column in MONTH_COLUMNS)
+    assert optimized['jul'].isna().sum() == 1
+
+    optimized, _ = optimize_dtypes(whole_mm_precipitation(), TABLE_SCHEMAS['climate_precipitation'])
+    assert optimized['precipitation'].dtype == np.float32
+
+
+def test_undeclared_float_column_is_not_converted_to_integer():
+    df = pd.DataFrame({'count': [1.0, 2.0, np.nan, 4.0]})
+    optimized, _ = optimize_dtypes(df)
+    assert pd.api.types.is_float_dtype(optimized['count'].dtype)
+
+
+def test_analyses_on_optimized_frames_with_missing_values(connector):
+    assert connector.analyze_temperature_trends() is not None
+    assert connector.analyze_precipitation() is not None
+    assert connector.analyze_crop_climate() is not None
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+分析引擎接口
+pandas（RealDataConnector）、Spark（SparkMySQLConnector）与 DuckDB（DuckDBConnector）
+执行后端实现同一接口，由配置指定，或在 auto 模式下按数据量选择：小数据集使用 pandas，
+避免 JVM 启动开销；大数据集使用本地 Spark 并利用全部CPU核心
+"""
+
+import logging
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger(__name__)
+
+# 可选的执行后端
+ENGINE_CHOICES = ('auto', 'pandas', 'duckdb', 'spark')
+
+# 分析使用的数据表：结果键 → 表名
+AGRICULTURAL_TABLES = {
+    'temperature': 'temperature_data',
+    'precipitation': 'climate_precipitation',
+    'soil': 'soil_profiles',
+    'crop': 'crop_requirements'
+}
+
+# 适宜性评价结果表（可选，存在时额外进行作物适宜性分析）
+SUITABILITY_TABLE = 'suitability_results'
+
+
+class AnalysisEngine(ABC):
+    """
+    分析引擎接口
+    generate_comprehensive_report 返回统一结构 {'temperature': {...}, 'precipitation': {...}, 'soil': {...}, 'crop': {...},
+    'crop_climate': {...}}（存在适宜性评价结果表时另有 'suitability'），
+    其中的结果均为 pandas DataFrame，与执行后端无关
+    """
+
+    # 引擎名称（'pandas' / 'duckdb' / 'spark'）
+    name = None
+
+    @abstractmethod
+    def connect(self):
+        """建立数据源连接，成功返回 True"""
+
+    @abstractmethod
+    def read_all_agricultural_data(self):
+        """读取全部农业数据表，返回 {结果键: 数据表}，失败返回 None"""
+
+    @abstractmethod
+    def analyze_temperature_trends(self):
+        """温度趋势分析"""
+
+    @abstractmethod
+    def analyze_precipitation(self):
+        """降水分析（月/季降水量、变率、干旱期指数与水分适宜度）"""
+
+    @abstractmethod
+    def analyze_soil_distribution(self):
+        """土壤分布分析"""
+
+    @abstractmethod
+    def analyze_crop_requirements(self):
+        """作物需求分析"""
+
+    @abstractmethod
+    def analyze_crop_climate(self):
+        """作物热量条件分析（积温、霜冻风险月、最适温度窗口与温度适宜度）"""
+
+    @abstractmethod
+    def analyze_crop_suitability(self):
+        """作物适宜性分析（无适宜性评价结果表时返回 None）"""
+
+    @abstractmethod
+    def generate_comprehensive_report(self):
+        """生成综合分析报告（pandas DataFrame）"""
+
+    @abstractmethod
+    def close(self):
+        """释放连接等资源"""
+
+    def count_rows(self, frame):
+        """数据表行数"""
+        return len(frame)
+
+    def memory_report(self):
+        """各缓存表的内存占用（不适用的引擎返回空字典）"""
+        return {}
+
+    def data_summary(self, data):
+        """各数据表的记录数"""
+        return {f'{key}_records': self.count_rows(frame) if frame is not None else 0
+                for key, frame in data.items()}
+
+
+def create_analysis_engine(engine='auto', spark_config=None, row_threshold=None, data_source=None):
+    """
+    按配置创建分析引擎
+    engine 为 'pandas'、'duckdb' 或 'spark' 时直接使用对应后端（未安装 duckdb/pyspark 时回退到 pandas）；
+    为 'auto' 时先用 pandas 连接器查询各表的估计行数，总行数达到 row_threshold
+    （为空时使用 config.SPARK_ROW_THRESHOLD）才切换到 Spark。
+    各引擎从 data_source 读取数据表（为空时使用默认的 MySQL 数据源）
+    """
+    from utils.database_connector import RealDataConnector
+    from utils.spark_mysql_connector import SparkMySQLConnector, SPARK_AVAILABLE
+    from utils.duckdb_engine import DuckDBConnector, DUCKDB_AVAILABLE
+    from utils.spark_session import session_manager
+    from config import config
+
+    if engine not in ENGINE_CHOICES:
+        raise ValueError(f"未知的分析引擎: {engine}（可选: {', '.join(ENGINE_CHOICES)}）")
+
+    if engine == 'duckdb':
+        if DUCKDB_AVAILABLE:
+            return DuckDBConnector(data_source=data_source)
+        logger.warning("⚠️ 未安装 duckdb，分析引擎回退到 pandas")
+        return RealDataConnector(data_source=data_source)
+
+    if engine != 'pandas' and not SPARK_AVAILABLE:
+        if engine == 'spark':
+            logger.warning("⚠️ 未安装 pyspark，分析引擎回退到 pandas")
+        return RealDataConnector(data_source=data_source)
+
+    if engine == 'spark':
+        return SparkMySQLConnector(spark_config=spark_config, data_source=data_source)
+
+    connector = RealDataConnector(data_source=data_source)
+    if engine == 'pandas' or not connector.connect():
+        return connector
+
+    if row_threshold is None:
+        row_threshold = config.SPARK_ROW_THRESHOLD
+    total_rows = sum(connector.estimate_table_rows(AGRICULTURAL_TABLES.values()).values())
+    if total_rows < row_threshold:
+        logger.info(f"📊 数据量约 {total_rows} 行，使用 pandas 引擎")
+        return connector
+
+    logger.info(f"📊 数据量约 {total_rows} 行（阈值 {row_threshold}），使用 Spark 引擎")
+    connector.close()
+    # 确定使用 Spark 后才在后台启动会话，小数据集不承担JVM启动开销
+    session_manager.start(spark_config)
+    return SparkMySQLConnector(spark_config=spark_config, data_source=data_source)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+分析SQL
+Spark 与 DuckDB 引擎共用的聚合查询（土壤分布、pH分级、县市土壤质量、作物pH适宜土壤占比、作物适宜性统计），
+两种引擎对同一张表执行完全相同的SQL
+"""
+
+from utils.database_connector import PH_BINS, PH_LABELS
+from utils.ph_compatibility import PH_DECIMALS
+
+
+def ph_category_sql(column='ph_value'):
+    """与 PH_BINS/PH_LABELS 一致的pH分级 CASE 表达式（左开右闭）"""
+    cases = ' '.join(f"WHEN {column} <= {upper} THEN '{label}'"
+                     for upper, label in zip(PH_BINS[1:-1], PH_LABELS[:-1]))
+    return f"CASE {cases} ELSE '{PH_LABELS[-1]}' END"
+
+
+# 土壤类型分布
+SOIL_TYPE_DISTRIBUTION_SQL = """
+    SELECT
+        soil_name,
+        county_name,
+        COUNT(*) as count,
+        ROUND(AVG(ph_value), 3) as avg_ph,
+        ROUND(AVG(organic_matter), 3) as avg_organic_matter,
+        ROUND(AVG(total_nitrogen), 3) as avg_nitrogen,
+        ROUND(AVG(available_phosphorus), 3) as avg_phosphorus,
+        ROUND(AVG(available_potassium), 3) as avg_potassium
+    FROM soil_profiles
+    WHERE soil_name IS NOT NULL AND county_name IS NOT NULL
+    GROUP BY soil_name, county_name
+    ORDER BY soil_name, county_name
+"""
+
+# pH值分布统计
+PH_DISTRIBUTION_SQL = f"""
+    SELECT
+        {ph_category_sql()} as ph_category,
+        COUNT(*) as count,
+        ROUND(AVG(organic_matter), 2) as avg_organic_matter
+    FROM soil_profiles
+    WHERE ph_value IS NOT NULL
+    GROUP BY 1
+    ORDER BY MIN(ph_value)
+"""
+
+# 县市土壤质量排名
+COUNTY_SOIL_QUALITY_SQL = """
+    SELECT
+        county_name,
+        COUNT(*) as sample_count,
+        ROUND(AVG(ph_value), 3) as avg_ph,
+        ROUND(AVG(organic_matter), 3) as avg_organic_matter,
+        ROUND(AVG(total_nitrogen), 3) as avg_nitrogen,
+        ROUND(AVG(available_phosphorus), 3) as avg_phosphorus,
+        ROUND(AVG(available_potassium), 3) as avg_potassium,
+        ROUND(
+            (COALESCE(AVG(organic_matter), 0) * 0.3 +
+             COALESCE(AVG(total_nitrogen), 0) * 100 * 0.3 +
+             COALESCE(AVG(available_phosphorus), 0) * 0.2 +
+             COALESCE(AVG(available_potassium), 0) * 0.2), 2
+        ) as soil_quality_score
+    FROM soil_profiles
+    WHERE county_name IS NOT NULL
+    GROUP BY county_name
+    HAVING COUNT(*) >= 5
+    ORDER BY soil_quality_score DESC
+"""
+
+# 作物 × 县市 pH适宜样本数：土壤样本先按 (县市, pH) 计数，再与作物需求表关联
+_PH_COMPATIBILITY_CTE = f"""
+    WITH ph_counts AS (
+        SELECT county_name, ROUND(ph_value, {PH_DECIMALS}) as ph_value, COUNT(*) as samples
+        FROM soil_profiles
+        WHERE county_name IS NOT NULL AND ph_value IS NOT NULL
+        GROUP BY county_name, ROUND(ph_value, {PH_DECIMALS})
+    ),
+    compatibility AS (
+        SELECT
+            c.id as crop_id,
+            c.crop_type,
+            c.category,
+            ROUND(c.ph_min, {PH_DECIMALS}) as ph_min,
+            ROUND(c.ph_max, {PH_DECIMALS}) as ph_max,
+            p.county_name,
+            SUM(CASE WHEN p.ph_value BETWEEN ROUND(c.ph_min, {PH_DECIMALS}) AND ROUND(c.ph_max, {PH_DECIMALS})
+                     THEN p.samples ELSE 0 END) as compatible_samples,
+            SUM(p.samples) as sample_count
+        FROM ph_counts p CROSS JOIN crop_requirements c
+        WHERE c.crop_type IS NOT NULL AND c.ph_min IS NOT NULL AND c.ph_max IS NOT NULL
+        GROUP BY c.id, c.crop_type, c.category, c.ph_min, c.ph_max, p.county_name
+    )
+"""
+
+# 各作物pH适宜土壤占比（%）
+CROP_PH_COMPATIBILITY_SQL = _PH_COMPATIBILITY_CTE + """
+    SELECT
+        crop_type,
+        category,
+        ph_min,
+        ph_max,
+        SUM(compatible_samples) as compatible_samples,
+        SUM(sample_count) as total_samples,
+        ROUND(SUM(compatible_samples) * 100.0 / SUM(sample_count), 2) as compatible_share
+    FROM compatibility
+    GROUP BY crop_id, crop_type, category, ph_min, ph_max
+    ORDER BY crop_id
+"""
+
+# 各作物在各县市的pH适宜土壤占比（%）
+COUNTY_PH_COMPATIBILITY_SQL = _PH_COMPATIBILITY_CTE + """
+    SELECT
+        crop_type,
+        county_name,
+        compatible_samples,
+        sample_count,
+        ROUND(compatible_samples * 100.0 / sample_count, 2) as compatible_share
+    FROM compatibility
+    ORDER BY crop_id, county_name
+"""
+
+# 作物适宜性统计（suitability_factors 视图）
+CROP_SUITABILITY_STATS_SQL = """
+    SELECT
+        crop_name,
+        suitability_level,
+        COUNT(*) as area_count,
+        ROUND(AVG(comprehensive_suitability), 4) as avg_suitability,
+        ROUND(AVG(temp_suitability), 4) as avg_temp_suitability,
+        ROUND(AVG(precip_suitability), 4) as avg_precip_suitability,
+        ROUND(AVG(soil_suitability), 4) as avg_soil_suitability
+    FROM suitability_factors
+    GROUP BY crop_name, suitability_level
+    ORDER BY crop_name, avg_suitability DESC
+"""
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+气候趋势分析
+月度气候态一次矩阵归约得到；各站点/区域、各季节与年均温的线性增温趋势
+拼成一个矩阵后一次最小二乘求解（含显著性检验）；滑动多年距平在宽表上整体计算
+"""
+
+import math
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+try:
+    from scipy import stats
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# temperature_data 中的季节列与年均温列
+SEASON_COLUMNS = ['spring', 'summer', 'autumn', 'winter']
+SEASON_NAMES = {'spring': '春季', 'summer': '夏季', 'autumn': '秋季', 'winter': '冬季', 'annual': '全年'}
+TREND_COLUMNS = SEASON_COLUMNS + ['annual']
+
+# 可作为站点/区域标识的列（按顺序取第一个存在的列，都不存在时视为全省一个序列）
+REGION_COLUMNS = ['station_id', 'station_name', 'region', 'county_name', 'city_name']
+DEFAULT_REGION = '湖南省'
+
+# 显著性水平与默认滑动窗口（年）
+SIGNIFICANCE_LEVEL = 0.05
+ANOMALY_WINDOW = 10
+
+
+def region_column(df):
+    """站点/区域列名（不存在时返回 None）"""
+    return next((column for column in REGION_COLUMNS if column in df.columns), None)
+
+
+def monthly_climatology(df, month_columns):
+    """各月平均、标准差与极值（对月份矩阵按列一次归约）"""
+    columns = [column for column in month_columns if column in df.columns]
+    values = df[columns].to_numpy(dtype='float64')
+    counts = np.sum(~np.isnan(values), axis=0)
+    valid = counts > 0
+    with warnings.catch_warnings():
+        # 全为缺失值的月份得到 NaN，之后被过滤
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+        low = np.nanmin(values, axis=0)
+        high = np.nanmax(values, axis=0)
+
+    months = np.array([month_columns.index(column) + 1 for column in columns])
+    return pd.DataFrame({
+        'month': months,
+        'month_name': [f'{m}月' for m in months],
+        'avg_temp': mean.round(2),
+        'std_temp': std.round(2),
+        'min_temp': low.round(2),
+        'max_temp': high.round(2),
+        'sample_count': counts
+    })[valid].reset_index(drop=True)
+
+
+def _p_values(t_values, dof):
+    """双侧 t 检验 p 值；未安装 scipy 时用正态分布近似"""
+    t_values = np.abs(t_values)
+    if SCIPY_AVAILABLE:
+        return 2 * stats.t.sf(t_values, dof)
+    return np.array([math.erfc(t / math.sqrt(2)) if np.isfinite(t) else np.nan for t in t_values])
+
+
+def linear_trends(years, values):
+    """
+    对 values 的每一列（每个序列）同时拟合 y = a + b·year
+    无缺失值时所有列作为多右端项一次 lstsq 求解；有缺失值时用逐列掩码的正规方程（同样整体向量化）
+    返回 slope、intercept、p_value、n 四个数组
+    """
+    years = np.asarray(years, dtype='float64')
+    values = np.asarray(values, dtype='float64')
+    mask = ~np.isnan(values)
+    n = mask.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if mask.all():
+            centered = years - years.mean()
+            design = np.column_stack([np.ones_like(centered), centered])
+            coef = np.linalg.lstsq(design, values, rcond=None)[0]
+            slope = coef[1]
+            intercept = coef[0] - slope * years.mean()
+            residuals = values - design @ coef
+            sxx = np.full(values.shape[1], np.sum(centered ** 2))
+        else:
+            weights = mask.astype('float64')
+            filled = np.where(mask, values, 0.0)
+            x_mean = weights.T @ years / n
+            y_mean = filled.sum(axis=0) / n
+            dx = (years[:, None] - x_mean) * weights
+            sxx = np.sum(dx ** 2, axis=0)
+            slope = np.sum(dx * (filled - y_mean), axis=0) / sxx
+            intercept = y_mean - slope * x_mean
+            residuals = np.where(mask, values - (intercept + slope * years[:, None]), 0.0)
+
+        dof = n - 2
+        standard_error = np.sqrt(np.sum(residuals ** 2, axis=0) / dof / sxx)
+        t_values = np.where(dof > 0, slope / standard_error, np.nan)
+
+    p_value = _p_values(t_values, np.maximum(dof, 1))
+    p_value = np.where(dof > 0, p_value, np.nan)
+    return slope, intercept, p_value, n
+
+
+def _wide_series(df, value_columns, region):
+    """(年份 × (要素, 区域)) 宽表"""
+    keys = ['year_val'] + ([region] if region else [])
+    grouped = df.dropna(subset=['year_val']).groupby(keys, observed=True)[value_columns].mean()
+    wide = grouped.unstack(region) if region else pd.concat({DEFAULT_REGION: grouped}, axis=1).swaplevel(axis=1)
+    return wide.sort_index()
+
+
+def warming_trends(df, value_columns=TREND_COLUMNS):
+    """各区域、各季节与年均温的增温趋势（℃/10年）及显著性"""
+    columns = [column for column in value_columns if column in df.columns]
+    wide = _wide_series(df, columns, region_column(df))
+    years = wide.index.to_numpy(dtype='float64')
+    values = wide.to_numpy(dtype='float64')
+    slope, intercept, p_value, n = linear_trends(years, values)
+
+    observed = ~np.isnan(values)
+    first_year = np.where(observed.any(axis=0), years[np.argmax(observed, axis=0)], np.nan)
+    last_year = np.where(observed.any(axis=0), years[len(years) - 1 - np.argmax(observed[::-1], axis=0)], np.nan)
+
+    elements = wide.columns.get_level_values(0)
+    result = pd.DataFrame({
+        'region': wide.columns.get_level_values(1).astype(str),
+        'element': elements,
+        'element_name': [SEASON_NAMES.get(element, element) for element in elements],
+        'trend_per_decade': np.round(slope * 10, 3),
+        'p_value': np.round(p_value, 4),
+        'significant': p_value < SIGNIFICANCE_LEVEL,
+        'n_years': n,
+        'start_year': first_year,
+        'end_year': last_year
+    })
+    result = result[result['n_years'] >= 3].reset_index(drop=True)
+    return result.astype({'start_year': 'int64', 'end_year': 'int64'})
+
+
+def rolling_anomalies(df, column='annual', window=ANOMALY_WINDOW):
+    """各区域相对全时段平均的距平及其滑动平均（所有区域在宽表上一次计算）"""
+    if column not in df.columns:
+        return pd.DataFrame(columns=['year_val', 'region', 'value', 'anomaly', 'rolling_anomaly'])
+
+    wide = _wide_series(df, [column], region_column(df))[column]
+    anomaly = wide - wide.mean()
+    rolling = anomaly.rolling(window, min_periods=max(1, window // 2)).mean()
+
+    result = pd.DataFrame({
+        'value': wide.stack(),
+        'anomaly': anomaly.stack(),
+        'rolling_anomaly': rolling.stack()
+    }).round(3).reset_index()
+    result.columns = ['year_val', 'region', 'value', 'anomaly', 'rolling_anomaly']
+    result['region'] = result['region'].astype(str)
+    return result.sort_values(['region', 'year_val']).reset_index(drop=True)
+
+
+def seasonal_climatology(df):
+    """各季节与年均温的多年平均"""
+    columns = [column for column in TREND_COLUMNS if column in df.columns]
+    means = df[columns].astype('float64').mean()
+    return pd.DataFrame({
+        'season': columns,
+        'season_name': [SEASON_NAMES[column] for column in columns],
+        'avg_temp': means.round(2).to_numpy()
+    })
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+作物热量条件分析
+crop_requirements 中各作物的最低/最适/最高温度与 temperature_data 的逐年月平均温度
+组成 (作物, 区域-年, 月) 三维数组一次广播计算：积温（有效积温，GDD）、霜冻风险月数、
+高温月数与最适温度窗口覆盖率，按作物 × 区域汇总为温度适宜度评分，供区划温度因子使用
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from utils.climate_trends import region_column, DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+# 各月天数（闰年2月另加1天）
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# 气候标准值统计的年数（取最近的连续年份）
+NORMAL_PERIOD = 30
+
+# 温度适宜度：基础分 + 最适窗口覆盖率得分，霜冻风险月与高温月分别扣分
+SCORE_BASE = 40.0
+OPTIMAL_WEIGHT = 60.0
+FROST_PENALTY = 4.0
+HEAT_PENALTY = 6.0
+
+
+def _midpoint(low, high):
+    """区间中点（一端缺失时取另一端）"""
+    return np.where(np.isnan(low), high, np.where(np.isnan(high), low, (low + high) / 2))
+
+
+def crop_thresholds(crop_df):
+    """
+    各作物的三基点温度：
+    生长下限取最低温度区间中点，上限取最高温度区间中点，最适窗口为最适温度区间；
+    霜冻风险阈值为最低温度区间下限
+    """
+    def column(name):
+        return crop_df[name].to_numpy(dtype='float64') if name in crop_df.columns else np.full(len(crop_df), np.nan)
+
+    base = _midpoint(column('min_temperature_min'), column('min_temperature_max'))
+    upper = _midpoint(column('max_temperature_min'), column('max_temperature_max'))
+    frost = column('min_temperature_min')
+    return {
+        'base': base,
+        'upper': np.where(np.isnan(upper), np.inf, upper),
+        'optimal_min': column('optimal_temperature_min'),
+        'optimal_max': column('optimal_temperature_max'),
+        'frost': np.where(np.isnan(frost), base, frost)
+    }
+
+
+def region_year_matrix(temp_df, month_columns):
+    """(区域-年) × 12个月 的月平均温度矩阵，返回 (区域, 年份, 矩阵)"""
+    region = region_column(temp_df)
+    keys = [region, 'year_val'] if region else ['year_val']
+    present = [column for column in month_columns if column in temp_df.columns]
+    grouped = temp_df.dropna(subset=['year_val']).groupby(keys, observed=True, sort=True)[present].mean()
+    grouped = grouped.reindex(columns=month_columns)
+    years = grouped.index.get_level_values('year_val').to_numpy(dtype='int64')
+    regions = grouped.index.get_level_values(region).astype(str).to_numpy() if region \
+        else np.full(len(grouped), DEFAULT_REGION, dtype=object)
+    return regions, years, grouped.to_numpy(dtype='float64')
+
+
+def month_days(years):
+    """各年份各月的天数，形状为 (年数, 12)"""
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    return DAYS_IN_MONTH[None, :] + (leap[:, None] & (np.arange(12) == 1))
+
+
+def thermal_indices(temps, days, thresholds):
+    """
+    三维广播计算各作物、各区域-年的热量指标
+    temps、days 形状为 (区域-年, 12)，thresholds 中各数组形状为 (作物,)，结果形状为 (作物, 区域-年)
+    """
+    t = temps[None, :, :]
+    observed = ~np.isnan(t)
+    base = thresholds['base'][:, None, None]
+    upper = thresholds['upper'][:, None, None]
+    opt_min = thresholds['optimal_min'][:, None, None]
+    opt_max = thresholds['optimal_max'][:, None, None]
+
+    # 有效积温：月平均温度超过生长下限的部分（超过上限时按上限截断）× 当月天数
+    with np.errstate(invalid='ignore'):
+        effective = np.clip(np.nan_to_num(t - base), 0, upper - base)
+    gdd = np.sum(effective * days[None, :, :], axis=2)
+
+    growing = observed & (t >= base) & (t <= upper)
+    optimal = observed & (t >= opt_min) & (t <= opt_max)
+    growing_months = growing.sum(axis=2)
+    optimal_months = optimal.sum(axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coverage = np.where(growing_months > 0, optimal_months / growing_months, 0.0)
+
+    return {
+        'gdd': gdd,
+        'growing_months': growing_months,
+        'optimal_months': optimal_months,
+        'optimal_coverage': coverage,
+        'frost_risk_months': (observed & (t < thresholds['frost'][:, None, None])).sum(axis=2),
+        'heat_months': (observed & (t > upper)).sum(axis=2),
+        'observed_months': np.broadcast_to(observed.sum(axis=2), gdd.shape)
+    }
+
+
+def temperature_scores(indices):
+    """温度适宜度评分（0-100）"""
+    score = SCORE_BASE + OPTIMAL_WEIGHT * indices['optimal_coverage'] \
+        - FROST_PENALTY * indices['frost_risk_months'] - HEAT_PENALTY * indices['heat_months']
+    return np.clip(score, 0, 100)
+
+
+def climate_normals(regions, years, temps, period=NORMAL_PERIOD):
+    """各区域最近 period 年的月平均温度标准值"""
+    recent = years >= years.max() - period + 1
+    frame = pd.DataFrame(temps[recent], columns=range(1, 13))
+    frame['region'] = regions[recent]
+    normals = frame.groupby('region', sort=True).mean().stack().rename('normal_temp').reset_index()
+    normals.columns = ['region', 'month', 'normal_temp']
+    normals['month_name'] = normals['month'].astype(str) + '月'
+    normals['period'] = f"{int(years[recent].min())}-{int(years.max())}"
+    return normals.round({'normal_temp': 2})
+
+
+def crop_thermal_analysis(temp_df, crop_df, month_columns):
+    """
+    作物热量条件分析
+    返回逐年指标（作物 × 区域 × 年）、作物 × 区域多年平均与温度适宜度、各区域气候标准值
+    """
+    logger.info("🌾 开始分析作物热量条件...")
+    crops = crop_df.dropna(subset=['crop_type']).reset_index(drop=True)
+    thresholds = crop_thresholds(crops)
+    valid = ~np.isnan(thresholds['base'])
+    crops = crops[valid].reset_index(drop=True)
+    thresholds = {key: values[valid] for key, values in thresholds.items()}
+
+    regions, years, temps = region_year_matrix(temp_df, month_columns)
+    indices = thermal_indices(temps, month_days(years), thresholds)
+    indices['temp_score'] = temperature_scores(indices)
+
+    n_crops, n_rows = indices['gdd'].shape
+    crop_index = np.repeat(np.arange(n_crops), n_rows)
+    yearly = pd.DataFrame({
+        'crop_type': crops['crop_type'].astype(str).to_numpy()[crop_index],
+        'category': crops['category'].astype(str).to_numpy()[crop_index] if 'category' in crops else None,
+        'region': np.tile(regions, n_crops),
+        'year_val': np.tile(years, n_crops),
+        **{name: values.ravel() for name, values in indices.items()}
+    })
+    yearly = yearly[yearly['observed_months'] > 0].drop(columns='observed_months')
+    frost_free = yearly['frost_risk_months'].eq(0).astype('float64')
+
+    summary = yearly.assign(frost_free=frost_free).groupby(['crop_type', 'region'], sort=True).agg(
+        category=('category', 'first'),
+        avg_gdd=('gdd', 'mean'),
+        avg_growing_months=('growing_months', 'mean'),
+        avg_frost_risk_months=('frost_risk_months', 'mean'),
+        frost_free_years=('frost_free', 'mean'),
+        avg_heat_months=('heat_months', 'mean'),
+        avg_optimal_coverage=('optimal_coverage', 'mean'),
+        temp_score=('temp_score', 'mean'),
+        years=('year_val', 'count')
+    ).reset_index()
+
+    logger.info(f"✅ 作物热量条件分析完成（{n_crops}种作物 × {n_rows}个区域-年）")
+
+    return {
+        'crop_year_indices': yearly.round({'gdd': 1, 'optimal_coverage': 3, 'temp_score': 1}).reset_index(drop=True),
+        'crop_region_summary': summary.round({
+            'avg_gdd': 1, 'avg_growing_months': 2, 'avg_frost_risk_months': 2, 'frost_free_years': 3,
+            'avg_heat_months': 2, 'avg_optimal_coverage': 3, 'temp_score': 1
+        }),
+        'climate_normals': climate_normals(regions, years, temps)
+    }
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+作物种植结构优化器
+在各作物面积上限与产量目标约束下，将区域分配给适宜性最高的作物
+采用拉格朗日松弛 + 贪心修复，全部基于 (区域数 × 作物数) 矩阵向量化计算
+"""
+
+import time
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 单一作物默认最大面积占比
+DEFAULT_MAX_SHARE = 0.25
+
+# 各作物单产（吨/平方公里，按适宜性评分折算前的满分单产）
+CROP_YIELDS = {
+    'rice': 650, 'corn': 600, 'soybean': 250, 'wheat': 400,
+    'cotton': 120, 'rapeseed': 200, 'peanut': 300, 'sweet_potato': 2200,
+    'tobacco': 180, 'tea': 90, 'citrus': 1800, 'vegetables': 3000
+}
+
+
+def production_matrix(scores, area, yields):
+    """各区域种植各作物的预估产量（吨），按适宜性评分线性折算单产"""
+    return area[:, None] * yields[None, :] * scores / 100.0
+
+
+def _usage(assignment, area, production, n_crops):
+    """按当前分配方案统计各作物面积与产量"""
+    used_area = np.bincount(assignment, weights=area, minlength=n_crops)
+    rows = np.arange(len(assignment))
+    produced = np.bincount(assignment, weights=production[rows, assignment], minlength=n_crops)
+    return used_area, produced
+
+
+def _repair_capacity(assignment, scores, area, capacity, max_passes=50):
+    """
+    贪心修复面积上限：从超限作物中移出评分损失最小的区域，
+    改种仍有剩余面积的次优作物
+    """
+    n_crops = scores.shape[1]
+    for _ in range(max_passes):
+        used = np.bincount(assignment, weights=area, minlength=n_crops)
+        excess = used - capacity
+        if (excess <= 1e-9).all():
+            break
+        crop = int(np.argmax(excess))
+        spare = capacity - used
+        alternatives = np.where(spare > 0, scores, -np.inf)
+        alternatives[:, crop] = -np.inf
+        members = np.flatnonzero(assignment == crop)
+        if len(members) == 0 or not np.isfinite(alternatives[members]).any():
+            break
+
+        best_alt = alternatives[members].argmax(axis=1)
+        regret = scores[members, crop] - alternatives[members, best_alt]
+        order = np.argsort(regret)
+        # 按评分损失从小到大移出，直到面积回到上限以内
+        moved_area = np.cumsum(area[members[order]])
+        n_move = int(np.searchsorted(moved_area, excess[crop] - 1e-9) + 1)
+        move = order[:n_move]
+        move = move[np.isfinite(regret[move])]
+        assignment[members[move]] = best_alt[move]
+    return assignment
+
+
+def optimize_allocation(scores, area, max_area=None, min_production=None, yields=None,
+                        iterations=200, step=0.5):
+    """
+    求解作物-区域分配
+
+    参数:
+        scores: (区域数, 作物数) 适宜性评分矩阵
+        area: (区域数,) 区域面积
+        max_area: (作物数,) 各作物面积上限
+        min_production: (作物数,) 各作物产量目标，0 表示无目标
+        yields: (作物数,) 各作物满分单产
+    返回:
+        dict，包括每个区域分配的作物下标及约束满足情况
+    """
+    scores = np.asarray(scores, dtype=float)
+    area = np.asarray(area, dtype=float)
+    n_regions, n_crops = scores.shape
+    total_area = area.sum()
+
+    capacity = np.full(n_crops, np.inf) if max_area is None else np.asarray(max_area, dtype=float)
+    targets = np.zeros(n_crops) if min_production is None else np.asarray(min_production, dtype=float)
+    yields = np.ones(n_crops) if yields is None else np.asarray(yields, dtype=float)
+    production = production_matrix(scores, area, yields)
+    # 单位面积产量，用于产量约束乘子
+    unit_production = yields[None, :] * scores / 100.0
+
+    lam = np.zeros(n_crops)   # 面积上限乘子
+    mu = np.zeros(n_crops)    # 产量目标乘子
+    has_target = targets > 0
+    best = None
+    best_value = -np.inf
+
+    for k in range(iterations):
+        # 区域面积在 argmax 中可约去，只需比较单位面积的拉格朗日收益
+        adjusted = scores - lam[None, :] + mu[None, :] * unit_production
+        assignment = adjusted.argmax(axis=1)
+        used_area, produced = _usage(assignment, area, production, n_crops)
+
+        feasible = (used_area <= capacity + 1e-9).all() and (produced[has_target] >= targets[has_target]).all()
+        value = float((scores[np.arange(n_regions), assignment] * area).sum())
+        if feasible and value > best_value:
+            best, best_value = assignment.copy(), value
+
+        # 次梯度更新
+        rate = step / np.sqrt(k + 1)
+        if np.isfinite(capacity).any():
+            violation = np.where(np.isfinite(capacity), (used_area - capacity) / total_area, 0)
+            lam = np.maximum(0, lam + rate * 100 * violation)
+        if has_target.any():
+            shortfall = np.where(has_target, (targets - produced) / np.maximum(targets, 1e-9), 0)
+            mu = np.maximum(0, mu + rate * shortfall / np.maximum(yields, 1e-9) * 100)
+
+    if best is None:
+        # 乘子未收敛到可行解时，对最后一次分配做贪心修复
+        best = _repair_capacity(assignment.copy(), scores, area, capacity)
+
+    used_area, produced = _usage(best, area, production, n_crops)
+    return {
+        'assignment': best,
+        'used_area': used_area,
+        'production': produced,
+        'objective': float((scores[np.arange(n_regions), best] * area).sum() / total_area),
+        'capacity_met': bool((used_area <= capacity + 1e-6).all()),
+        'targets_met': [bool(not t or p >= t) for p, t in zip(produced, targets)]
+    }
+
+
+def run_crop_optimization(pyramid, crop_types, precision='county', weights=None,
+                          max_share=None, targets=None):
+    """
+    基于区划金字塔运行种植结构优化
+
+    参数:
+        pyramid: ZoningPyramid 实例
+        crop_types: 参与优化的作物代码列表
+        weights: {作物: {'temp', 'water', 'soil'}} 自定义权重，缺省使用配置权重
+        max_share: {作物: 最大面积占比}，缺省为 DEFAULT_MAX_SHARE
+        targets: {作物: 最低产量（吨）}
+    """
+    start_time = time.time()
+    names, parents, area, scores = pyramid.score_matrix(crop_types, precision, weights)
+
+    max_share = max_share or {}
+    targets = targets or {}
+    total_area = area.sum()
+    max_area = np.array([max_share.get(c, DEFAULT_MAX_SHARE) * total_area for c in crop_types])
+    min_production = np.array([float(targets.get(c, 0)) for c in crop_types])
+    yields = np.array([CROP_YIELDS.get(c, 500) for c in crop_types], dtype=float)
+
+    result = optimize_allocation(scores, area, max_area, min_production, yields)
+    assignment = result['assignment']
+    rows = np.arange(len(assignment))
+
+    regions = [
+        {
+            'name': name,
+            'parent': parent,
+            'crop': crop_types[c],
+            'score': round(float(s), 1),
+            'area': round(float(a), 1)
+        }
+        for name, parent, c, s, a in zip(names, parents, assignment, scores[rows, assignment], area)
+    ]
+
+    crops = []
+    for j, crop in enumerate(crop_types):
+        mask = assignment == j
+        crops.append({
+            'crop': crop,
+            'region_count': int(mask.sum()),
+            'area': round(float(result['used_area'][j]), 1),
+            'share': round(float(result['used_area'][j] / total_area * 100), 1),
+            'avg_score': round(float(scores[mask, j].mean()), 1) if mask.any() else 0,
+            'production': round(float(result['production'][j]), 0),
+            'target': float(min_production[j]),
+            'target_met': result['targets_met'][j]
+        })
+
+    elapsed = time.time() - start_time
+    logger.info(f"✅ 种植结构优化完成: {len(names)}个区域 × {len(crop_types)}种作物, 耗时{elapsed:.3f}秒")
+
+    return {
+        'precision': precision,
+        'regions': regions,
+        'crops': crops,
+        'objective': round(result['objective'], 2),
+        'capacity_met': result['capacity_met'],
+        'solve_time': round(elapsed, 3)
+    }
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+数据源
+分析引擎通过统一接口读取数据表：MySQL（生产环境）或 SQLite 数据库文件（离线开发与性能测试）。
+两者执行相同的 SELECT ... WHERE 查询，筛选条件都在数据源中执行；
+Spark 引擎通过各数据源提供的 JDBC 参数读取同样的表
+"""
+
+import os
+import sqlite3
+import logging
+from abc import ABC, abstractmethod
+
+import pandas as pd
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# 可选的数据源类型
+SOURCE_CHOICES = ('mysql', 'sqlite')
+
+# 默认MySQL连接参数（可由环境变量覆盖；密码只从 MYSQL_PASSWORD 读取，未设置时为空）
+DEFAULT_MYSQL_CONFIG = {
+    'host': os.environ.get('MYSQL_HOST', 'localhost'),
+    'port': int(os.environ.get('MYSQL_PORT', 3306)),
+    'user': os.environ.get('MYSQL_USER', 'root'),
+    'password': os.environ.get('MYSQL_PASSWORD', ''),
+    'database': os.environ.get('MYSQL_DATABASE', 'climate_data'),
+    'charset': 'utf8mb4'
+}
+
+# 写入数据表时每批插入的行数
+WRITE_BATCH_ROWS = 10000
+
+
+class DataSource(ABC):
+    """数据源接口：read_table 返回 pandas DataFrame，conditions 为 SQL WHERE 条件"""
+
+    # 数据源类型（'mysql' / 'sqlite'）
+    kind = None
+
+    def __init__(self):
+        self.connection = None
+
+    @abstractmethod
+    def _open(self):
+        """打开数据库连接"""
+
+    def connect(self):
+        """连接数据源（已连接时直接返回），成功返回 True"""
+        if self.connection is not None:
+            return True
+        try:
+            self.connection = self._open()
+            logger.info(f"✅ {self.describe()} 连接成功")
+            return True
+        except Exception as e:
+            logger.error(f"❌ {self.describe()} 连接失败: {e}")
+            return False
+
+    def read_table(self, table_name, conditions=None):
+        """读取数据表（条件在数据库中筛选）"""
+        if not self.connect():
+            raise ConnectionError(f"{self.describe()} 未连接")
+
+        query = f"SELECT * FROM {table_name}"
+        if conditions:
+            query += f" WHERE {conditions}"
+        return pd.read_sql(query, self.connection)
+
+    @abstractmethod
+    def estimate_table_rows(self, table_names):
+        """各表的估计行数（不扫描数据），不存在的表不出现在结果中"""
+
+    @abstractmethod
+    def write_tables(self, tables):
+        """写入数据表 {表名: DataFrame}（重建同名表）"""
+
+    @abstractmethod
+    def jdbc_options(self):
+        """Spark JDBC 读取参数（url、driver 等）"""
+
+    @abstractmethod
+    def describe(self):
+        """数据源说明（用于日志）"""
+
+    def close(self):
+        """关闭连接"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+            logger.info(f"🔒 {self.describe()} 连接已关闭")
+
+
+def mysql_column_type(series):
+    """pandas 列类型 → MySQL 列类型"""
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return 'BIGINT'
+    if pd.api.types.is_float_dtype(series.dtype):
+        return 'DOUBLE'
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 'DATE'
+    return 'VARCHAR(64)'
+
+
+class MySQLDataSource(DataSource):
+    """MySQL 数据源（pymysql）"""
+
+    kind = 'mysql'
+
+    def __init__(self, mysql_config=None):
+        super().__init__()
+        self.mysql_config = mysql_config or dict(DEFAULT_MYSQL_CONFIG)
+
+    def _open(self):
+        if not self.mysql_config.get('password'):
+            logger.warning("⚠️ 未设置 MYSQL_PASSWORD 环境变量，使用空密码连接MySQL")
+        return pymysql.connect(**self.mysql_config)
+
+    def estimate_table_rows(self, table_names):
+        """从 information_schema 获取各表的估计行数"""
+        try:
+            if not self.connect():
+                return {}
+
+            table_names = list(table_names)
+            placeholders = ', '.join(['%s'] * len(table_names))
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT table_name, table_rows FROM information_schema.tables "
+                    f"WHERE table_schema = %s AND table_name IN ({placeholders})",
+                    [self.mysql_config['database'], *table_names]
+                )
+                return {name: int(rows or 0) for name, rows in cursor.fetchall()}
+
+        except Exception as e:
+            logger.error(f"❌ 获取表行数失败: {e}")
+            return {}
+
+    def write_tables(self, tables):
+        """重建同名表并分批插入"""
+        if not self.connect():
+            raise ConnectionError(f"{self.describe()} 未连接")
+
+        with self.connection.cursor() as cursor:
+            for table_name, df in tables.items():
+                columns = ', '.join(
+                    f"`{column}` {mysql_column_type(df[column])}" + (' PRIMARY KEY' if column == 'id' else '')
+                    for column in df.columns
+                )
+                cursor.execute(f"DROP TABLE IF EXISTS `{table_name}`")
+                cursor.execute(f"CREATE TABLE `{table_name}` ({columns}) DEFAULT CHARSET=utf8mb4")
+
+                insert = f"INSERT INTO `{table_name}` VALUES ({', '.join(['%s'] * len(df.columns))})"
+                values = df.astype(object).where(df.notna(), None)
+                for start in range(0, len(values), WRITE_BATCH_ROWS):
+                    cursor.executemany(insert, values.iloc[start:start + WRITE_BATCH_ROWS].itertuples(index=False,
+                                                                                                     name=None))
+                logger.info(f"✅ 已写入表 {table_name}: {len(df)} 条记录")
+        self.connection.commit()
+
+    def jdbc_options(self):
+        config = self.mysql_config
+        # useCursorFetch 使 MySQL 驱动按 fetchsize 分批返回，而不是一次读入整个结果集
+        return {
+            'url': (f"jdbc:mysql://{config['host']}:{config.get('port', 3306)}/{config['database']}"
+                    f"?useUnicode=true&characterEncoding=utf8&useCursorFetch=true"),
+            'driver': 'com.mysql.cj.jdbc.Driver',
+            'user': config['user'],
+            'password': config['password']
+        }
+
+    def describe(self):
+        return f"MySQL数据库 {self.mysql_config['database']}@{self.mysql_config['host']}"
+
+
+class SQLiteDataSource(DataSource):
+    """SQLite 数据源：单个数据库文件，表名与列结构与 MySQL 相同"""
+
+    kind = 'sqlite'
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def _open(self):
+        if self.path != ':memory:' and not os.path.exists(self.path):
+            raise FileNotFoundError(f"SQLite数据库文件不存在: {self.path}")
+        # Flask 多线程处理请求，连接不限定在创建它的线程中使用
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def estimate_table_rows(self, table_names):
+        """各表的最大 rowid（按 rowid 索引直接定位，不扫描数据）"""
+        try:
+            if not self.connect():
+                return {}
+
+            rows = {}
+            for table_name in table_names:
+                try:
+                    rows[table_name] = int(self.connection.execute(
+                        f'SELECT MAX(_ROWID_) FROM "{table_name}"').fetchone()[0] or 0)
+                except sqlite3.OperationalError:
+                    continue
+            return rows
+
+        except Exception as e:
+            logger.error(f"❌ 获取表行数失败: {e}")
+            return {}
+
+    def write_tables(self, tables):
+        """重建同名表并分批插入（日期列以 ISO 文本存储）"""
+        if self.connection is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+
+        for table_name, df in tables.items():
+            df.to_sql(table_name, self.connection, if_exists='replace', index=False, chunksize=WRITE_BATCH_ROWS)
+            logger.info(f"✅ 已写入表 {table_name}: {len(df)} 条记录")
+        self.connection.commit()
+
+    def jdbc_options(self):
+        return {
+            'url': f"jdbc:sqlite:{os.path.abspath(self.path)}",
+            'driver': 'org.sqlite.JDBC'
+        }
+
+    def describe(self):
+        return f"SQLite数据库 {self.path}"
+
+
+def create_data_source(kind='mysql', mysql_config=None, sqlite_path=None):
+    """按配置创建数据源"""
+    if kind not in SOURCE_CHOICES:
+        raise ValueError(f"未知的数据源: {kind}（可选: {', '.join(SOURCE_CHOICES)}）")
+
+    if kind == 'sqlite':
+        if not sqlite_path:
+            raise ValueError("使用 SQLite 数据源时需要指定数据库文件路径")
+        return SQLiteDataSource(sqlite_path)
+    return MySQLDataSource(mysql_config)
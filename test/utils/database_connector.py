@@ -1,133 +1,215 @@
 # -*- coding: utf-8 -*-
 """
 真实数据连接器
-适配实际MySQL数据库表结构
+适配实际MySQL数据库表结构，数据表经数据源（MySQL 或 SQLite，见 utils/data_source.py）读取
 """
 
+import os
+import sys
 import pandas as pd
-import pymysql
 import numpy as np
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_engine import AnalysisEngine, AGRICULTURAL_TABLES, SUITABILITY_TABLE
+from utils.dtype_optimizer import optimize_dtypes, TABLE_SCHEMAS
+from utils.data_source import MySQLDataSource
+from utils import climate_trends
+from utils.precipitation import precipitation_analysis
+from utils.crop_climate import crop_thermal_analysis
+from utils.ph_compatibility import ph_compatibility
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class RealDataConnector:
-    def __init__(self, mysql_config=None):
-        """初始化真实数据连接器"""
-        self.mysql_config = mysql_config or {
-            'host': 'localhost',
-            'port': 3306,
-            'user': 'root',
-            'password': 'wujiayun1',
-            'database': 'climate_data',
-            'charset': 'utf8mb4'
-        }
+# temperature_data 中的月份列（1-12月）
+MONTH_COLUMNS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+                 'jul', 'aug', 'sep', 'oct_val', 'nov', 'dec_val']
+
+# 土壤pH分级（左开右闭区间）
+PH_BINS = [0, 5.5, 6.5, 7.5, 8.5, 14]
+PH_LABELS = ['强酸性(<5.5)', '酸性(5.5-6.5)', '中性(6.5-7.5)', '碱性(7.5-8.5)', '强碱性(>8.5)']
+
+# 适宜性因子列、对应的限制因子名称与综合适宜性权重
+FACTOR_COLUMNS = ['temp_suitability', 'precip_suitability', 'soil_suitability']
+FACTOR_LABELS = np.array(['温度限制', '降水限制', '土壤限制'])
+FACTOR_WEIGHTS = np.array([0.4, 0.35, 0.25])
+
+# 适宜等级分组
+SUITABLE_LEVELS = ['高度适宜', '中度适宜']
+MARGINAL_LEVELS = ['勉强适宜', '不适宜']
+
+def round_floats(frame, decimals):
+    """浮点列转为 float64 后取整（float32 列直接取整会在输出中出现 6.300000190734863 这类值）"""
+    floats = frame.select_dtypes('floating').columns
+    return frame.astype({column: 'float64' for column in floats}).round(decimals)
+
+def limiting_factor_codes(factors):
+    """限制因子编码：每行三个因子中的最小者（相同时依次取温度、降水，缺失值不参与比较）"""
+    return np.argmin(np.nan_to_num(factors, nan=np.inf), axis=1)
+
+def comprehensive_suitability(frame, factors):
+    """综合适宜性，缺失时以因子加权和补全"""
+    comprehensive = frame['comprehensive_suitability'].to_numpy(dtype='float64')
+    return np.where(np.isnan(comprehensive), factors @ FACTOR_WEIGHTS, comprehensive)
+
+def annotate_suitability(frame):
+    """按列批量计算限制因子并补全综合适宜性（Spark pandas UDF 与 DuckDB 引擎共用）"""
+    factors = frame[FACTOR_COLUMNS].to_numpy(dtype='float64')
+    frame = frame.copy()
+    frame['limiting_factor'] = FACTOR_LABELS[limiting_factor_codes(factors)]
+    frame['comprehensive_suitability'] = comprehensive_suitability(frame, factors)
+    return frame
+
+def temperature_trend_analysis(temp_df, window=climate_trends.ANOMALY_WINDOW):
+    """
+    温度趋势分析：年度序列、月度气候态（一次矩阵归约）、季节平均、
+    各区域增温趋势与显著性（一次批量最小二乘）、滑动距平
+    """
+    logger.info("🌡️ 开始分析温度趋势...")
+    
+    # 年度温度趋势
+    annual_trend = temp_df[['year_val', 'winter', 'spring', 'summer', 'autumn', 'annual']].dropna()
+    annual_trend = round_floats(annual_trend.sort_values('year_val'), 2)
+    
+    result = {
+        'annual_trend': annual_trend.reset_index(drop=True),
+        'monthly_pattern': climate_trends.monthly_climatology(temp_df, MONTH_COLUMNS),
+        'seasonal_pattern': climate_trends.seasonal_climatology(temp_df),
+        'warming_trends': climate_trends.warming_trends(temp_df),
+        'anomalies': climate_trends.rolling_anomalies(temp_df, window=window)
+    }
+    
+    logger.info("✅ 温度趋势分析完成")
+    return result
+
+class RealDataConnector(AnalysisEngine):
+    """基于 pandas 的分析引擎"""
+
+    name = 'pandas'
+
+    def __init__(self, mysql_config=None, optimize=True, data_source=None):
+        """
+        初始化真实数据连接器
+        data_source 为空时使用 MySQL 数据源（mysql_config 为连接参数）；
+        optimize 为 True 时读取后按表结构优化列类型
+        """
+        self.source = data_source or MySQLDataSource(mysql_config)
         
-        self.connection = None
         self.data_cache = {}
+        self.optimize = optimize
+        self.memory_stats = {}
         
-        logger.info("✅ 真实数据连接器初始化成功")
+        # 数据版本：每次读取数据表后递增，分析结果按版本缓存
+        self.data_version = 0
+        self._results = {}
+        
+        logger.info(f"✅ 真实数据连接器初始化成功（{self.source.describe()}）")
     
-    def connect_mysql(self):
-        """连接MySQL数据库"""
-        try:
-            self.connection = pymysql.connect(**self.mysql_config)
-            logger.info("✅ MySQL数据库连接成功")
-            return True
-        except Exception as e:
-            logger.error(f"❌ MySQL连接失败: {e}")
-            return False
+    def connect(self):
+        """连接数据源（已连接时直接返回）"""
+        return self.source.connect()
     
-    def read_mysql_table(self, table_name, conditions=None):
-        """从MySQL读取表数据"""
+    def estimate_table_rows(self, table_names):
+        """各表的估计行数（不扫描数据）"""
+        return self.source.estimate_table_rows(table_names)
+    
+    def read_mysql_table(self, table_name, conditions=None, required=True):
+        """从数据源读取表数据（conditions 为 WHERE 条件，在数据库中筛选）"""
         try:
-            if not self.connection:
-                if not self.connect_mysql():
-                    return None
-            
-            # 构建查询
-            query = f"SELECT * FROM {table_name}"
-            if conditions:
-                query += f" WHERE {conditions}"
-            
-            # 读取数据
-            df = pd.read_sql(query, self.connection)
+            df = self.source.read_table(table_name, conditions)
             logger.info(f"✅ 成功读取表 {table_name}: {len(df)} 条记录")
             
-            # 缓存数据
-            self.data_cache[table_name] = df
-            
-            return df
+            return self.load_table(table_name, df)
             
         except Exception as e:
-            logger.error(f"❌ 读取MySQL表失败: {e}")
+            if required:
+                logger.error(f"❌ 读取数据表失败: {e}")
+            else:
+                logger.warning(f"⚠️ 可选表 {table_name} 读取失败，跳过")
             return None
     
+    def load_table(self, table_name, df):
+        """载入数据表：按表结构优化类型后缓存，已缓存的分析结果随之失效"""
+        if self.optimize:
+            df = self.optimize_table(table_name, df)
+        
+        self.data_cache[table_name] = df
+        self.data_version += 1
+        return df
+    
+    def optimize_table(self, table_name, df):
+        """按表结构优化列类型并记录内存占用"""
+        df, report = optimize_dtypes(df, TABLE_SCHEMAS.get(table_name))
+        self.memory_stats[table_name] = report
+        logger.info(f"📦 表 {table_name} 内存: {report['memory_before_mb']}MB → {report['memory_after_mb']}MB")
+        return df
+    
+    def memory_report(self):
+        """各缓存表的内存占用（优化前后）"""
+        report = {}
+        for table_name, df in self.data_cache.items():
+            stats = self.memory_stats.get(table_name, {})
+            report[table_name] = {
+                'rows': len(df),
+                'memory_mb': round(df.memory_usage(deep=True).sum() / 1024 / 1024, 3),
+                'memory_before_mb': stats.get('memory_before_mb'),
+                'reduction_ratio': stats.get('reduction_ratio'),
+                'dtypes': {column: str(dtype) for column, dtype in df.dtypes.items()}
+            }
+        return report
+    
     def read_all_agricultural_data(self):
         """读取所有农业数据"""
         try:
             logger.info("🚀 开始读取所有农业数据...")
             
             # 读取各个表
-            temp_df = self.read_mysql_table("temperature_data")
-            precip_df = self.read_mysql_table("climate_precipitation") 
-            soil_df = self.read_mysql_table("soil_profiles")
-            crop_df = self.read_mysql_table("crop_requirements")
+            data = {key: self.read_mysql_table(table) for key, table in AGRICULTURAL_TABLES.items()}
+            self.read_mysql_table(SUITABILITY_TABLE, required=False)
             
             logger.info("✅ 所有农业数据读取完成")
             
-            return {
-                'temperature': temp_df,
-                'precipitation': precip_df,
-                'soil': soil_df,
-                'crop': crop_df
-            }
+            return data
             
         except Exception as e:
             logger.error(f"❌ 读取农业数据失败: {e}")
             return None
     
-    def analyze_temperature_trends(self):
-        """分析温度趋势"""
+    def cached_result(self, name, builder):
+        """分析结果按数据版本缓存（数据重新读取后自动失效）"""
+        if self._results.get('version') != self.data_version:
+            self._results = {'version': self.data_version}
+        if name not in self._results:
+            self._results[name] = builder()
+        return self._results[name]
+    
+    def analyze_temperature_trends(self, window=climate_trends.ANOMALY_WINDOW):
+        """分析温度趋势（结果按数据版本缓存）"""
         try:
-            logger.info("🌡️ 开始分析温度趋势...")
-            
             temp_df = self.data_cache.get('temperature_data')
             if temp_df is None or temp_df.empty:
                 return None
             
-            # 年度温度趋势
-            temp_trend = temp_df[['year_val', 'winter', 'spring', 'summer', 'autumn', 'annual']].copy()
-            temp_trend = temp_trend.dropna()
-            
-            # 月度温度模式 - 计算各月平均值
-            monthly_cols = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 
-                           'jul', 'aug', 'sep', 'oct_val', 'nov', 'dec_val']
-            monthly_data = []
-            
-            for i, col in enumerate(monthly_cols, 1):
-                if col in temp_df.columns:
-                    avg_temp = temp_df[col].mean()
-                    if not pd.isna(avg_temp):
-                        monthly_data.append({
-                            'month': i,
-                            'month_name': f'{i}月',
-                            'avg_temp': round(avg_temp, 2)
-                        })
+            return self.cached_result(('temperature', window), lambda: temperature_trend_analysis(temp_df, window))
             
-            monthly_pattern = pd.DataFrame(monthly_data)
-            
-            logger.info("✅ 温度趋势分析完成")
+        except Exception as e:
+            logger.error(f"❌ 温度趋势分析失败: {e}")
+            return None
+    
+    def analyze_precipitation(self):
+        """分析降水（结果按数据版本缓存）"""
+        try:
+            precip_df = self.data_cache.get('climate_precipitation')
+            if precip_df is None or precip_df.empty:
+                return None
             
-            return {
-                'annual_trend': temp_trend,
-                'monthly_pattern': monthly_pattern
-            }
+            return self.cached_result('precipitation', lambda: precipitation_analysis(precip_df))
             
         except Exception as e:
-            logger.error(f"❌ 温度趋势分析失败: {e}")
+            logger.error(f"❌ 降水分析失败: {e}")
             return None
     
     def analyze_soil_distribution(self):
@@ -140,39 +222,39 @@ class RealDataConnector:
                 return None
             
             # 土壤类型分布
-            soil_type_dist = soil_df.groupby(['soil_name', 'county_name']).agg({
+            soil_type_dist = soil_df.groupby(['soil_name', 'county_name'], observed=True).agg({
                 'id': 'count',
                 'ph_value': 'mean',
                 'organic_matter': 'mean',
                 'total_nitrogen': 'mean',
                 'available_phosphorus': 'mean',
                 'available_potassium': 'mean'
-            }).round(3)
+            }).pipe(round_floats, 3)
             soil_type_dist.columns = ['count', 'avg_ph', 'avg_organic_matter', 'avg_nitrogen', 'avg_phosphorus', 'avg_potassium']
             soil_type_dist = soil_type_dist.reset_index()
             
             # pH值分布统计
             soil_df_clean = soil_df.dropna(subset=['ph_value'])
             soil_df_clean['ph_category'] = pd.cut(soil_df_clean['ph_value'], 
-                                          bins=[0, 5.5, 6.5, 7.5, 8.5, 14],
-                                          labels=['强酸性(<5.5)', '酸性(5.5-6.5)', '中性(6.5-7.5)', '碱性(7.5-8.5)', '强碱性(>8.5)'])
+                                          bins=PH_BINS,
+                                          labels=PH_LABELS)
             
             ph_distribution = soil_df_clean.groupby('ph_category').agg({
                 'id': 'count',
                 'organic_matter': 'mean'
-            }).round(2)
+            }).pipe(round_floats, 2)
             ph_distribution.columns = ['count', 'avg_organic_matter']
             ph_distribution = ph_distribution.reset_index()
             
             # 县市土壤质量排名
-            county_soil_quality = soil_df.groupby('county_name').agg({
+            county_soil_quality = soil_df.groupby('county_name', observed=True).agg({
                 'id': 'count',
                 'ph_value': 'mean',
                 'organic_matter': 'mean',
                 'total_nitrogen': 'mean',
                 'available_phosphorus': 'mean',
                 'available_potassium': 'mean'
-            }).round(3)
+            }).pipe(round_floats, 3)
             
             # 计算土壤质量评分
             county_soil_quality['soil_quality_score'] = (
@@ -212,32 +294,172 @@ class RealDataConnector:
             temp_requirements = crop_df[['category', 'crop_type', 'min_temperature_min', 'min_temperature_max', 
                                        'optimal_temperature_min', 'optimal_temperature_max', 
                                        'max_temperature_min', 'max_temperature_max']].copy()
-            temp_requirements = temp_requirements.dropna()
+            temp_requirements = round_floats(temp_requirements.dropna(), 4)
             
             # 作物pH需求分析
             ph_requirements = crop_df[['category', 'crop_type', 'ph_min', 'ph_max']].copy()
-            ph_requirements = ph_requirements.dropna()
+            ph_requirements = round_floats(ph_requirements.dropna(), 4)
             
             # 作物分类统计
-            crop_categories = crop_df.groupby('category').agg({
+            crop_categories = crop_df.groupby('category', observed=True).agg({
                 'id': 'count',
                 'crop_type': 'nunique'
             })
             crop_categories.columns = ['total_varieties', 'unique_types']
             crop_categories = crop_categories.reset_index()
             
-            logger.info("✅ 作物需求分析完成")
-            
-            return {
+            result = {
                 'temperature_requirements': temp_requirements,
                 'ph_requirements': ph_requirements,
                 'crop_categories': crop_categories
             }
             
+            # 各作物pH适宜土壤占比（总体与分县市）
+            compatibility = self.compute_ph_compatibility()
+            if compatibility:
+                result['ph_compatibility'], result['county_ph_compatibility'] = compatibility
+            
+            logger.info("✅ 作物需求分析完成")
+            
+            return result
+            
         except Exception as e:
             logger.error(f"❌ 作物需求分析失败: {e}")
             return None
     
+    def compute_ph_compatibility(self):
+        """各作物pH适宜土壤占比（总体与分县市，结果按数据版本缓存），缺少土壤或作物数据时返回 None"""
+        soil_df = self.data_cache.get('soil_profiles')
+        crop_df = self.data_cache.get('crop_requirements')
+        if soil_df is None or soil_df.empty or crop_df is None or crop_df.empty:
+            return None
+        return self.cached_result('ph_compatibility', lambda: ph_compatibility(soil_df, crop_df))
+    
+    def analyze_crop_climate(self):
+        """分析各作物在各区域、各年份的热量条件（结果按数据版本缓存）"""
+        try:
+            temp_df = self.data_cache.get('temperature_data')
+            crop_df = self.data_cache.get('crop_requirements')
+            if temp_df is None or temp_df.empty or crop_df is None or crop_df.empty:
+                return None
+            
+            return self.cached_result('crop_climate', lambda: crop_thermal_analysis(temp_df, crop_df, MONTH_COLUMNS))
+            
+        except Exception as e:
+            logger.error(f"❌ 作物热量条件分析失败: {e}")
+            return None
+    
+    def analyze_crop_suitability(self):
+        """
+        分析作物适宜性（需要 suitability_results 表）
+        限制因子按因子列整体 argmin 计算，区划的县市集合按类别编码去重后分组，
+        不逐行调用Python函数，可处理数百万网格行
+        """
+        try:
+            logger.info("🌾 开始分析作物适宜性...")
+            
+            suitability_df = self.data_cache.get(SUITABILITY_TABLE)
+            if suitability_df is None or suitability_df.empty:
+                return None
+            
+            factors = suitability_df[FACTOR_COLUMNS].to_numpy(dtype='float64')
+            frame = pd.DataFrame({
+                'crop_name': suitability_df['crop_name'].array,
+                'suitability_level': suitability_df['suitability_level'].array,
+                'comprehensive_suitability': comprehensive_suitability(suitability_df, factors)
+            })
+            level = frame['suitability_level']
+            
+            # 作物适宜性统计
+            frame[FACTOR_COLUMNS] = factors
+            crop_suitability_stats = frame.groupby(['crop_name', 'suitability_level'], observed=True).agg(
+                area_count=('comprehensive_suitability', 'size'),
+                avg_suitability=('comprehensive_suitability', 'mean'),
+                avg_temp_suitability=('temp_suitability', 'mean'),
+                avg_precip_suitability=('precip_suitability', 'mean'),
+                avg_soil_suitability=('soil_suitability', 'mean')
+            ).round(4).reset_index()
+            crop_suitability_stats = crop_suitability_stats.sort_values(['crop_name', 'avg_suitability'],
+                                                                        ascending=[True, False])
+            
+            # 最佳种植区域推荐
+            mask = level.isin(SUITABLE_LEVELS).to_numpy()
+            suitable = pd.DataFrame({column: source[column].array[mask] for source, column in [
+                (frame, 'crop_name'), (suitability_df, 'county'), (frame, 'comprehensive_suitability'),
+                (suitability_df, 'lat'), (suitability_df, 'lon')
+            ]})
+            best_planting_areas = suitable.groupby(['crop_name', 'county'], observed=True).agg(
+                suitable_points=('comprehensive_suitability', 'size'),
+                avg_suitability=('comprehensive_suitability', 'mean'),
+                center_lat=('lat', 'mean'),
+                center_lon=('lon', 'mean')
+            ).round(4).reset_index()
+            best_planting_areas = best_planting_areas[best_planting_areas['suitable_points'] >= 5]
+            best_planting_areas = best_planting_areas.sort_values(['crop_name', 'avg_suitability'],
+                                                                  ascending=[True, False])
+            
+            # 区划优化建议
+            zoning_optimization = self._zoning_optimization(suitability_df, frame)
+            
+            # 限制因子分析
+            marginal = level.isin(MARGINAL_LEVELS).to_numpy()
+            limiting = pd.DataFrame({
+                'crop_name': frame['crop_name'].array[marginal],
+                'limiting_factor': pd.Categorical.from_codes(limiting_factor_codes(factors[marginal]), FACTOR_LABELS),
+                'comprehensive_suitability': frame['comprehensive_suitability'].to_numpy()[marginal]
+            })
+            limiting_factors = limiting.groupby(['crop_name', 'limiting_factor'], observed=True).agg(
+                affected_areas=('comprehensive_suitability', 'size'),
+                avg_suitability=('comprehensive_suitability', 'mean')
+            ).round(4).reset_index()
+            limiting_factors['limiting_factor'] = limiting_factors['limiting_factor'].astype(str)
+            limiting_factors = limiting_factors.sort_values(['crop_name', 'affected_areas'], ascending=[True, False])
+            
+            logger.info("✅ 作物适宜性分析完成")
+            
+            return {
+                'crop_suitability_stats': crop_suitability_stats.reset_index(drop=True),
+                'best_planting_areas': best_planting_areas.reset_index(drop=True),
+                'zoning_optimization': zoning_optimization,
+                'limiting_factors': limiting_factors.reset_index(drop=True)
+            }
+            
+        except Exception as e:
+            logger.error(f"❌ 作物适宜性分析失败: {e}")
+            return None
+    
+    def _zoning_optimization(self, suitability_df, frame, min_grids=10):
+        """按 (区划, 作物) 汇总网格，县市集合由 (分组编号, 县市编码) 去重后一次切分得到"""
+        has_zone = suitability_df['zone_id'].notna().to_numpy()
+        zones = pd.DataFrame({
+            'zone_id': suitability_df['zone_id'].array[has_zone],
+            'crop_name': frame['crop_name'].array[has_zone],
+            'comprehensive_suitability': frame['comprehensive_suitability'].to_numpy()[has_zone],
+            'center_lat': suitability_df['center_lat'].to_numpy()[has_zone],
+            'center_lon': suitability_df['center_lon'].to_numpy()[has_zone]
+        })
+        grouped = zones.groupby(['zone_id', 'crop_name'], sort=True, observed=True)
+        summary = grouped.agg(
+            grid_count=('comprehensive_suitability', 'size'),
+            avg_suitability=('comprehensive_suitability', 'mean'),
+            zone_center_lat=('center_lat', 'mean'),
+            zone_center_lon=('center_lon', 'mean')
+        ).round(4).reset_index()
+        
+        # 县市集合：类别编码去重后按分组编号排序，再按分组边界切分
+        county = pd.Categorical(suitability_df['county'].array[has_zone])
+        pairs = pd.DataFrame({'group': grouped.ngroup().to_numpy(), 'county': county.codes})
+        pairs = pairs[pairs['county'] >= 0].drop_duplicates().sort_values(['group', 'county'])
+        group_ids = pairs['group'].to_numpy()
+        boundaries = np.searchsorted(group_ids, np.arange(len(summary) + 1))
+        categories = county.categories.to_numpy()
+        county_codes = pairs['county'].to_numpy()
+        summary['counties'] = [categories[county_codes[start:end]].tolist()
+                               for start, end in zip(boundaries[:-1], boundaries[1:])]
+        
+        summary = summary[summary['grid_count'] >= min_grids]
+        return summary.sort_values(['zone_id', 'avg_suitability'], ascending=[True, False]).reset_index(drop=True)
+    
     def generate_comprehensive_report(self):
         """生成综合分析报告"""
         try:
@@ -245,8 +467,11 @@ class RealDataConnector:
             
             # 获取所有分析结果
             temp_analysis = self.analyze_temperature_trends()
+            precip_analysis = self.analyze_precipitation()
             soil_analysis = self.analyze_soil_distribution()
             crop_analysis = self.analyze_crop_requirements()
+            crop_climate_analysis = self.analyze_crop_climate()
+            suitability_analysis = self.analyze_crop_suitability()
             
             # 组织报告数据
             report_data = {}
@@ -254,12 +479,21 @@ class RealDataConnector:
             if temp_analysis:
                 report_data['temperature'] = temp_analysis
             
+            if precip_analysis:
+                report_data['precipitation'] = precip_analysis
+            
             if soil_analysis:
                 report_data['soil'] = soil_analysis
             
             if crop_analysis:
                 report_data['crop'] = crop_analysis
             
+            if crop_climate_analysis:
+                report_data['crop_climate'] = crop_climate_analysis
+            
+            if suitability_analysis:
+                report_data['suitability'] = suitability_analysis
+            
             logger.info("✅ 综合分析报告生成完成")
             return report_data
             
@@ -269,9 +503,7 @@ class RealDataConnector:
     
     def close(self):
         """关闭连接"""
-        if self.connection:
-            self.connection.close()
-            logger.info("🔒 MySQL连接已关闭")
+        self.source.close()
 
 
 def main():
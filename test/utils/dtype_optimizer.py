@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+数据类型优化
+读取数据表后按表结构转换列类型：低基数字符串转为类别型，测量值降为 float32，
+整数列降为最小整数类型（含缺失值时使用可空整数类型），并记录每张表优化前后的内存占用。
+未在表结构中列出的浮点列保持浮点类型：取值恰好全为整数的测量值（如整度气温、整毫米降水）
+转为可空整数后无法再转换为含 NaN 的 float64 数组
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 逐月、季节与年平均温度列（temperature_data；月份列也用于宽表格式的 climate_precipitation）
+MONTH_COLUMNS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct_val', 'nov', 'dec_val']
+SEASON_COLUMNS = ['winter', 'spring', 'summer', 'autumn', 'annual']
+
+# climate_precipitation 中可能的降水量列名
+PRECIPITATION_COLUMNS = ['precipitation', 'precip', 'prcp', 'rainfall', 'pre', 'value']
+
+# 各表的列类型：category / float32 / integer（自动选择最小整数类型）
+TABLE_SCHEMAS = {
+    'soil_profiles': {
+        'id': 'integer',
+        'county_name': 'category',
+        'soil_name': 'category',
+        'ph_value': 'float32',
+        'organic_matter': 'float32',
+        'total_nitrogen': 'float32',
+        'available_phosphorus': 'float32',
+        'available_potassium': 'float32'
+    },
+    'crop_requirements': {
+        'id': 'integer',
+        'category': 'category',
+        'crop_type': 'category',
+        'min_temperature_min': 'float32',
+        'min_temperature_max': 'float32',
+        'optimal_temperature_min': 'float32',
+        'optimal_temperature_max': 'float32',
+        'max_temperature_min': 'float32',
+        'max_temperature_max': 'float32',
+        'ph_min': 'float32',
+        'ph_max': 'float32'
+    },
+    'temperature_data': {
+        'id': 'integer',
+        'year_val': 'integer',
+        **{column: 'float32' for column in MONTH_COLUMNS + SEASON_COLUMNS}
+    },
+    'climate_precipitation': {
+        'id': 'integer',
+        **{column: 'float32' for column in PRECIPITATION_COLUMNS + MONTH_COLUMNS}
+    },
+    'suitability_results': {
+        'id': 'integer',
+        'crop_name': 'category',
+        'suitability_level': 'category',
+        'county': 'category',
+        'temp_suitability': 'float32',
+        'precip_suitability': 'float32',
+        'soil_suitability': 'float32',
+        'comprehensive_suitability': 'float32'
+    }
+}
+
+# 未在表结构中列出的字符串列：不同值占比不超过该比例时转为类别型
+CATEGORY_MAX_RATIO = 0.5
+
+# 可空整数类型（按取值范围从小到大选择）
+NULLABLE_INT_TYPES = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+def _is_integral(series):
+    """非缺失值是否全部为整数"""
+    values = series.dropna().to_numpy()
+    return len(values) > 0 and bool(np.all(np.mod(values, 1) == 0))
+
+
+def to_smallest_integer(series):
+    """转换为能容纳取值范围的最小整数类型，含缺失值时使用可空整数类型"""
+    if not series.hasnans:
+        return pd.to_numeric(series, downcast='integer')
+
+    low, high = series.min(), series.max()
+    for dtype in NULLABLE_INT_TYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+    return series
+
+
+def infer_column_type(series):
+    """未在表结构中列出的列：推断目标类型（无需转换时返回 None）"""
+    if series.dtype == object:
+        if len(series) and series.nunique(dropna=True) <= len(series) * CATEGORY_MAX_RATIO:
+            return 'category'
+    elif pd.api.types.is_integer_dtype(series.dtype):
+        return 'integer'
+    return None
+
+
+def convert_column(series, target):
+    if target == 'category':
+        return series.astype('category')
+    if target == 'integer':
+        if pd.api.types.is_float_dtype(series.dtype) and not _is_integral(series):
+            return series
+        return to_smallest_integer(series)
+    return series.astype(target)
+
+
+def optimize_dtypes(df, schema=None):
+    """
+    按表结构优化列类型，返回 (优化后的 DataFrame, 内存报告)
+    内存报告包含优化前后的字节数与各列类型变化
+    """
+    schema = schema or {}
+    before = int(df.memory_usage(deep=True).sum())
+    columns = {}
+    changes = {}
+
+    for column in df.columns:
+        series = df[column]
+        target = schema.get(column) or infer_column_type(series)
+        if target is not None:
+            try:
+                converted = convert_column(series, target)
+            except (TypeError, ValueError) as e:
+                logger.warning(f"⚠️ 列 {column} 无法转换为 {target}: {e}")
+                converted = series
+            if converted.dtype != series.dtype:
+                changes[column] = f"{series.dtype} → {converted.dtype}"
+            series = converted
+        columns[column] = series
+
+    optimized = pd.DataFrame(columns, index=df.index)
+    after = int(optimized.memory_usage(deep=True).sum())
+    report = {
+        'rows': len(optimized),
+        'memory_before_mb': round(before / 1024 / 1024, 3),
+        'memory_after_mb': round(after / 1024 / 1024, 3),
+        'reduction_ratio': round(before / after, 2) if after else None,
+        'dtype_changes': changes
+    }
+    return optimized, report
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+DuckDB 嵌入式分析引擎
+单机部署时替代 Spark：数据读取与 RealDataConnector 相同，读入的表直接注册到进程内的
+DuckDB（pandas DataFrame / Arrow 表零拷贝扫描，也可挂载 Parquet 列式快照），
+土壤分布、pH分级、县市土壤质量与作物pH适宜土壤占比执行与 Spark 引擎相同的SQL，
+结果以 pandas DataFrame 或 Arrow 表返回
+"""
+
+import os
+import sys
+import threading
+import logging
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_engine import SUITABILITY_TABLE
+from utils.database_connector import RealDataConnector
+from utils.analysis_sql import (SOIL_TYPE_DISTRIBUTION_SQL, PH_DISTRIBUTION_SQL, COUNTY_SOIL_QUALITY_SQL,
+                                CROP_PH_COMPATIBILITY_SQL, COUNTY_PH_COMPATIBILITY_SQL)
+
+logger = logging.getLogger(__name__)
+
+
+class DuckDBConnector(RealDataConnector):
+    """基于 DuckDB 的分析引擎（聚合分析在 DuckDB 中执行，其余分析沿用 pandas）"""
+
+    name = 'duckdb'
+
+    def __init__(self, mysql_config=None, data_source=None):
+        if not DUCKDB_AVAILABLE:
+            raise ImportError("未安装 duckdb，无法使用 DuckDB 分析引擎")
+
+        super().__init__(mysql_config, data_source=data_source)
+        self.duck = duckdb.connect(':memory:')
+        self.registered = set()
+        # DuckDB 连接不能被多个线程同时使用
+        self._duck_lock = threading.Lock()
+
+    def register_table(self, table_name, source):
+        """
+        注册数据表：source 可以是 pandas DataFrame、Arrow 表，
+        或 Parquet/CSV 快照文件路径（创建为视图，查询时直接扫描文件）
+        """
+        with self._duck_lock:
+            if isinstance(source, str):
+                reader = 'read_parquet' if source.endswith('.parquet') else 'read_csv_auto'
+                path = source.replace("'", "''")
+                self.duck.execute(f"CREATE OR REPLACE VIEW {table_name} AS SELECT * FROM {reader}('{path}')")
+            else:
+                self.duck.register(table_name, source)
+            self.registered.add(table_name)
+            self.data_version += 1
+
+    def load_table(self, table_name, df):
+        """载入数据表并注册到 DuckDB"""
+        df = super().load_table(table_name, df)
+        self.register_table(table_name, df)
+        return df
+
+    def query(self, sql, arrow=False):
+        """执行SQL，返回 pandas DataFrame（arrow=True 时返回 Arrow 表）"""
+        with self._duck_lock:
+            result = self.duck.execute(sql)
+            return result.arrow() if arrow else result.df()
+
+    def analyze_soil_distribution(self):
+        """分析土壤分布"""
+        try:
+            logger.info("🌱 开始分析土壤分布（DuckDB）...")
+
+            if 'soil_profiles' not in self.registered:
+                return None
+
+            soil_type_dist = self.query(SOIL_TYPE_DISTRIBUTION_SQL)
+            ph_distribution = self.query(PH_DISTRIBUTION_SQL)
+            county_soil_quality = self.query(COUNTY_SOIL_QUALITY_SQL)
+
+            logger.info("✅ 土壤分布分析完成")
+
+            return {
+                'soil_type_distribution': soil_type_dist,
+                'ph_distribution': ph_distribution,
+                'county_soil_quality': county_soil_quality
+            }
+
+        except Exception as e:
+            logger.error(f"❌ 土壤分布分析失败: {e}")
+            return None
+
+    def compute_ph_compatibility(self):
+        """各作物pH适宜土壤占比（在 DuckDB 中执行与 Spark 引擎相同的SQL）"""
+        if not {'soil_profiles', 'crop_requirements'} <= self.registered:
+            return None
+        return self.cached_result('ph_compatibility', lambda: (self.query(CROP_PH_COMPATIBILITY_SQL),
+                                                               self.query(COUNTY_PH_COMPATIBILITY_SQL)))
+
+    def analyze_crop_suitability(self):
+        """
+        分析作物适宜性（沿用 pandas 向量化分析，统计、限制因子与区划一次完成，
+        不另外复制网格表到 DuckDB 重复统计）
+        """
+        if SUITABILITY_TABLE in self.registered and SUITABILITY_TABLE not in self.data_cache:
+            # 适宜性结果来自快照文件时读入 pandas
+            self.data_cache[SUITABILITY_TABLE] = self.query(f"SELECT * FROM {SUITABILITY_TABLE}")
+
+        return super().analyze_crop_suitability()
+
+    def close(self):
+        """关闭MySQL连接与 DuckDB"""
+        super().close()
+        with self._duck_lock:
+            self.duck.close()
+            self.registered.clear()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+多分辨率地图数据服务
+按缩放级别预生成简化的GeoJSON / 量化TopoJSON，并预先计算压缩字节与ETag
+"""
+
+import os
+import json
+import gzip
+import hashlib
+import threading
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 细节级别 → Douglas-Peucker 简化容差（单位：度），0 表示保留原始坐标
+DETAIL_TOLERANCES = {
+    'low': 0.02,
+    'medium': 0.005,
+    'high': 0.0
+}
+
+# 地图缩放级别达到该值时切换到对应细节级别
+ZOOM_DETAIL_THRESHOLDS = [(3.0, 'high'), (1.8, 'medium'), (0.0, 'low')]
+
+# TopoJSON 量化精度
+TOPOJSON_QUANTIZATION = 10000
+
+GEO_FORMATS = ['geojson', 'topojson']
+
+
+def detail_for_zoom(zoom):
+    """根据地图缩放级别选择细节级别"""
+    for threshold, detail in ZOOM_DETAIL_THRESHOLDS:
+        if zoom >= threshold:
+            return detail
+    return 'low'
+
+
+def douglas_peucker(points, tolerance):
+    """
+    Douglas-Peucker 折线简化
+    使用显式栈代替递归，每段的点到线距离一次性向量化计算
+    """
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    if tolerance <= 0 or n <= 2:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[start + 1:end]
+        a, b = points[start], points[end]
+        ab = b - a
+        length = np.hypot(ab[0], ab[1])
+        if length == 0:
+            dists = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+        else:
+            dists = np.abs(ab[0] * (segment[:, 1] - a[1]) - ab[1] * (segment[:, 0] - a[0])) / length
+        idx = int(np.argmax(dists))
+        if dists[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep]
+
+
+def simplify_ring(ring, tolerance):
+    """简化闭合环，简化后点数不足时保留原始环"""
+    simplified = douglas_peucker(ring, tolerance)
+    if len(simplified) < 4:
+        return np.asarray(ring, dtype=float)
+    return simplified
+
+
+def _polygons(geometry):
+    """统一返回多边形列表（每个多边形为环列表）"""
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    raise ValueError(f"不支持的几何类型: {geometry['type']}")
+
+
+def simplify_geojson(geojson, tolerance):
+    """生成简化后的GeoJSON（坐标保留6位小数）"""
+    features = []
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        polygons = [
+            [np.round(simplify_ring(ring, tolerance), 6).tolist() for ring in polygon]
+            for polygon in _polygons(geometry)
+        ]
+        if geometry['type'] == 'Polygon':
+            coordinates = polygons[0]
+        else:
+            coordinates = polygons
+        features.append({
+            'type': 'Feature',
+            'properties': feature.get('properties', {}),
+            'geometry': {'type': geometry['type'], 'coordinates': coordinates}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def geojson_to_topojson(geojson, quantization=TOPOJSON_QUANTIZATION, object_name='hunan'):
+    """
+    将GeoJSON编码为量化TopoJSON
+    每个环编码为一条增量整数弧，完全相同（含反向）的环共享同一条弧
+    """
+    rings = [
+        np.asarray(ring, dtype=float)
+        for feature in geojson['features']
+        for polygon in _polygons(feature['geometry'])
+        for ring in polygon
+    ]
+    all_points = np.vstack(rings)
+    x0, y0 = all_points.min(axis=0)
+    x1, y1 = all_points.max(axis=0)
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    arcs = []
+    arc_index = {}
+
+    def encode_ring(ring):
+        q = np.column_stack([
+            np.round((ring[:, 0] - x0) / kx),
+            np.round((ring[:, 1] - y0) / ky)
+        ]).astype(np.int64)
+        # 去除量化后重复的相邻点
+        if len(q) > 1:
+            q = q[np.r_[True, np.any(np.diff(q, axis=0) != 0, axis=1)]]
+        key = q.tobytes()
+        if key in arc_index:
+            return arc_index[key]
+        reverse_key = q[::-1].tobytes()
+        if reverse_key in arc_index:
+            return ~arc_index[reverse_key]
+        deltas = np.vstack([q[:1], np.diff(q, axis=0)])
+        arcs.append(deltas.tolist())
+        arc_index[key] = len(arcs) - 1
+        return arc_index[key]
+
+    geometries = []
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        polygons = [
+            [[encode_ring(np.asarray(ring, dtype=float))] for ring in polygon]
+            for polygon in _polygons(geometry)
+        ]
+        geometries.append({
+            'type': geometry['type'],
+            'arcs': polygons[0] if geometry['type'] == 'Polygon' else polygons,
+            'properties': feature.get('properties', {})
+        })
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [kx, ky], 'translate': [float(x0), float(y0)]},
+        'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': arcs
+    }
+
+
+class GeoVariant:
+    """某一细节级别、某一格式的预编码地图数据"""
+
+    def __init__(self, payload):
+        self.raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzipped = gzip.compress(self.raw, compresslevel=9)
+        self.etag = hashlib.sha1(self.raw).hexdigest()[:20]
+
+
+class GeoService:
+    """湖南省地图多分辨率服务，源文件变化时自动重建"""
+
+    def __init__(self, source_path, object_name='hunan'):
+        self.source_path = source_path
+        self.object_name = object_name
+        self._variants = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        """读取源GeoJSON并生成全部细节级别与格式"""
+        with open(self.source_path, 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+
+        variants = {}
+        for detail, tolerance in DETAIL_TOLERANCES.items():
+            simplified = simplify_geojson(geojson, tolerance)
+            variants[(detail, 'geojson')] = GeoVariant(simplified)
+            variants[(detail, 'topojson')] = GeoVariant(
+                geojson_to_topojson(simplified, object_name=self.object_name))
+
+        sizes = ', '.join(
+            f"{detail}/{fmt}={len(v.raw)}B(gzip {len(v.gzipped)}B)"
+            for (detail, fmt), v in variants.items()
+        )
+        logger.info(f"✅ 地图数据预编码完成: {sizes}")
+        return variants
+
+    def feature_centers(self):
+        """各区域名称 → 中心点经纬度（优先使用属性中的cp）"""
+        with open(self.source_path, 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+        centers = {}
+        for feature in geojson['features']:
+            properties = feature.get('properties', {})
+            center = properties.get('cp')
+            if not center:
+                points = np.vstack([np.asarray(ring, dtype=float)
+                                    for polygon in _polygons(feature['geometry']) for ring in polygon])
+                center = points.mean(axis=0).tolist()
+            centers[properties.get('name')] = center
+        return centers
+
+    def get_variant(self, detail='medium', fmt='geojson'):
+        """获取指定细节级别与格式的预编码数据"""
+        if detail not in DETAIL_TOLERANCES:
+            raise ValueError(f"不支持的细节级别: {detail}")
+        if fmt not in GEO_FORMATS:
+            raise ValueError(f"不支持的地图格式: {fmt}")
+
+        mtime = os.path.getmtime(self.source_path)
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._variants = self._build()
+                    self._mtime = mtime
+        return self._variants[(detail, fmt)]
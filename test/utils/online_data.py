@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+联网农业数据获取
+市场、天气、政策、产业等数据源并发请求，共用带连接池与重试的 requests.Session，
+每个数据源单独超时，结果按 (作物, 数据源) 缓存；超时或失败的数据源使用模拟数据，
+报告生成不会被最慢的上游阻塞
+
+缓存采用 stale-while-revalidate：超过 ttl 但未超过 stale_cap 的数据立即返回（标记为过期），
+同时在后台刷新；刷新失败时继续使用旧数据，直到超过 stale_cap
+"""
+
+import time
+import zlib
+import threading
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# 数据源 → 返回结果中包含的字段
+SOURCE_FIELDS = {
+    'market': ['market_price'],
+    'weather': ['weather_forecast'],
+    'policy': ['policy_updates', 'technology_trends'],
+    'industry': ['industry_analysis']
+}
+
+DEFAULT_ONLINE_CONFIG = {
+    'base_url': None,          # 为空时不发起网络请求，直接使用模拟数据
+    'sources': {
+        'market': {'path': '/market', 'timeout': 2.0},
+        'weather': {'path': '/weather', 'timeout': 2.0},
+        'policy': {'path': '/policy', 'timeout': 3.0},
+        'industry': {'path': '/industry', 'timeout': 3.0}
+    },
+    'retries': 2,              # 连接错误与5xx的重试次数
+    'backoff': 0.2,            # 重试退避系数（秒）
+    'pool_size': 8,            # 连接池大小
+    'max_workers': 8,          # 并发请求线程数
+    'deadline': 4.0,           # 一次获取的总等待上限（秒）
+    'ttl': 600,                # 缓存有效期（秒）
+    'stale_cap': 21600         # 过期数据最长可继续使用的时间（秒）
+}
+
+
+def _stable_hash(*parts):
+    """跨进程稳定的哈希（内置 hash 对字符串有随机化）"""
+    return zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8'))
+
+
+def simulated_source(crop_type, source):
+    """某数据源的模拟数据（上游不可用时的兜底）"""
+    h = _stable_hash(crop_type, source)
+    if source == 'market':
+        return {'market_price': {
+            'current': round(2.8 + h % 10 * 0.1, 2),
+            'trend': '上涨' if h % 2 == 0 else '稳定',
+            'update_time': datetime.now().strftime('%Y-%m-%d %H:%M')
+        }}
+    if source == 'weather':
+        return {'weather_forecast': {
+            'temperature': f"{18 + h % 15}°C - {25 + h % 10}°C",
+            'precipitation': f"{50 + h % 100}mm",
+            'conditions': '适宜种植' if h % 3 != 0 else '需要关注'
+        }}
+    if source == 'policy':
+        return {
+            'policy_updates': [
+                f"2024年{crop_type}种植补贴政策已发布",
+                f"湖南省{crop_type}产业发展规划(2024-2030)",
+                f"农业农村部关于{crop_type}绿色发展指导意见"
+            ],
+            'technology_trends': [
+                f"{crop_type}智能化种植技术应用",
+                f"新型{crop_type}品种推广情况",
+                f"{crop_type}病虫害防控新技术"
+            ]
+        }
+    if source == 'industry':
+        return {'industry_analysis': {
+            'production_area': f"{1000 + h % 500}万亩",
+            'yield_forecast': f"{3.5 + h % 20 * 0.1:.1f}吨/亩",
+            'market_demand': '需求旺盛' if h % 2 == 0 else '需求平稳'
+        }}
+    raise ValueError(f"未知的数据源: {source}")
+
+
+def create_session(retries=2, backoff=0.2, pool_size=8):
+    """带连接池（keep-alive）与重试策略的 HTTP 会话"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        backoff_factor=backoff,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET'])
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class OnlineDataFetcher:
+    """并发、连接池化、带缓存的联网数据获取器"""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_ONLINE_CONFIG, **(config or {})}
+        self.sources = self.config['sources']
+        self._session = None
+        self._executor = ThreadPoolExecutor(max_workers=self.config['max_workers'],
+                                            thread_name_prefix='online-data')
+        self._cache = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """共享的 HTTP 会话（首次使用时创建）"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = create_session(self.config['retries'], self.config['backoff'],
+                                                   self.config['pool_size'])
+        return self._session
+
+    def _cached(self, crop_type, source):
+        """缓存条目 (获取时间, 值)，超过 stale_cap 的条目视为不存在"""
+        with self._lock:
+            entry = self._cache.get((crop_type, source))
+        if entry is not None and time.time() - entry[0] < self.config['stale_cap']:
+            return entry
+        return None
+
+    def _store(self, crop_type, source, value):
+        with self._lock:
+            self._cache[(crop_type, source)] = (time.time(), value)
+
+    def _request(self, crop_type, source):
+        """请求单个数据源，成功后写入缓存"""
+        settings = self.sources[source]
+        url = self.config['base_url'].rstrip('/') + settings['path']
+        response = self.session.get(url, params={'crop': crop_type}, timeout=settings.get('timeout', 2.0))
+        response.raise_for_status()
+        payload = response.json()
+        value = {field: payload[field] for field in SOURCE_FIELDS[source]}
+        self._store(crop_type, source, value)
+        return value
+
+    def _submit(self, crop_type, source, background=False):
+        """
+        提交数据源请求；同一 (作物, 数据源) 已有未完成的请求时复用该请求
+        background 为 True 时由新请求自行记录刷新结果
+        """
+        key = (crop_type, source)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None and not future.done():
+                return future
+            future = self._executor.submit(self._request, crop_type, source)
+            self._inflight[key] = future
+        if background:
+            future.add_done_callback(lambda f: self._log_refresh(crop_type, source, f))
+        return future
+
+    def fetch(self, crop_type):
+        """
+        获取某作物的全部联网数据
+        缓存命中的数据源直接返回，其余并发请求；超过总等待上限或失败的数据源使用模拟数据
+        （超时的请求在后台继续完成，结果写入缓存供下次使用）
+        """
+        start_time = time.time()
+        result = {}
+        origins = {}
+        freshness = {}
+        pending = {}
+
+        for source in self.sources:
+            entry = self._cached(crop_type, source)
+            if entry is not None:
+                fetched_at, value = entry
+                age = time.time() - fetched_at
+                stale = age >= self.config['ttl']
+                if stale:
+                    # 先返回旧数据，后台刷新（失败时旧数据保留到 stale_cap）
+                    self._submit(crop_type, source, background=True)
+                result.update(value)
+                origins[source] = 'stale' if stale else 'cache'
+                freshness[source] = {
+                    'update_time': datetime.fromtimestamp(fetched_at).strftime('%Y-%m-%d %H:%M:%S'),
+                    'age': round(age, 1),
+                    'stale': stale
+                }
+            elif self.config['base_url']:
+                pending[self._submit(crop_type, source)] = source
+            else:
+                result.update(simulated_source(crop_type, source))
+                origins[source] = 'simulated'
+
+        if pending:
+            done, _ = wait(pending, timeout=self.config['deadline'])
+            for future, source in pending.items():
+                if future in done and future.exception() is None:
+                    result.update(future.result())
+                    origins[source] = 'online'
+                    freshness[source] = {
+                        'update_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                        'age': 0.0,
+                        'stale': False
+                    }
+                else:
+                    reason = future.exception() if future in done else '超时'
+                    logger.warning(f"⚠️ 数据源 {source} 获取失败（{reason}），使用模拟数据")
+                    result.update(simulated_source(crop_type, source))
+                    origins[source] = 'simulated'
+
+        result['data_sources'] = origins
+        result['data_freshness'] = freshness
+        logger.info(f"✅ {crop_type} 联网数据获取完成: {origins}, 耗时{time.time() - start_time:.3f}秒")
+        return result
+
+    def _log_refresh(self, crop_type, source, future):
+        """后台刷新结果日志"""
+        if future.exception() is not None:
+            logger.warning(f"⚠️ {crop_type} 数据源 {source} 后台刷新失败，继续使用旧数据: {future.exception()}")
+        else:
+            logger.info(f"🔄 {crop_type} 数据源 {source} 已在后台刷新")
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._cache.clear()
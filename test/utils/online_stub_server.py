@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+联网数据本地模拟服务
+按 OnlineDataFetcher 的接口约定（GET /<数据源>?crop=<作物>）返回模拟数据，
+可为各数据源设置延迟与失败，用于测试并发、超时与重试
+
+用法:
+    python utils/online_stub_server.py --port 5055 --delay weather=3.5 --fail policy
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import logging
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.online_data import SOURCE_FIELDS, simulated_source
+
+logger = logging.getLogger(__name__)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """模拟数据源请求处理"""
+
+    # 使用 HTTP/1.1 以支持 keep-alive
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        source = url.path.strip('/')
+        crop_type = parse_qs(url.query).get('crop', ['rice'])[0]
+        self.server.request_counts[source] = self.server.request_counts.get(source, 0) + 1
+
+        if source not in SOURCE_FIELDS:
+            self._send(404, {'message': f'未知的数据源: {source}'})
+            return
+
+        delay = self.server.delays.get(source, 0)
+        if delay:
+            time.sleep(delay)
+        if source in self.server.failures:
+            self._send(503, {'message': f'{source} 暂不可用'})
+            return
+
+        self._send(200, simulated_source(crop_type, source))
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端已超时断开
+            logger.debug(f"客户端已断开: {self.path}")
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def start_stub_server(host='127.0.0.1', port=0, delays=None, failures=None):
+    """
+    在后台线程启动模拟服务
+    返回 (server, base_url)；server.request_counts 记录各数据源请求次数，调用 server.shutdown() 停止
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.delays = dict(delays or {})
+    server.failures = set(failures or [])
+    server.request_counts = {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    logger.info(f"🧪 联网数据模拟服务已启动: {base_url}")
+    return server, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description='联网数据本地模拟服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--delay', nargs='*', default=[], help='数据源延迟，如 weather=3.5')
+    parser.add_argument('--fail', nargs='*', default=[], help='始终返回503的数据源')
+    args = parser.parse_args()
+
+    delays = {item.split('=')[0]: float(item.split('=')[1]) for item in args.delay}
+    server, base_url = start_stub_server(args.host, args.port, delays, args.fail)
+    print(f"🧪 联网数据模拟服务: {base_url}（设置 ONLINE_DATA_URL={base_url} 后启动系统）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+作物pH适宜土壤占比
+土壤样本按 (县市编号, pH) 排序一次，各作物 × 各县市落在 ph_min..ph_max 内的样本数
+由两次 searchsorted 直接得到，不需要逐作物、逐县市筛选
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 排序键 = 县市编号 × COUNTY_STRIDE + pH（pH 取值在 0-14 之间，不同县市的键区间互不重叠）
+COUNTY_STRIDE = 100.0
+
+# 比较前 pH 统一保留的小数位数（消除 float32 存储带来的边界误差）
+PH_DECIMALS = 2
+
+
+def _ph_values(series):
+    return np.round(series.to_numpy(dtype='float64'), PH_DECIMALS)
+
+
+def ph_compatibility(soil_df, crop_df):
+    """
+    各作物的pH适宜土壤占比
+    返回 (作物总体占比, 作物 × 县市占比) 两个 DataFrame
+    """
+    soil = soil_df[['county_name', 'ph_value']].dropna()
+    crops = crop_df.dropna(subset=['crop_type', 'ph_min', 'ph_max']).reset_index(drop=True)
+
+    county_codes, counties = pd.factorize(soil['county_name'], sort=True)
+    keys = np.sort(county_codes * COUNTY_STRIDE + _ph_values(soil['ph_value']))
+    county_totals = np.bincount(county_codes, minlength=len(counties))
+
+    # (作物, 县市) 两个边界的排序位置之差即为区间内的样本数
+    offsets = np.arange(len(counties)) * COUNTY_STRIDE
+    low = offsets[None, :] + _ph_values(crops['ph_min'])[:, None]
+    high = offsets[None, :] + _ph_values(crops['ph_max'])[:, None]
+    compatible = np.searchsorted(keys, high, side='right') - np.searchsorted(keys, low, side='left')
+    compatible = np.where(high >= low, compatible, 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        county_share = compatible / county_totals[None, :] * 100
+    total = county_totals.sum()
+    overall = pd.DataFrame({
+        'crop_type': crops['crop_type'].astype(str),
+        'category': crops['category'].astype(str) if 'category' in crops else None,
+        'ph_min': _ph_values(crops['ph_min']),
+        'ph_max': _ph_values(crops['ph_max']),
+        'compatible_samples': compatible.sum(axis=1),
+        'total_samples': total,
+        'compatible_share': (compatible.sum(axis=1) / total * 100).round(2) if total else np.nan
+    })
+
+    by_county = pd.DataFrame({
+        'crop_type': np.repeat(overall['crop_type'].to_numpy(), len(counties)),
+        'county_name': np.tile(np.asarray(counties, dtype=object), len(crops)),
+        'compatible_samples': compatible.ravel(),
+        'sample_count': np.tile(county_totals, len(crops)),
+        'compatible_share': county_share.ravel().round(2)
+    })
+
+    logger.info(f"✅ pH适宜土壤占比计算完成（{len(crops)}种作物 × {len(counties)}个县市）")
+    return overall, by_county
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""
+降水分析
+climate_precipitation 统一整理为 (区域, 年, 月[, 日], 降水量) 记录后整体计算：
+月/季降水量与年际变率（区域-年 × 月 矩阵列归约，季节合计为矩阵乘法），
+干旱期指数（按区域-年分段的游程编码），以及各区域的水分适宜度评分
+"""
+
+import logging
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from utils.climate_trends import region_column, DEFAULT_REGION
+
+logger = logging.getLogger(__name__)
+
+# 降水量、日期与年月日列的候选列名（按顺序取第一个存在的列）
+VALUE_COLUMNS = ['precipitation', 'precip', 'prcp', 'rainfall', 'pre', 'value']
+DATE_COLUMNS = ['date', 'obs_date', 'record_date', 'observation_date']
+YEAR_COLUMNS = ['year_val', 'year']
+MONTH_NUMBER_COLUMNS = ['month_val', 'month']
+DAY_COLUMNS = ['day_val', 'day']
+
+# 宽表格式（与 temperature_data 相同的 jan…dec_val 月份列）
+WIDE_MONTH_COLUMNS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct_val', 'nov', 'dec_val']
+
+# 季节划分（同一年的12、1、2月记为冬季）
+SEASON_KEYS = ['spring', 'summer', 'autumn', 'winter']
+SEASON_NAMES = ['春季', '夏季', '秋季', '冬季']
+MONTH_SEASON = np.array([3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3])
+
+# 干旱期：日数据中日降水量低于 WET_DAY_MM 记为无雨日，连续 DRY_SPELL_DAYS 天以上记为一次干旱期；
+# 月数据中月降水量低于 DRY_MONTH_MM 记为干旱月，连续 DRY_SPELL_MONTHS 个月以上记为一次干旱期
+WET_DAY_MM = 1.0
+DRY_SPELL_DAYS = 10
+DRY_MONTH_MM = 30.0
+DRY_SPELL_MONTHS = 2
+
+# 水分适宜度：年降水量处于适宜区间得100分，区间外按相对偏差线性扣分，
+# 年际变异系数超过 CV_TOLERANCE 与干旱期次数分别扣分（各自最多扣 MAX_PENALTY 分）
+WATER_OPTIMAL_RANGE = (1000.0, 1800.0)
+CV_TOLERANCE = 0.15
+DRY_SPELL_PENALTY = 4.0
+MAX_PENALTY = 20.0
+
+
+def _first_column(df, candidates):
+    return next((column for column in candidates if column in df.columns), None)
+
+
+def normalize_precipitation(df):
+    """
+    整理为降水记录表：region, year_val, month, [day_index], precip
+    返回 (记录表, 'daily' 或 'monthly')
+    """
+    region = region_column(df)
+    regions = df[region].astype(str).to_numpy() if region else np.full(len(df), DEFAULT_REGION, dtype=object)
+    year = _first_column(df, YEAR_COLUMNS)
+    value = _first_column(df, VALUE_COLUMNS)
+
+    if value is None:
+        months = [column for column in WIDE_MONTH_COLUMNS if column in df.columns]
+        if year is None or not months:
+            raise ValueError("climate_precipitation 中没有可识别的降水量列")
+        # 宽表：每行一个区域-年，月份列展开为月记录
+        values = df[months].to_numpy(dtype='float64')
+        records = pd.DataFrame({
+            'region': np.repeat(regions, len(months)),
+            'year_val': np.repeat(df[year].to_numpy(dtype='float64'), len(months)),
+            'month': np.tile([WIDE_MONTH_COLUMNS.index(m) + 1 for m in months], len(df)),
+            'precip': values.ravel()
+        })
+        return records.dropna(subset=['year_val']), 'monthly'
+
+    date = _first_column(df, DATE_COLUMNS)
+    month = _first_column(df, MONTH_NUMBER_COLUMNS)
+    day = _first_column(df, DAY_COLUMNS)
+    if date is not None:
+        dates = pd.to_datetime(df[date], errors='coerce')
+    elif year is not None and month is not None and day is not None:
+        dates = pd.to_datetime(pd.DataFrame({'year': df[year], 'month': df[month], 'day': df[day]}), errors='coerce')
+    else:
+        dates = None
+
+    if dates is not None:
+        records = pd.DataFrame({
+            'region': regions,
+            'year_val': dates.dt.year.to_numpy(dtype='float64'),
+            'month': dates.dt.month.to_numpy(dtype='float64'),
+            'day_index': dates.to_numpy(dtype='datetime64[D]').astype('int64'),
+            'precip': df[value].to_numpy(dtype='float64')
+        })
+        records = records[dates.notna().to_numpy()]
+        return records, 'daily'
+
+    if year is None or month is None:
+        raise ValueError("climate_precipitation 中没有可识别的日期或年月列")
+    records = pd.DataFrame({
+        'region': regions,
+        'year_val': df[year].to_numpy(dtype='float64'),
+        'month': df[month].to_numpy(dtype='float64'),
+        'precip': df[value].to_numpy(dtype='float64')
+    })
+    return records.dropna(subset=['year_val', 'month']), 'monthly'
+
+
+def monthly_totals(records):
+    """(区域-年) × 12个月 的月降水量矩阵，返回 (行索引, 矩阵)"""
+    totals = records.groupby(['region', 'year_val', 'month'], sort=True)['precip'].sum(min_count=1)
+    wide = totals.unstack('month').reindex(columns=range(1, 13))
+    return wide.index, wide.to_numpy(dtype='float64')
+
+
+def _column_stats(matrix):
+    """按列计算平均、标准差与变异系数（全为缺失值的列得到 NaN）"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(matrix, axis=0)
+        std = np.nanstd(matrix, axis=0, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cv = np.where(mean > 0, std / mean, np.nan)
+    return mean, std, cv
+
+
+def dry_spell_stats(group_codes, dry, continues, min_length, n_groups):
+    """
+    游程编码统计各组的最长干旱期与干旱期次数
+    group_codes 为已排序的组编号，continues 表示该记录与上一条记录属于同一组且时间连续
+    """
+    previous_dry = np.r_[False, dry[:-1]]
+    starts = dry & ~(continues & previous_dry)
+    run_id = np.cumsum(starts) - 1
+    lengths = np.bincount(run_id[dry], minlength=int(starts.sum()))
+    run_group = group_codes[starts]
+
+    longest = np.zeros(n_groups)
+    np.maximum.at(longest, run_group, lengths)
+    spells = np.bincount(run_group, weights=(lengths >= min_length).astype('float64'), minlength=n_groups)
+    return longest, spells
+
+
+def annual_indices(records, frequency):
+    """各区域逐年降水量、雨日、最长干旱期与干旱期次数（缺测记录中断干旱期）"""
+    if frequency == 'daily':
+        records = records.sort_values(['region', 'day_index'], kind='stable')
+        step = records['day_index'].to_numpy()
+        dry = records['precip'].to_numpy() < WET_DAY_MM
+        min_length = DRY_SPELL_DAYS
+    else:
+        monthly = records.groupby(['region', 'year_val', 'month'], sort=True)['precip'].sum(min_count=1).reset_index()
+        records = monthly
+        step = (monthly['year_val'].to_numpy() * 12 + monthly['month'].to_numpy()).astype('int64')
+        dry = monthly['precip'].to_numpy() < DRY_MONTH_MM
+        min_length = DRY_SPELL_MONTHS
+
+    grouped = records.groupby(['region', 'year_val'], sort=True)
+    codes = grouped.ngroup().to_numpy()
+    continues = np.r_[False, (codes[1:] == codes[:-1]) & (np.diff(step) == 1)]
+    longest, spells = dry_spell_stats(codes, dry, continues, min_length, grouped.ngroups)
+
+    result = grouped['precip'].agg(total_precip='sum', max_precip='max').reset_index()
+    if frequency == 'daily':
+        wet = records['precip'].to_numpy() >= WET_DAY_MM
+        result['wet_days'] = np.bincount(codes, weights=wet.astype('float64'), minlength=grouped.ngroups).astype(int)
+    result['max_dry_spell'] = longest.astype(int)
+    result['dry_spells'] = spells.astype(int)
+    result['year_val'] = result['year_val'].astype('int64')
+    return result.round({'total_precip': 1, 'max_precip': 1})
+
+
+def water_scores(annual_precip, annual_cv, dry_spells):
+    """水分适宜度评分（0-100）"""
+    low, high = WATER_OPTIMAL_RANGE
+    annual_precip = np.asarray(annual_precip, dtype='float64')
+    base = np.where(annual_precip < low, 100 - (low - annual_precip) / low * 150,
+                    np.where(annual_precip > high, 100 - (annual_precip - high) / high * 100, 100.0))
+    cv_penalty = np.clip((np.nan_to_num(annual_cv) - CV_TOLERANCE) * 100, 0, MAX_PENALTY)
+    spell_penalty = np.clip(np.nan_to_num(dry_spells) * DRY_SPELL_PENALTY, 0, MAX_PENALTY)
+    return np.clip(base - cv_penalty - spell_penalty, 0, 100)
+
+
+def precipitation_analysis(df):
+    """
+    降水分析：月度与季节降水量及变率、各区域逐年干旱指数、各区域水分适宜度
+    """
+    logger.info("🌧️ 开始分析降水...")
+    records, frequency = normalize_precipitation(df)
+
+    # 月度降水：区域-年 × 月 矩阵按列归约
+    _, matrix = monthly_totals(records)
+    mean, std, cv = _column_stats(matrix)
+    counts = np.sum(~np.isnan(matrix), axis=0)
+    monthly_pattern = pd.DataFrame({
+        'month': np.arange(1, 13),
+        'month_name': [f'{m}月' for m in range(1, 13)],
+        'avg_precip': mean.round(1),
+        'std_precip': std.round(1),
+        'cv': cv.round(3),
+        'sample_count': counts
+    })[counts > 0].reset_index(drop=True)
+
+    # 季节降水：月矩阵乘以 月→季 指示矩阵
+    indicator = np.eye(len(SEASON_KEYS))[MONTH_SEASON]
+    season_mean, _, season_cv = _column_stats(matrix @ indicator)
+    seasonal_pattern = pd.DataFrame({
+        'season': SEASON_KEYS,
+        'season_name': SEASON_NAMES,
+        'avg_precip': season_mean.round(1),
+        'cv': season_cv.round(3),
+        'share': (season_mean / np.nansum(season_mean) * 100).round(1)
+    })
+
+    # 逐年干旱指数与各区域汇总
+    annual = annual_indices(records, frequency)
+    regional = annual.groupby('region', sort=True).agg(
+        avg_annual_precip=('total_precip', 'mean'),
+        std_annual_precip=('total_precip', 'std'),
+        avg_max_dry_spell=('max_dry_spell', 'mean'),
+        avg_dry_spells=('dry_spells', 'mean'),
+        years=('year_val', 'count')
+    ).reset_index()
+    regional['annual_cv'] = regional['std_annual_precip'] / regional['avg_annual_precip']
+    regional['water_score'] = water_scores(regional['avg_annual_precip'], regional['annual_cv'],
+                                           regional['avg_dry_spells'])
+    regional = regional.drop(columns='std_annual_precip').round(
+        {'avg_annual_precip': 1, 'avg_max_dry_spell': 1, 'avg_dry_spells': 2, 'annual_cv': 3, 'water_score': 1})
+
+    logger.info(f"✅ 降水分析完成（{'逐日' if frequency == 'daily' else '逐月'}数据，{len(regional)}个区域）")
+
+    return {
+        'monthly_pattern': monthly_pattern,
+        'seasonal_pattern': seasonal_pattern,
+        'annual_indices': annual,
+        'regional_water': regional
+    }
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+多作物批量报告任务
+将各作物的报告生成分发到线程池并行执行，记录进度，完成后打包为一个ZIP文件
+"""
+
+import io
+import time
+import uuid
+import zipfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 批量任务线程数
+BATCH_WORKERS = 6
+
+# 已完成任务的保留时间（秒）与最多保留的任务数
+BATCH_JOB_RETENTION = 3600
+BATCH_MAX_JOBS = 50
+
+
+class BatchJob:
+    """一次批量报告任务"""
+
+    def __init__(self, crops, title):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.crops = list(crops)
+        self.title = title
+        self.status = 'pending'
+        self.completed = []
+        self.failed = {}
+        self.files = {}
+        self.archive = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def progress(self):
+        """完成进度（百分比）"""
+        done = len(self.completed) + len(self.failed)
+        return round(done / len(self.crops) * 100, 1) if self.crops else 100.0
+
+    def to_dict(self):
+        """任务状态"""
+        with self.lock:
+            elapsed = (self.finished_at or time.time()) - self.created_at
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'title': self.title,
+                'crops': self.crops,
+                'progress': self.progress,
+                'completed': list(self.completed),
+                'failed': dict(self.failed),
+                'archive_size': len(self.archive) if self.archive else 0,
+                'elapsed': round(elapsed, 3)
+            }
+
+
+class BatchReportManager:
+    """批量报告任务管理器"""
+
+    def __init__(self, workers=BATCH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report-batch')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, crops, title, build_files):
+        """
+        提交批量任务
+        build_files(crop, title) 返回该作物的 {文件名: 字节}，在线程池中并行调用；
+        保留的任务已满且都在运行时不提交，返回 None
+        """
+        job = BatchJob(crops, title)
+        with self._lock:
+            self._expire()
+            if len(self._jobs) >= BATCH_MAX_JOBS:
+                logger.warning(f"⚠️ 批量报告任务已达上限（{BATCH_MAX_JOBS}个均在运行），拒绝新任务")
+                return None
+            self._jobs[job.job_id] = job
+
+        job.status = 'running'
+        logger.info(f"📦 批量报告任务 {job.job_id} 开始: {len(job.crops)}种作物")
+        futures = [self._executor.submit(self._run_crop, job, crop, build_files) for crop in job.crops]
+        threading.Thread(target=self._finish, args=(job, futures), daemon=True).start()
+        return job
+
+    def _run_crop(self, job, crop, build_files):
+        """生成单个作物的报告文件"""
+        try:
+            files = build_files(crop, job.title)
+            with job.lock:
+                job.files[crop] = files
+                job.completed.append(crop)
+        except Exception as e:
+            logger.error(f"❌ 批量报告 {job.job_id} 中 {crop} 生成失败: {e}")
+            with job.lock:
+                job.failed[crop] = str(e)
+
+    def _finish(self, job, futures):
+        """等待全部作物完成后打包ZIP"""
+        for future in futures:
+            future.result()
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for crop in job.crops:
+                for name, content in job.files.get(crop, {}).items():
+                    archive.writestr(f"{crop}/{name}", content)
+
+        with job.lock:
+            job.archive = buffer.getvalue()
+            job.files.clear()
+            job.finished_at = time.time()
+            job.status = 'completed' if job.completed else 'failed'
+
+        logger.info(f"✅ 批量报告任务 {job.job_id} 完成: 成功{len(job.completed)}个, 失败{len(job.failed)}个, "
+                    f"耗时{job.finished_at - job.created_at:.2f}秒")
+
+    def get(self, job_id):
+        """获取任务（不存在时返回None）"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        """清理过期任务，任务数达到上限时再按完成时间清理最早完成的任务；运行中的任务不清理（调用方持有锁）"""
+        now = time.time()
+        for job_id in [j for j, job in self._jobs.items()
+                       if job.finished_at and now - job.finished_at > BATCH_JOB_RETENTION]:
+            del self._jobs[job_id]
+        finished = sorted((job for job in self._jobs.values() if job.finished_at), key=lambda job: job.finished_at)
+        for job in finished[:max(0, len(self._jobs) - BATCH_MAX_JOBS + 1)]:
+            del self._jobs[job.job_id]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+报告缓存
+按 (作物, 标题, 分析数据版本, 联网数据版本) 缓存已生成的报告及其渲染结果，
+相同键的并发请求只构建一次，其余请求等待并共享同一结果
+"""
+
+import time
+import threading
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 报告缓存有效期（秒）
+REPORT_CACHE_TIMEOUT = 1800
+
+# 最多缓存的条目数（超过后淘汰最久未使用的条目）
+REPORT_CACHE_MAX_ENTRIES = 256
+
+
+class _Flight:
+    """一次正在进行的构建"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ReportCache:
+    """带并发去重（single-flight）的报告缓存"""
+
+    def __init__(self, timeout=REPORT_CACHE_TIMEOUT, max_entries=REPORT_CACHE_MAX_ENTRIES):
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'shared': 0}
+
+    def get_or_build(self, key, builder):
+        """
+        获取缓存结果；未命中时由第一个请求调用 builder 构建，
+        同时到达的相同请求等待该次构建完成并共享结果（构建失败时一起收到异常）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.timeout:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._inflight[key] = flight
+                self.stats['misses'] += 1
+            else:
+                self.stats['shared'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = builder()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = (time.time(), flight.value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+        return flight.value
+
+    def clear(self):
+        """清空缓存（正在进行的构建不受影响）"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("🧹 报告缓存已清空")
+
+    def info(self):
+        """缓存状态"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'inflight': len(self._inflight),
+                **self.stats
+            }
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+报告数据流式导出
+各章节与区域明细由生成器逐块产生，按固定大小分块编码后直接写入HTTP响应，
+内存占用与明细行数无关；支持 txt / csv / json / xlsx / parquet
+"""
+
+import json
+import zipfile
+import logging
+import tempfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# 每个响应块的目标字节数
+CHUNK_SIZE = 64 * 1024
+
+# 作物中文名 → 英文代码（用于导出文件名）
+CROP_CODES = {
+    '水稻': 'rice', '玉米': 'corn', '大豆': 'soybean', '小麦': 'wheat',
+    '棉花': 'cotton', '油菜': 'rapeseed', '花生': 'peanut', '红薯': 'sweet_potato',
+    '烟草': 'tobacco', '茶叶': 'tea', '柑橘': 'citrus', '蔬菜': 'vegetables'
+}
+
+
+# 区域明细列：导出列名 → 区划结果列名
+DETAIL_COLUMNS = {
+    '县市名称': 'name',
+    '上级区域': 'parent',
+    '适宜性评分': 'score',
+    '适宜性等级': 'level',
+    '预估面积平方公里': 'area',
+    '温度适宜度': 'temp_score',
+    '土壤适宜度': 'soil_score',
+    '水分适宜度': 'water_score'
+}
+
+# 数值列导出时保留的小数位数（0 位时转为整数）
+DETAIL_DECIMALS = {
+    'score': 1,
+    'area': 0,
+    'temp_score': 1,
+    'soil_score': 1,
+    'water_score': 1
+}
+
+# 每个明细数据块的行数
+DETAIL_CHUNK_ROWS = 20000
+
+
+class RegionDetails:
+    """
+    区域明细（引用区划结果，不复制整张表）
+    按块产生列式 DataFrame，各导出格式逐块写出
+    """
+
+    def __init__(self, level_df):
+        self.level_df = level_df
+
+    def __len__(self):
+        return len(self.level_df)
+
+    def frames(self, chunk_rows=DETAIL_CHUNK_ROWS):
+        """逐块产生带导出列名的 DataFrame（列顺序与 DETAIL_COLUMNS 一致），数值列按 DETAIL_DECIMALS 整列取整"""
+        source = self.level_df
+        for start in range(0, len(source), chunk_rows):
+            part = source.iloc[start:start + chunk_rows]
+            columns = {}
+            for label, column in DETAIL_COLUMNS.items():
+                values = part[column].to_numpy()
+                decimals = DETAIL_DECIMALS.get(column)
+                if decimals == 0:
+                    values = values.round().astype(np.int64)
+                elif decimals is not None:
+                    values = values.round(decimals)
+                columns[label] = values
+            yield pd.DataFrame(columns)
+
+    def __iter__(self):
+        """逐行产生明细记录"""
+        for frame in self.frames():
+            yield from frame.to_dict('records')
+
+
+def _iter_items(title, items):
+    """产生 “【标题】 • 键: 值” 形式的小节"""
+    yield f"【{title}】\n"
+    for key, value in items.items():
+        yield f"  • {key}: {value}\n"
+    yield "\n"
+
+
+def _iter_numbered(title, values):
+    """产生编号列表小节"""
+    yield f"【{title}】\n"
+    for i, value in enumerate(values, 1):
+        yield f"  {i}. {value}\n"
+    yield "\n"
+
+
+def iter_text_report(data):
+    """按章节逐行产生纯文本报告"""
+    yield "湖南省农业种植适宜性区划完整数据报告\n"
+    yield "=" * 60 + "\n\n"
+
+    # 基础信息
+    yield "一、基础信息\n"
+    yield "-" * 30 + "\n"
+    for key, value in data['basic_info'].items():
+        yield f"• {key}: {value}\n"
+    yield "\n"
+
+    # 区划统计
+    yield "二、区划统计分析\n"
+    yield "-" * 30 + "\n"
+    for zone_name, zone_data in data['zoning_statistics'].items():
+        yield f"【{zone_name}】\n"
+        yield f"  ├─ 县市数量: {zone_data['县市数量']}个\n"
+        yield f"  ├─ 占比百分比: {zone_data['占比百分比']}%\n"
+        yield f"  └─ 面积: {zone_data['面积平方公里']}平方公里\n\n"
+
+    # 区域详情（逐行写出）
+    details = data.get('county_details')
+    if details is not None and len(details):
+        yield "三、县市详情数据\n"
+        yield "-" * 30 + "\n"
+        yield f"{'县市名称':<12} {'适宜性评分':<10} {'适宜性等级':<10} {'预估面积(km²)':<15}\n"
+        yield "-" * 60 + "\n"
+        for county in details:
+            yield (f"{county['县市名称']:<12} {county['适宜性评分']:<10} "
+                   f"{county['适宜性等级']:<10} {county['预估面积平方公里']:<15}\n")
+        yield "\n"
+
+    # 联网数据
+    online = data.get('online_data')
+    if online:
+        yield "四、联网实时数据\n"
+        yield "-" * 30 + "\n"
+        for number, section in enumerate(['市场行情', '天气预报', '产业分析'], 1):
+            if section in online:
+                yield from _iter_items(f"4.{number} {section}", online[section])
+        if isinstance(online.get('政策动态'), list):
+            yield from _iter_numbered("4.4 政策动态", online['政策动态'])
+        if isinstance(online.get('技术趋势'), list):
+            yield from _iter_numbered("4.5 技术趋势", online['技术趋势'])
+
+    # 报告结尾
+    yield "=" * 60 + "\n"
+    yield f"报告生成时间: {datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}\n"
+    yield "数据来源: 湖南省农业种植适宜性区划分析系统\n"
+    yield "=" * 60 + "\n"
+
+
+def encode_chunks(pieces, encoding='utf-8', bom=False, chunk_size=CHUNK_SIZE):
+    """
+    将逐行产生的文本片段编码并合并为约 chunk_size 字节的块
+    生成过程中出错时记录日志并在输出末尾写入错误说明（响应头已发出，无法再改状态码）
+    """
+    buffer = []
+    size = 0
+    if bom:
+        buffer.append('\ufeff'.encode(encoding))
+    try:
+        for piece in pieces:
+            encoded = piece.encode(encoding)
+            buffer.append(encoded)
+            size += len(encoded)
+            if size >= chunk_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+    except Exception as e:
+        logger.error(f"❌ 流式导出中断: {e}")
+        buffer.append(f"\n导出中断: {str(e)}\n".encode(encoding))
+    if buffer:
+        yield b''.join(buffer)
+
+
+def iter_csv(details, chunk_rows=DETAIL_CHUNK_ROWS):
+    """区域明细CSV：每块由 DataFrame.to_csv 整块写出"""
+    yield ','.join(DETAIL_COLUMNS) + '\n'
+    for frame in details.frames(chunk_rows):
+        yield frame.to_csv(header=False, index=False, lineterminator='\n')
+
+
+def iter_json(data, chunk_rows=DETAIL_CHUNK_ROWS):
+    """完整报告JSON：报告信息一次写出，区域明细数组逐块写出"""
+    meta = {key: value for key, value in data.items() if key != 'county_details'}
+    head = json.dumps(meta, ensure_ascii=False, default=str)
+    yield head[:-1] + (', ' if meta else '') + '"county_details": ['
+    first = True
+    for frame in data['county_details'].frames(chunk_rows):
+        records = frame.to_json(orient='records', force_ascii=False)[1:-1]
+        if records:
+            yield records if first else ',' + records
+            first = False
+    yield ']}'
+
+
+# ---------------- Excel (xlsx) ----------------
+
+XLSX_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+XLSX_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+XLSX_PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+XLSX_SHEET_HEAD = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                   f'<worksheet xmlns="{XLSX_NS}"><sheetData>')
+XLSX_SHEET_TAIL = '</sheetData></worksheet>'
+XLSX_STYLES = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<styleSheet xmlns="{XLSX_NS}">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class _ChunkSink:
+    """
+    只写缓冲区：ZipFile 写入的压缩字节由生成器随时取走
+    不提供 seek/tell，ZipFile 会按不可回退的流写入（使用数据描述符）
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _cell(value):
+    """单个单元格XML（字符串使用内联字符串，不需要共享字符串表）"""
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _rows_xml(rows, start_row=1):
+    """若干行（值列表）的XML"""
+    return ''.join(
+        f'<row r="{r}">' + ''.join(_cell(v) for v in row) + '</row>'
+        for r, row in enumerate(rows, start_row)
+    )
+
+
+def _frame_rows_xml(frame, start_row):
+    """DataFrame 数据块的行XML：逐列整列生成单元格，再按行拼接"""
+    columns = []
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if np.issubdtype(values.dtype, np.number):
+            columns.append(['<c><v>' + v + '</v></c>' for v in values.astype(str)])
+        else:
+            columns.append(['<c t="inlineStr"><is><t>' + escape(str(v)) + '</t></is></c>' for v in values])
+    return ''.join(
+        f'<row r="{r}">' + ''.join(cells) + '</row>'
+        for r, cells in enumerate(zip(*columns), start_row)
+    )
+
+
+def _summary_sheets(data):
+    """报告信息工作表：(名称, 行列表)"""
+    sheets = [('基础信息', [['项目', '内容']] + [[k, v] for k, v in data.get('basic_info', {}).items()])]
+
+    statistics = data.get('zoning_statistics', {})
+    if statistics:
+        sheets.append(('区划统计', [['适宜性分区', '县市数量', '占比百分比', '面积平方公里']] + [
+            [zone, s['县市数量'], s['占比百分比'], s['面积平方公里']] for zone, s in statistics.items()
+        ]))
+
+    online = data.get('online_data')
+    if online:
+        rows = [['类别', '项目', '内容']]
+        for section, content in online.items():
+            if isinstance(content, dict):
+                rows.extend([section, k, v] for k, v in content.items())
+            elif isinstance(content, list):
+                rows.extend([section, i, v] for i, v in enumerate(content, 1))
+        sheets.append(('联网数据', rows))
+    return sheets
+
+
+def _workbook_parts(sheet_names):
+    """工作簿结构文件"""
+    count = len(sheet_names)
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+            f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for i in range(1, count + 1))
+        + '</Types>'
+    )
+    root_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{XLSX_PKG_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{XLSX_REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    workbook = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<workbook xmlns="{XLSX_NS}" xmlns:r="{XLSX_REL_NS}"><sheets>'
+        + ''.join(f'<sheet name="{escape(name)}" sheetId="{i}" r:id="rId{i}"/>'
+                  for i, name in enumerate(sheet_names, 1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<Relationships xmlns="{XLSX_PKG_REL_NS}">'
+        + ''.join(f'<Relationship Id="rId{i}" Type="{XLSX_REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                  for i in range(1, count + 1))
+        + f'<Relationship Id="rId{count + 1}" Type="{XLSX_REL_NS}/styles" Target="styles.xml"/>'
+        + '</Relationships>'
+    )
+    return {
+        '[Content_Types].xml': content_types,
+        '_rels/.rels': root_rels,
+        'xl/workbook.xml': workbook,
+        'xl/_rels/workbook.xml.rels': workbook_rels,
+        'xl/styles.xml': XLSX_STYLES
+    }
+
+
+def iter_xlsx(data, chunk_rows=DETAIL_CHUNK_ROWS):
+    """
+    常量内存的xlsx写出：报告信息各占一个工作表，区域明细工作表逐块压缩写出，
+    压缩后的字节随写随发
+    """
+    sink = _ChunkSink()
+    sheets = _summary_sheets(data)
+    sheet_names = [name for name, _ in sheets] + ['区域明细']
+
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _workbook_parts(sheet_names).items():
+            archive.writestr(name, content)
+        for i, (_, rows) in enumerate(sheets, 1):
+            archive.writestr(f'xl/worksheets/sheet{i}.xml', XLSX_SHEET_HEAD + _rows_xml(rows) + XLSX_SHEET_TAIL)
+        yield sink.drain()
+
+        with archive.open(f'xl/worksheets/sheet{len(sheet_names)}.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((XLSX_SHEET_HEAD + _rows_xml([list(DETAIL_COLUMNS)])).encode('utf-8'))
+            row = 2
+            for frame in data['county_details'].frames(chunk_rows):
+                sheet.write(_frame_rows_xml(frame, row).encode('utf-8'))
+                row += len(frame)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            sheet.write(XLSX_SHEET_TAIL.encode('utf-8'))
+
+    yield sink.drain()
+
+
+# ---------------- Parquet ----------------
+
+# Parquet 写出时内存中保留的最大字节数，超过后转存到临时文件
+PARQUET_SPOOL_SIZE = 32 * 1024 * 1024
+
+
+def iter_parquet(data, chunk_rows=DETAIL_CHUNK_ROWS):
+    """
+    区域明细Parquet（每个数据块一个行组，报告信息写入文件元数据）
+    Parquet 尾部索引需在全部行组写完后生成，因此先写入临时文件再分块发送
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError('Parquet导出需要安装 pyarrow')
+
+    meta = {key: value for key, value in data.items() if key != 'county_details'}
+    report_meta = json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8')
+
+    with tempfile.SpooledTemporaryFile(max_size=PARQUET_SPOOL_SIZE) as buffer:
+        writer = None
+        for frame in data['county_details'].frames(chunk_rows):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                schema = table.schema.with_metadata({**(table.schema.metadata or {}), b'report': report_meta})
+                writer = pq.ParquetWriter(buffer, schema, compression='snappy')
+            writer.write_table(table.cast(schema))
+        if writer is None:
+            empty = pa.Table.from_pandas(pd.DataFrame(columns=list(DETAIL_COLUMNS)), preserve_index=False)
+            writer = pq.ParquetWriter(buffer, empty.schema.with_metadata({b'report': report_meta}))
+        writer.close()
+
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# 导出格式 → (扩展名, Content-Type)
+EXPORT_FORMATS = {
+    'txt': ('txt', 'text/plain; charset=utf-8'),
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+    'json': ('json', 'application/json; charset=utf-8'),
+    'excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'parquet': ('parquet', 'application/octet-stream')
+}
+
+
+def stream_export(data, export_format, chunk_rows=DETAIL_CHUNK_ROWS):
+    """按导出格式返回字节块生成器"""
+    if export_format == 'txt':
+        return encode_chunks(iter_text_report(data), bom=True)
+    if export_format == 'csv':
+        # 带BOM，Excel 直接打开时中文不乱码
+        return encode_chunks(iter_csv(data['county_details'], chunk_rows), bom=True)
+    if export_format == 'json':
+        return encode_chunks(iter_json(data, chunk_rows))
+    if export_format == 'excel':
+        return iter_xlsx(data, chunk_rows)
+    if export_format == 'parquet':
+        # 在开始传输前检查依赖，缺少时仍可返回错误响应
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError('Parquet导出需要安装 pyarrow')
+        return iter_parquet(data, chunk_rows)
+    raise ValueError(f"不支持的导出格式: {export_format}")
+
+
+def export_filename(crop_name, extension):
+    """导出文件名：<作物代码>_suitability_report_<时间戳>.<扩展名>"""
+    crop_en = CROP_CODES.get(crop_name, 'crop')
+    return f"{crop_en}_suitability_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
@@ -0,0 +1,525 @@
+# -*- coding: utf-8 -*-
+"""
+Spark MySQL连接器
+基于Spark的MySQL数据读取和处理模块（经数据源提供的 JDBC 参数读取，也可读取 SQLite 数据库文件），
+与 RealDataConnector 实现同一分析引擎接口，
+适合大数据量时在本地 Spark 上利用全部CPU核心执行分析
+"""
+
+import os
+import sys
+import math
+import logging
+
+import pandas as pd
+
+try:
+    from pyspark import StorageLevel
+    from pyspark.sql.functions import broadcast, col
+    from pyspark.sql.types import StructType, StructField, StringType
+except ImportError:
+    pass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis_engine import AnalysisEngine, AGRICULTURAL_TABLES, SUITABILITY_TABLE
+from utils.data_source import MySQLDataSource
+from utils.database_connector import MONTH_COLUMNS, FACTOR_COLUMNS, annotate_suitability, temperature_trend_analysis
+from utils.precipitation import precipitation_analysis
+from utils.crop_climate import crop_thermal_analysis
+from utils.analysis_sql import (SOIL_TYPE_DISTRIBUTION_SQL, PH_DISTRIBUTION_SQL, COUNTY_SOIL_QUALITY_SQL,
+                                CROP_PH_COMPATIBILITY_SQL, COUNTY_PH_COMPATIBILITY_SQL, CROP_SUITABILITY_STATS_SQL)
+from utils.spark_session import session_manager, DEFAULT_SESSION_CONFIG, SPARK_AVAILABLE
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 附加限制因子后的适宜性视图
+SUITABILITY_FACTORS_VIEW = 'suitability_factors'
+
+DEFAULT_SPARK_CONFIG = {
+    **DEFAULT_SESSION_CONFIG,
+    'fetchsize': 10000,          # JDBC每次往返获取的行数
+    'partition_column': 'id',    # 默认分区列（数值型主键）
+    'partition_columns': {},     # 按表覆盖分区列，None 表示不分区
+    'num_partitions': None,      # 最大并行读取数，None 时使用 Spark 默认并行度
+    'partition_rows': 50000,     # 每个分区的目标行数（按键范围估算），小表只用一个分区
+    'storage_level': 'MEMORY_AND_DISK',        # 读取后的表缓存级别，内存不足时溢写磁盘
+    'broadcast_tables': ['crop_requirements'],  # 小维表，关联时广播到各执行器
+    'collect_max_rows': 200000  # 单个结果转换为 pandas 的最大行数，超过时截断
+}
+
+
+class SparkMySQLConnector(AnalysisEngine):
+    """基于 Spark 的分析引擎"""
+
+    name = 'spark'
+
+    def __init__(self, mysql_config=None, spark_config=None, data_source=None):
+        """初始化Spark MySQL连接器（连接时从进程级会话管理器获取Spark会话；data_source 为空时读取 MySQL）"""
+        if not SPARK_AVAILABLE:
+            raise ImportError("未安装 pyspark，无法使用 Spark 分析引擎")
+
+        self.source = data_source or MySQLDataSource(mysql_config)
+        self.spark_config = {**DEFAULT_SPARK_CONFIG, **(spark_config or {})}
+        self.spark = None
+        self.tables = {}
+        self._row_counts = {}
+        self._results = {}
+
+        logger.info("✅ Spark MySQL连接器初始化成功")
+
+    def _jdbc_reader(self, dbtable):
+        reader = self.spark.read.format("jdbc").option("dbtable", dbtable)
+        for key, value in self.source.jdbc_options().items():
+            reader = reader.option(key, value)
+        return reader \
+            .option("fetchsize", str(self.spark_config['fetchsize']))
+
+    def _partition_options(self, table_name, conditions=None):
+        """
+        按数值键的 MIN/MAX 生成分区读取参数（partitionColumn/lowerBound/upperBound/numPartitions）
+        分区数按键范围与 partition_rows 估算，不超过 num_partitions；无法分区时返回空字典
+        """
+        settings = self.spark_config
+        column = settings['partition_columns'].get(table_name, settings['partition_column'])
+        if not column:
+            return {}
+
+        where = f" WHERE {conditions}" if conditions else ""
+        try:
+            bounds = self._jdbc_reader(
+                f"(SELECT MIN({column}) AS lo, MAX({column}) AS hi FROM {table_name}{where}) AS bounds"
+            ).load().first()
+        except Exception as e:
+            logger.warning(f"⚠️ 表 {table_name} 无法按 {column} 分区读取，使用单连接: {e}")
+            return {}
+
+        if bounds is None or bounds['lo'] is None:
+            return {}
+
+        lower, upper = int(bounds['lo']), int(bounds['hi'])
+        max_partitions = settings['num_partitions'] or self.spark.sparkContext.defaultParallelism
+        partitions = min(max_partitions, math.ceil((upper - lower + 1) / settings['partition_rows']))
+        if partitions <= 1:
+            return {}
+
+        return {
+            'partitionColumn': column,
+            'lowerBound': str(lower),
+            'upperBound': str(upper + 1),
+            'numPartitions': str(partitions)
+        }
+
+    def connect(self):
+        """获取共享Spark会话（启动中时等待就绪）并测试数据源连接"""
+        try:
+            if self.spark is None:
+                self.spark = session_manager.get(self.spark_config)
+            self._jdbc_reader("(SELECT 1 AS ok) AS ping").load().collect()
+            logger.info(f"✅ {self.source.describe()} 连接成功（JDBC）")
+            return True
+        except Exception as e:
+            logger.error(f"❌ {self.source.describe()} 连接失败: {e}")
+            return False
+
+    def read_mysql_table(self, table_name, conditions=None, required=True):
+        """从数据源读取表数据到Spark DataFrame"""
+        try:
+            if self.spark is None and not self.connect():
+                return None
+
+            # 构建查询
+            if conditions:
+                query = f"(SELECT * FROM {table_name} WHERE {conditions}) AS subquery"
+            else:
+                query = table_name
+
+            # 按键范围并行读取；行数在需要时才统计（count_rows），不为日志额外扫描全表
+            partition_options = self._partition_options(table_name, conditions)
+            reader = self._jdbc_reader(query)
+            for key, value in partition_options.items():
+                reader = reader.option(key, value)
+            df = reader.load()
+
+            if partition_options:
+                logger.info(f"✅ 成功读取表 {table_name}: 按 {partition_options['partitionColumn']} "
+                            f"分{partition_options['numPartitions']}个分区并行读取")
+            else:
+                logger.info(f"✅ 成功读取表 {table_name}: 单分区读取")
+            return df
+
+        except Exception as e:
+            if required:
+                logger.error(f"❌ 读取数据表失败: {e}")
+            else:
+                logger.warning(f"⚠️ 可选表 {table_name} 读取失败，跳过")
+            return None
+
+    def read_all_agricultural_data(self):
+        """读取所有农业数据"""
+        try:
+            logger.info("🚀 开始读取所有农业数据...")
+
+            # 刷新时先释放上一次的缓存
+            self.release_tables()
+
+            data = {key: self.read_mysql_table(table) for key, table in AGRICULTURAL_TABLES.items()}
+            suitability_df = self.read_mysql_table(SUITABILITY_TABLE, required=False)
+
+            # 缓存各表并创建临时视图用于SQL查询
+            for table, df in zip([*AGRICULTURAL_TABLES.values(), SUITABILITY_TABLE],
+                                 [*data.values(), suitability_df]):
+                if df is not None:
+                    self._register_table(table, df)
+            data = {key: self.tables.get(table) for key, table in AGRICULTURAL_TABLES.items()}
+
+            logger.info("✅ 所有农业数据读取完成并创建临时视图")
+            return data
+
+        except Exception as e:
+            logger.error(f"❌ 读取农业数据失败: {e}")
+            return None
+
+    def _register_table(self, table_name, df):
+        """
+        按 storage_level 缓存（列式压缩）并立即物化，之后的所有分析只读取缓存，不再访问数据库；
+        broadcast_tables 中的小维表以广播提示注册视图
+        """
+        df = df.persist(getattr(StorageLevel, self.spark_config['storage_level']))
+        rows = self.count_rows(df)
+
+        view = broadcast(df) if table_name in self.spark_config['broadcast_tables'] else df
+        view.createOrReplaceTempView(table_name)
+        self.tables[table_name] = df
+        logger.info(f"📦 表 {table_name} 已缓存: {rows} 条记录")
+
+    def release_tables(self):
+        """释放已缓存的表与临时视图"""
+        for table_name, df in self.tables.items():
+            df.unpersist()
+            self.spark.catalog.dropTempView(table_name)
+        if self.tables:
+            logger.info(f"🧹 已释放 {len(self.tables)} 个缓存表")
+        self.tables = {}
+        self._row_counts = {}
+        self._results = {}
+
+    def collect_pandas(self, df, max_rows=None):
+        """
+        将结果按 Arrow 批次转换为 pandas DataFrame
+        最多取 max_rows + 1 行，超过 max_rows 时截断并记录警告，避免大结果撑爆驱动端内存
+        """
+        if isinstance(df, pd.DataFrame):
+            return df
+        max_rows = max_rows or self.spark_config['collect_max_rows']
+        result = df.limit(max_rows + 1).toPandas()
+        if len(result) > max_rows:
+            logger.warning(f"⚠️ 结果超过 {max_rows} 行，已截断")
+            result = result.iloc[:max_rows]
+        return result
+
+    def suitability_factors(self):
+        """
+        适宜性结果附加限制因子（pandas UDF 按 Arrow 批次列式计算，替代逐行的 LEAST/CASE 表达式），
+        结果缓存为 suitability_factors 视图，多项分析共用
+        """
+        if SUITABILITY_FACTORS_VIEW not in self.tables:
+            source = self.tables[SUITABILITY_TABLE]
+            for column in FACTOR_COLUMNS + ['comprehensive_suitability']:
+                source = source.withColumn(column, col(column).cast('double'))
+            schema = StructType(source.schema.fields + [StructField('limiting_factor', StringType())])
+
+            def annotate_batches(batches):
+                for batch in batches:
+                    yield annotate_suitability(batch)
+
+            self._register_table(SUITABILITY_FACTORS_VIEW, source.mapInPandas(annotate_batches, schema))
+        return self.tables[SUITABILITY_FACTORS_VIEW]
+
+    def count_rows(self, frame):
+        """数据表行数（首次调用时统计并记录）"""
+        key = id(frame)
+        if key not in self._row_counts:
+            self._row_counts[key] = frame.count()
+        return self._row_counts[key]
+
+    def analyze_temperature_trends(self):
+        """
+        分析温度趋势
+        温度表按年份记录、数据量很小，转换为 pandas 后与 RealDataConnector 共用同一套向量化计算
+        """
+        try:
+            if 'temperature_data' not in self.tables:
+                return None
+
+            if 'temperature_trends' not in self._results:
+                temp_df = self.collect_pandas(self.tables['temperature_data'])
+                self._results['temperature_trends'] = temperature_trend_analysis(temp_df)
+            return self._results['temperature_trends']
+
+        except Exception as e:
+            logger.error(f"❌ 温度趋势分析失败: {e}")
+            return None
+
+    def analyze_precipitation(self):
+        """
+        分析降水
+        干旱期游程统计需要完整的时间序列，降水表整表转换为 pandas（不截断）后向量化计算
+        """
+        try:
+            if 'climate_precipitation' not in self.tables:
+                return None
+
+            if 'precipitation' not in self._results:
+                precip_df = self.tables['climate_precipitation']
+                precip_df = self.collect_pandas(precip_df, max_rows=self.count_rows(precip_df))
+                self._results['precipitation'] = precipitation_analysis(precip_df)
+            return self._results['precipitation']
+
+        except Exception as e:
+            logger.error(f"❌ 降水分析失败: {e}")
+            return None
+
+    def analyze_soil_distribution(self):
+        """分析土壤分布"""
+        try:
+            logger.info("🌱 开始分析土壤分布...")
+
+            if 'soil_profiles' not in self.tables:
+                return None
+
+            # 土壤类型分布、pH值分布统计、县市土壤质量排名（与 DuckDB 引擎共用SQL）
+            soil_type_dist = self.spark.sql(SOIL_TYPE_DISTRIBUTION_SQL)
+            ph_distribution = self.spark.sql(PH_DISTRIBUTION_SQL)
+            county_soil_quality = self.spark.sql(COUNTY_SOIL_QUALITY_SQL)
+
+            logger.info("✅ 土壤分布分析完成")
+
+            return {
+                'soil_type_distribution': soil_type_dist,
+                'ph_distribution': ph_distribution,
+                'county_soil_quality': county_soil_quality
+            }
+
+        except Exception as e:
+            logger.error(f"❌ 土壤分布分析失败: {e}")
+            return None
+
+    def analyze_crop_requirements(self):
+        """分析作物需求"""
+        try:
+            logger.info("🌾 开始分析作物需求...")
+
+            if 'crop_requirements' not in self.tables:
+                return None
+
+            crop_df = self.tables['crop_requirements']
+
+            # 作物温度需求分析
+            temp_requirements = crop_df.select(
+                'category', 'crop_type', 'min_temperature_min', 'min_temperature_max',
+                'optimal_temperature_min', 'optimal_temperature_max',
+                'max_temperature_min', 'max_temperature_max'
+            ).dropna()
+
+            # 作物pH需求分析
+            ph_requirements = crop_df.select('category', 'crop_type', 'ph_min', 'ph_max').dropna()
+
+            # 作物分类统计
+            crop_categories = self.spark.sql("""
+                SELECT
+                    category,
+                    COUNT(id) as total_varieties,
+                    COUNT(DISTINCT crop_type) as unique_types
+                FROM crop_requirements
+                WHERE category IS NOT NULL
+                GROUP BY category
+                ORDER BY category
+            """)
+
+            result = {
+                'temperature_requirements': temp_requirements,
+                'ph_requirements': ph_requirements,
+                'crop_categories': crop_categories
+            }
+
+            # 各作物pH适宜土壤占比（土壤样本先按县市与pH计数，再与广播的作物需求表关联）
+            if 'soil_profiles' in self.tables:
+                result['ph_compatibility'] = self.spark.sql(CROP_PH_COMPATIBILITY_SQL)
+                result['county_ph_compatibility'] = self.spark.sql(COUNTY_PH_COMPATIBILITY_SQL)
+
+            logger.info("✅ 作物需求分析完成")
+
+            return result
+
+        except Exception as e:
+            logger.error(f"❌ 作物需求分析失败: {e}")
+            return None
+
+    def analyze_crop_climate(self):
+        """分析各作物的热量条件（温度表与作物需求表都是小表，转换为 pandas 后广播计算）"""
+        try:
+            if 'temperature_data' not in self.tables or 'crop_requirements' not in self.tables:
+                return None
+
+            if 'crop_climate' not in self._results:
+                self._results['crop_climate'] = crop_thermal_analysis(
+                    self.collect_pandas(self.tables['temperature_data']),
+                    self.collect_pandas(self.tables['crop_requirements']),
+                    MONTH_COLUMNS
+                )
+            return self._results['crop_climate']
+
+        except Exception as e:
+            logger.error(f"❌ 作物热量条件分析失败: {e}")
+            return None
+
+    def analyze_crop_suitability(self):
+        """分析作物适宜性（需要 suitability_results 表）"""
+        try:
+            logger.info("🌾 开始分析作物适宜性...")
+
+            if SUITABILITY_TABLE not in self.tables:
+                return None
+            self.suitability_factors()
+
+            # 作物适宜性统计
+            crop_suitability_stats = self.spark.sql(CROP_SUITABILITY_STATS_SQL)
+
+            # 最佳种植区域推荐
+            best_planting_areas = self.spark.sql("""
+                SELECT
+                    crop_name,
+                    county,
+                    COUNT(*) as suitable_points,
+                    ROUND(AVG(comprehensive_suitability), 4) as avg_suitability,
+                    ROUND(AVG(lat), 4) as center_lat,
+                    ROUND(AVG(lon), 4) as center_lon
+                FROM suitability_factors
+                WHERE suitability_level IN ('高度适宜', '中度适宜')
+                GROUP BY crop_name, county
+                HAVING COUNT(*) >= 5
+                ORDER BY crop_name, avg_suitability DESC
+            """)
+
+            # 区划优化建议
+            zoning_optimization = self.spark.sql("""
+                SELECT
+                    zone_id,
+                    crop_name,
+                    COUNT(*) as grid_count,
+                    ROUND(AVG(comprehensive_suitability), 4) as avg_suitability,
+                    ROUND(AVG(center_lat), 4) as zone_center_lat,
+                    ROUND(AVG(center_lon), 4) as zone_center_lon,
+                    COLLECT_SET(county) as counties
+                FROM suitability_factors
+                WHERE zone_id IS NOT NULL
+                GROUP BY zone_id, crop_name
+                HAVING COUNT(*) >= 10
+                ORDER BY zone_id, avg_suitability DESC
+            """)
+
+            # 限制因子分析
+            limiting_factors = self.spark.sql("""
+                SELECT
+                    crop_name,
+                    limiting_factor,
+                    COUNT(*) as affected_areas,
+                    ROUND(AVG(comprehensive_suitability), 4) as avg_suitability
+                FROM suitability_factors
+                WHERE suitability_level IN ('勉强适宜', '不适宜')
+                GROUP BY crop_name, limiting_factor
+                ORDER BY crop_name, affected_areas DESC
+            """)
+
+            logger.info("✅ 作物适宜性分析完成")
+
+            return {
+                'crop_suitability_stats': crop_suitability_stats,
+                'best_planting_areas': best_planting_areas,
+                'zoning_optimization': zoning_optimization,
+                'limiting_factors': limiting_factors
+            }
+
+        except Exception as e:
+            logger.error(f"❌ 作物适宜性分析失败: {e}")
+            return None
+
+    def generate_comprehensive_report(self):
+        """生成综合分析报告（结构与 RealDataConnector 一致，结果转换为 pandas DataFrame）"""
+        try:
+            logger.info("📋 开始生成综合分析报告...")
+
+            analyses = {
+                'temperature': self.analyze_temperature_trends(),
+                'precipitation': self.analyze_precipitation(),
+                'soil': self.analyze_soil_distribution(),
+                'crop': self.analyze_crop_requirements(),
+                'crop_climate': self.analyze_crop_climate(),
+                'suitability': self.analyze_crop_suitability()
+            }
+
+            report_data = {}
+            for section, results in analyses.items():
+                if results:
+                    report_data[section] = {name: self.collect_pandas(df) for name, df in results.items()}
+
+            logger.info("✅ 综合分析报告生成完成")
+            return report_data
+
+        except Exception as e:
+            logger.error(f"❌ 生成综合报告失败: {e}")
+            return None
+
+    def close(self):
+        """释放本连接器的缓存表（共享的Spark会话保持运行，供下一次初始化直接使用）"""
+        if self.spark:
+            self.release_tables()
+            self.spark = None
+            logger.info("🔒 Spark连接器已关闭")
+
+
+def main():
+    """测试主函数"""
+    print("🌱 沃土规划师 - Spark MySQL数据分析系统")
+    print("=" * 60)
+
+    # 创建连接器
+    connector = SparkMySQLConnector()
+
+    try:
+        # 读取数据
+        data = connector.read_all_agricultural_data()
+        if not data:
+            print("❌ 数据读取失败")
+            return
+
+        # 生成分析报告
+        report = connector.generate_comprehensive_report()
+        if report:
+            print("🎉 分析报告生成成功！")
+
+            # 显示部分结果
+            if 'temperature' in report:
+                print("\n🌡️ 月度温度模式:")
+                print(report['temperature']['monthly_pattern'])
+
+            if 'soil' in report:
+                print("\n🌱 土壤质量排名:")
+                print(report['soil']['county_soil_quality'].head())
+
+            if 'suitability' in report:
+                print("\n🌾 作物适宜性统计:")
+                print(report['suitability']['crop_suitability_stats'].head())
+
+    except Exception as e:
+        print(f"❌ 系统运行失败: {e}")
+
+    finally:
+        connector.close()
+
+
+if __name__ == '__main__':
+    main()
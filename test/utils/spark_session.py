@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+进程级 Spark 会话管理
+应用启动时在后台线程创建 SparkSession 并执行一次预热作业，之后所有连接器共用该会话；
+连接器关闭时只释放自己的缓存表，不停止会话，JVM 与会话启动开销不再计入请求耗时
+"""
+
+import time
+import atexit
+import threading
+import logging
+
+try:
+    from pyspark.sql import SparkSession
+    SPARK_AVAILABLE = True
+except ImportError:
+    SPARK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SESSION_CONFIG = {
+    'app_name': '沃土规划师农业分析系统',
+    'master': 'local[*]',
+    'memory': '4g',
+    'cores': 4,
+    'jdbc_package': 'com.mysql:mysql-connector-j:8.0.33'
+}
+
+
+def build_session(settings):
+    """按配置创建Spark会话"""
+    builder = SparkSession.builder \
+        .appName(settings['app_name']) \
+        .master(settings['master']) \
+        .config("spark.driver.memory", settings['memory']) \
+        .config("spark.sql.shuffle.partitions", str(settings['cores'] * 2)) \
+        .config("spark.sql.adaptive.enabled", "true") \
+        .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
+        .config("spark.serializer", "org.apache.spark.serializer.KryoSerializer") \
+        .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
+        .config("spark.sql.execution.arrow.pyspark.fallback.enabled", "true") \
+        .config("spark.sql.execution.arrow.maxRecordsPerBatch", "10000") \
+        .config("spark.sql.inMemoryColumnarStorage.compressed", "true") \
+        .config("spark.sql.inMemoryColumnarStorage.batchSize", "10000")
+    if settings.get('jdbc_package'):
+        builder = builder.config("spark.jars.packages", settings['jdbc_package'])
+
+    spark = builder.getOrCreate()
+    spark.sparkContext.setLogLevel("WARN")
+    return spark
+
+
+def warm_up(spark):
+    """预热作业：启动执行器、加载代码生成与 Arrow 转换路径"""
+    parallelism = spark.sparkContext.defaultParallelism
+    spark.range(0, 100000, numPartitions=parallelism).selectExpr("SUM(id) AS total").collect()
+    spark.range(10).toPandas()
+
+
+class SparkSessionManager:
+    """进程内共享的 SparkSession（后台启动、预热，按需等待就绪）"""
+
+    def __init__(self):
+        self.settings = None
+        self.startup_seconds = None
+        self._session = None
+        self._error = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self, spark_config=None):
+        """在后台线程启动会话（重复调用无副作用），未安装 pyspark 时返回 False"""
+        if not SPARK_AVAILABLE:
+            return False
+
+        with self._lock:
+            if self._thread is None:
+                self.settings = {**DEFAULT_SESSION_CONFIG, **(spark_config or {})}
+                self._ready.clear()
+                self._thread = threading.Thread(target=self._boot, name='spark-session', daemon=True)
+                self._thread.start()
+                logger.info("🚀 Spark会话开始后台启动...")
+        return True
+
+    def _boot(self):
+        start_time = time.time()
+        try:
+            spark = build_session(self.settings)
+            warm_up(spark)
+            self._session = spark
+            logger.info(f"✅ Spark会话已就绪并完成预热，耗时{time.time() - start_time:.2f}秒")
+        except Exception as e:
+            self._error = e
+            logger.error(f"❌ Spark会话启动失败: {e}")
+        finally:
+            self.startup_seconds = round(time.time() - start_time, 2)
+            self._ready.set()
+
+    def get(self, spark_config=None, timeout=None):
+        """
+        获取共享会话；尚未启动时立即启动，启动中时等待就绪
+        （会话配置以第一次启动时为准）
+        """
+        if not self.start(spark_config):
+            raise RuntimeError("未安装 pyspark，无法创建Spark会话")
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Spark会话在{timeout}秒内未就绪")
+        if self._session is None:
+            raise RuntimeError(f"Spark会话启动失败: {self._error}")
+        return self._session
+
+    def status(self):
+        """会话状态"""
+        if self._thread is None:
+            state = 'not_started'
+        elif not self._ready.is_set():
+            state = 'starting'
+        else:
+            state = 'ready' if self._session is not None else 'failed'
+        return {
+            'state': state,
+            'startup_seconds': self.startup_seconds,
+            'error': str(self._error) if self._error else None
+        }
+
+    def stop(self):
+        """停止会话（进程退出时调用）"""
+        with self._lock:
+            if self._session is not None:
+                self._session.stop()
+                logger.info("🔒 Spark会话已关闭")
+            self._session = None
+            self._error = None
+            self._thread = None
+            self._ready.clear()
+
+
+# 进程内唯一的会话管理器
+session_manager = SparkSessionManager()
+atexit.register(session_manager.stop)
@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+"""
+多级区划聚合金字塔
+村 → 乡镇 → 县 → 市 自底向上一次性分组聚合，各精度直接读取预计算层级
+"""
+
+import re
+import threading
+import zlib
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 省级区域名称（全省单一序列的实测评分以此为键）
+PROVINCE_NAME = '湖南省'
+
+# 区划层级（自底向上）
+REGION_LEVELS = ['village', 'township', 'county', 'city']
+
+# 支持的区划精度
+PRECISION_NAMES = {
+    'village': '村级',
+    'township': '乡镇级',
+    'county': '县级',
+    'city': '市级'
+}
+
+# 湖南省总面积（平方公里）
+TOTAL_AREA = 211800
+
+# 各地级市面积（平方公里），用于按比例分配村级面积
+CITY_AREAS = {
+    '长沙市': 11819, '株洲市': 11262, '湘潭市': 5006, '衡阳市': 15310,
+    '邵阳市': 20830, '岳阳市': 14858, '常德市': 18190, '张家界市': 9516,
+    '益阳市': 12320, '郴州市': 19387, '永州市': 22441, '怀化市': 27564,
+    '娄底市': 8117, '湘西州': 15462
+}
+
+# 地级市 → 县（市、区）
+HUNAN_COUNTIES = {
+    '长沙市': ['芙蓉区', '天心区', '岳麓区', '开福区', '雨花区', '望城区', '长沙县', '浏阳市', '宁乡市'],
+    '株洲市': ['荷塘区', '芦淞区', '石峰区', '天元区', '渌口区', '攸县', '茶陵县', '炎陵县', '醴陵市'],
+    '湘潭市': ['雨湖区', '岳塘区', '湘潭县', '湘乡市', '韶山市'],
+    '衡阳市': ['珠晖区', '雁峰区', '石鼓区', '蒸湘区', '南岳区', '衡阳县', '衡南县', '衡山县',
+            '衡东县', '祁东县', '耒阳市', '常宁市'],
+    '邵阳市': ['双清区', '大祥区', '北塔区', '新邵县', '邵阳县', '隆回县', '洞口县', '绥宁县',
+            '新宁县', '城步苗族自治县', '武冈市', '邵东市'],
+    '岳阳市': ['岳阳楼区', '云溪区', '君山区', '岳阳县', '华容县', '湘阴县', '平江县', '汨罗市', '临湘市'],
+    '常德市': ['武陵区', '鼎城区', '安乡县', '汉寿县', '澧县', '临澧县', '桃源县', '石门县', '津市市'],
+    '张家界市': ['永定区', '武陵源区', '慈利县', '桑植县'],
+    '益阳市': ['资阳区', '赫山区', '南县', '桃江县', '安化县', '沅江市'],
+    '郴州市': ['北湖区', '苏仙区', '桂阳县', '宜章县', '永兴县', '嘉禾县', '临武县', '汝城县',
+            '桂东县', '安仁县', '资兴市'],
+    '永州市': ['零陵区', '冷水滩区', '东安县', '双牌县', '道县', '江永县', '宁远县', '蓝山县',
+            '新田县', '江华瑶族自治县', '祁阳市'],
+    '怀化市': ['鹤城区', '中方县', '沅陵县', '辰溪县', '溆浦县', '会同县', '麻阳苗族自治县',
+            '新晃侗族自治县', '芷江侗族自治县', '靖州苗族侗族自治县', '通道侗族自治县', '洪江市'],
+    '娄底市': ['娄星区', '双峰县', '新化县', '冷水江市', '涟源市'],
+    '湘西州': ['吉首市', '泸溪县', '凤凰县', '花垣县', '保靖县', '古丈县', '永顺县', '龙山县']
+}
+
+# 各作物温度、水分、土壤因子权重
+CROP_WEIGHTS = {
+    'rice': {'temp': 0.3, 'water': 0.4, 'soil': 0.3},
+    'corn': {'temp': 0.25, 'water': 0.35, 'soil': 0.4},
+    'soybean': {'temp': 0.2, 'water': 0.3, 'soil': 0.5},
+    'wheat': {'temp': 0.35, 'water': 0.25, 'soil': 0.4},
+    'cotton': {'temp': 0.4, 'water': 0.3, 'soil': 0.3},
+    'rapeseed': {'temp': 0.3, 'water': 0.2, 'soil': 0.5},
+    'peanut': {'temp': 0.25, 'water': 0.25, 'soil': 0.5},
+    'sweet_potato': {'temp': 0.3, 'water': 0.3, 'soil': 0.4},
+    'tobacco': {'temp': 0.35, 'water': 0.25, 'soil': 0.4},
+    'tea': {'temp': 0.4, 'water': 0.35, 'soil': 0.25},
+    'citrus': {'temp': 0.45, 'water': 0.3, 'soil': 0.25},
+    'vegetables': {'temp': 0.2, 'water': 0.4, 'soil': 0.4}
+}
+
+# 作物代码 → 中文名称
+CROP_NAMES = {
+    'rice': '水稻', 'corn': '玉米', 'soybean': '大豆', 'wheat': '小麦',
+    'cotton': '棉花', 'rapeseed': '油菜', 'peanut': '花生', 'sweet_potato': '红薯',
+    'tobacco': '烟草', 'tea': '茶叶', 'citrus': '柑橘', 'vegetables': '蔬菜'
+}
+
+# 因子顺序（与评分层的列顺序一致）
+FACTOR_NAMES = ['temp', 'water', 'soil']
+
+# 适宜性等级：评分下限 → (分区键, 等级名称)，按评分从低到高排列
+ZONE_THRESHOLDS = [40, 60, 80]
+ZONE_KEYS = ['unsuitable', 'marginal', 'suitable', 'optimal']
+ZONE_LABELS = ['不适宜', '较适宜', '适宜', '最适宜']
+
+# 村级因子评分的基准值与各层级随机效应的标准差（市、县、乡镇、村）
+FACTOR_BASE = np.array([76.0, 72.0, 74.0])
+LEVEL_SPREAD = [12.0, 10.0, 6.0, 5.0]
+
+# 区域名称匹配时去除的行政区划后缀
+REGION_SUFFIXES = ('苗族侗族自治县', '苗族自治县', '瑶族自治县', '侗族自治县', '自治县', '市', '县', '区', '州')
+
+# 站点名称后缀（'长沙市1号站'、'浏阳气象站' → '长沙市'、'浏阳'）
+STATION_SUFFIX = re.compile(r'(\d+号)?(气象|观测|水文|雨量)?站$')
+
+
+def stable_seed(*parts):
+    """生成跨进程稳定的随机种子（内置hash受PYTHONHASHSEED影响）"""
+    return zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8'))
+
+
+def weight_vector(weights):
+    """将 {'temp', 'water', 'soil'} 权重字典转换为按FACTOR_NAMES排列的数组"""
+    return np.array([weights[name] for name in FACTOR_NAMES], dtype=float)
+
+
+def classify_scores(scores):
+    """按评分划分适宜性等级，返回等级下标（0=不适宜 … 3=最适宜）"""
+    return np.digitize(scores, ZONE_THRESHOLDS)
+
+
+def crop_code(crop_type):
+    """作物名称或代码 → 区划作物代码（'水稻'、'rice' → 'rice'），无法对应时返回 None"""
+    crop_type = str(crop_type)
+    if crop_type in CROP_NAMES:
+        return crop_type
+    for code, name in CROP_NAMES.items():
+        if crop_type == name or name in crop_type:
+            return code
+    return None
+
+
+def station_region_name(name):
+    """站点名称 → 所在区域名称（非站点名称原样返回）"""
+    return STATION_SUFFIX.sub('', str(name).strip()) or str(name).strip()
+
+
+def short_region_name(name):
+    """去除行政区划后缀（'长沙市'、'长沙县' → '长沙'）"""
+    name = str(name)
+    for suffix in REGION_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+class RegionHierarchy:
+    """湖南省行政区划层级（市 → 县 → 乡镇 → 村）"""
+
+    def __init__(self, seed=2025, townships_per_county=(8, 20), villages_per_township=(8, 16)):
+        rng = np.random.default_rng(seed)
+
+        city_names = list(HUNAN_COUNTIES.keys())
+        county_names = []
+        county_city = []
+        for city_idx, city in enumerate(city_names):
+            county_names.extend(HUNAN_COUNTIES[city])
+            county_city.extend([city_idx] * len(HUNAN_COUNTIES[city]))
+        county_city = np.array(county_city)
+
+        # 每个县的乡镇数、每个乡镇的村数
+        town_counts = rng.integers(townships_per_county[0], townships_per_county[1] + 1, size=len(county_names))
+        township_county = np.repeat(np.arange(len(county_names)), town_counts)
+        township_names = [
+            f"{county_names[c]}第{k + 1}乡镇"
+            for c, n in enumerate(town_counts) for k in range(n)
+        ]
+
+        village_counts = rng.integers(villages_per_township[0], villages_per_township[1] + 1, size=len(township_names))
+        village_township = np.repeat(np.arange(len(township_names)), village_counts)
+        village_names = [
+            f"{township_names[t]}第{k + 1}村"
+            for t, n in enumerate(village_counts) for k in range(n)
+        ]
+
+        self.names = {
+            'city': city_names,
+            'county': county_names,
+            'township': township_names,
+            'village': village_names
+        }
+        # 每一层到上一层的下标映射
+        self.parent_index = {
+            'village': village_township,
+            'township': township_county,
+            'county': county_city
+        }
+
+        # 村级归属的各上级下标
+        village_county = township_county[village_township]
+        village_city = county_city[village_county]
+        self.village_ancestors = {
+            'township': village_township,
+            'county': village_county,
+            'city': village_city
+        }
+
+        # 村级面积：在各市面积内按随机权重分配，合计为全省总面积
+        city_area = np.array([CITY_AREAS[c] for c in city_names], dtype=float)
+        city_area *= TOTAL_AREA / city_area.sum()
+        raw = rng.gamma(4.0, 1.0, size=len(village_names))
+        city_raw_total = np.bincount(village_city, weights=raw, minlength=len(city_names))
+        self.village_area = raw / city_raw_total[village_city] * city_area[village_city]
+
+        logger.info(
+            f"✅ 区划层级构建完成: {len(city_names)}市 / {len(county_names)}县 / "
+            f"{len(township_names)}乡镇 / {len(village_names)}村"
+        )
+
+    def size(self, level):
+        """某一层级的区域数量"""
+        return len(self.names[level])
+
+
+def match_region_scores(hierarchy, region_scores):
+    """
+    将按站点/县/市名称给出的评分对应到县、市两级区域
+    先按全称精确匹配（县级优先）；不带行政区划后缀的名称再按简称匹配，简称须在该层级唯一（市级优先，
+    '长沙' 对应长沙市），带后缀的名称只做精确匹配（'长沙县' 不会匹配到长沙市）。同一区域有多个评分时取平均
+    返回 ({层级: 各区域评分，未匹配为 NaN}, 匹配到的名称数)
+    """
+    levels = ['county', 'city']
+    exact = {level: {name: i for i, name in enumerate(hierarchy.names[level])} for level in levels}
+    short = {}
+    for level in levels:
+        index = {}
+        for i, name in enumerate(hierarchy.names[level]):
+            index.setdefault(short_region_name(name), []).append(i)
+        short[level] = {key: found[0] for key, found in index.items() if len(found) == 1}
+
+    sums = {level: np.zeros(hierarchy.size(level)) for level in levels}
+    counts = {level: np.zeros(hierarchy.size(level)) for level in levels}
+    matched_names = 0
+    for name, score in region_scores.items():
+        key = station_region_name(name)
+        target = next(((level, exact[level][key]) for level in levels if key in exact[level]), None)
+        if target is None and short_region_name(key) == key:
+            target = next(((level, short[level][key]) for level in reversed(levels) if key in short[level]), None)
+        if target is None:
+            continue
+        level, idx = target
+        sums[level][idx] += float(score)
+        counts[level][idx] += 1
+        matched_names += 1
+
+    with np.errstate(invalid='ignore'):
+        scores = {level: np.where(counts[level] > 0, sums[level] / counts[level], np.nan) for level in levels}
+    return scores, matched_names
+
+
+def observed_village_scores(hierarchy, region_scores):
+    """
+    将按站点/县/市名称给出的实测评分映射到村级（县级匹配优先于市级）
+    返回 (村级评分，未匹配为 NaN, 匹配到的名称数)
+    """
+    scores, matched_names = match_region_scores(hierarchy, region_scores)
+    ancestors = hierarchy.village_ancestors
+
+    values = np.full(hierarchy.size('village'), np.nan)
+    for level in ['city', 'county']:
+        matched = scores[level][ancestors[level]]
+        values = np.where(np.isnan(matched), values, matched)
+    return values, matched_names
+
+
+def observed_factor_layer(hierarchy, simulated, region_scores, factor):
+    """
+    用实测评分修正某因子的村级区域层（基准值 + 市、县两级效应）：
+    只有全省评分时整层平移，使面积加权平均等于全省评分，市县差异保留；
+    否则匹配到的区域以实测值代替，未匹配的区域保留模拟值；一个区域都未匹配时整层保留模拟值
+    """
+    province = [float(score) for name, score in region_scores.items()
+                if station_region_name(name) in (PROVINCE_NAME, short_region_name(PROVINCE_NAME))]
+    if province and len(province) == len(region_scores):
+        offset = np.mean(province) - np.average(simulated, weights=hierarchy.village_area)
+        logger.info(f"📍 因子 {factor} 只有全省实测评分，模拟区域层整体平移 {offset:+.1f}")
+        return simulated + offset
+
+    values, matched_names = observed_village_scores(hierarchy, region_scores)
+    if not matched_names:
+        logger.warning(f"⚠️ 因子 {factor} 的 {len(region_scores)} 个实测区域均未匹配到市县，保留模拟区域层")
+        return simulated
+
+    covered = np.count_nonzero(~np.isnan(values)) / len(values)
+    logger.info(f"📍 因子 {factor} 实测评分匹配 {matched_names}/{len(region_scores)} 个区域，覆盖 {covered:.1%} 的村")
+    return np.where(np.isnan(values), simulated, values)
+
+
+def build_village_factor_layers(hierarchy, crop_type, observed=None):
+    """
+    生成某作物村级温度/水分/土壤适宜度评分层，形状为 (村数, 3)
+    observed 为 {因子名: {区域名称: 评分}}，给出实测评分的因子在匹配到的市县以实测值代替基准值与市、县两级效应，
+    乡镇与村级差异保留
+    """
+    rng = np.random.default_rng(stable_seed('factor_layers', crop_type))
+    ancestors = hierarchy.village_ancestors
+    n_villages = hierarchy.size('village')
+
+    regional = np.tile(FACTOR_BASE, (n_villages, 1))
+    local = np.zeros_like(regional)
+    for level, spread in zip(['city', 'county', 'township'], LEVEL_SPREAD):
+        effects = rng.normal(0, spread, size=(hierarchy.size(level), len(FACTOR_NAMES)))
+        target = local if level == 'township' else regional
+        target += effects[ancestors[level]]
+    local += rng.normal(0, LEVEL_SPREAD[-1], size=local.shape)
+
+    for factor, region_scores in (observed or {}).items():
+        if region_scores:
+            k = FACTOR_NAMES.index(factor)
+            regional[:, k] = observed_factor_layer(hierarchy, regional[:, k], region_scores, factor)
+
+    return np.clip(regional + local, 0, 100)
+
+
+def aggregate_factor_layers(hierarchy, village_layers):
+    """
+    自底向上按面积加权聚合评分层
+    每一层只对下一层的 (面积, 面积×评分) 做一次分组求和
+    """
+    area = hierarchy.village_area
+    weighted = village_layers * area[:, None]
+
+    pyramid = {'village': (area, village_layers)}
+    child = 'village'
+    for level in REGION_LEVELS[1:]:
+        parent = hierarchy.parent_index[child]
+        n = hierarchy.size(level)
+        area = np.bincount(parent, weights=area, minlength=n)
+        weighted = np.column_stack([
+            np.bincount(parent, weights=weighted[:, k], minlength=n)
+            for k in range(weighted.shape[1])
+        ])
+        pyramid[level] = (area, weighted / area[:, None])
+        child = level
+
+    return pyramid
+
+
+class ZoningPyramid:
+    """按作物缓存的多级区划结果"""
+
+    def __init__(self, hierarchy=None):
+        self._hierarchy = hierarchy
+        self._levels = {}
+        self._layers = {}
+        self._observed = {}
+        self._lock = threading.Lock()
+
+    @property
+    def hierarchy(self):
+        """区划层级（首次使用时构建）"""
+        if self._hierarchy is None:
+            with self._lock:
+                if self._hierarchy is None:
+                    self._hierarchy = RegionHierarchy()
+        return self._hierarchy
+
+    def _parent_names(self, level):
+        """某一层级各区域的上级名称"""
+        if level == 'city':
+            return [PROVINCE_NAME] * self.hierarchy.size('city')
+        parent_level = REGION_LEVELS[REGION_LEVELS.index(level) + 1]
+        parent_names = np.array(self.hierarchy.names[parent_level], dtype=object)
+        return parent_names[self.hierarchy.parent_index[level]]
+
+    def set_observed_scores(self, factor, region_scores, crop_type=None):
+        """
+        设置某因子的实测评分 {区域名称: 评分}（crop_type 为 None 时对所有作物生效），
+        已缓存的区划结果随之失效
+        """
+        if factor not in FACTOR_NAMES:
+            raise ValueError(f"不支持的评分因子: {factor}")
+        with self._lock:
+            self._observed[(factor, crop_type)] = dict(region_scores or {})
+        self.clear()
+
+    def observed_scores(self, crop_type):
+        """某作物各因子的实测评分（作物专属评分优先）"""
+        observed = {}
+        for factor in FACTOR_NAMES:
+            scores = self._observed.get((factor, crop_type)) or self._observed.get((factor, None))
+            if scores:
+                observed[factor] = scores
+        return observed
+
+    def build(self, crop_type):
+        """构建某作物全部精度的区划结果"""
+        hierarchy = self.hierarchy
+        weights = weight_vector(CROP_WEIGHTS.get(crop_type, CROP_WEIGHTS['rice']))
+        village_layers = build_village_factor_layers(hierarchy, crop_type, self.observed_scores(crop_type))
+
+        levels = {}
+        for level, (area, layers) in aggregate_factor_layers(hierarchy, village_layers).items():
+            scores = layers @ weights
+            zone_idx = classify_scores(scores)
+            levels[level] = pd.DataFrame({
+                'name': hierarchy.names[level],
+                'parent': self._parent_names(level),
+                'area': area,
+                'temp_score': layers[:, 0],
+                'water_score': layers[:, 1],
+                'soil_score': layers[:, 2],
+                'score': scores,
+                'zone': np.array(ZONE_KEYS)[zone_idx],
+                'level': np.array(ZONE_LABELS)[zone_idx]
+            })
+
+        logger.info(f"✅ {crop_type} 区划金字塔构建完成")
+        return levels
+
+    def get_pyramid(self, crop_type):
+        """获取某作物的区划金字塔（按需构建并缓存）"""
+        levels = self._levels.get(crop_type)
+        if levels is None:
+            levels = self.build(crop_type)
+            with self._lock:
+                levels = self._levels.setdefault(crop_type, levels)
+        return levels
+
+    def get_level(self, crop_type, precision):
+        """获取某作物指定精度的预计算区划结果"""
+        if precision not in PRECISION_NAMES:
+            raise ValueError(f"不支持的区划精度: {precision}")
+        return self.get_pyramid(crop_type)[precision]
+
+    def get_layers(self, crop_type, precision):
+        """
+        获取某作物指定精度的温度/水分/土壤评分层（与权重无关，首次使用时缓存）
+        返回 (面积, 形状为 (区域数, 3) 的连续评分层数组)
+        """
+        key = (crop_type, precision)
+        cached = self._layers.get(key)
+        if cached is None:
+            level_df = self.get_level(crop_type, precision)
+            cached = (
+                np.ascontiguousarray(level_df['area'].to_numpy(dtype=float)),
+                np.ascontiguousarray(level_df[['temp_score', 'water_score', 'soil_score']].to_numpy(dtype=float))
+            )
+            with self._lock:
+                cached = self._layers.setdefault(key, cached)
+        return cached
+
+    def reweight(self, crop_type, precision, weights):
+        """
+        按新权重重新组合缓存的评分层，不重新构建区划
+        返回 (面积, 综合评分, 等级下标)
+        """
+        area, layers = self.get_layers(crop_type, precision)
+        scores = layers @ weight_vector(weights)
+        return area, scores, classify_scores(scores)
+
+    def score_matrix(self, crop_types, precision, weights=None):
+        """
+        某一精度下各区域对多种作物的适宜性评分矩阵
+        weights 为 {作物: 权重字典}，未指定的作物使用配置权重
+        返回 (区域名称, 上级名称, 面积, 形状为 (区域数, 作物数) 的评分矩阵)
+        """
+        weights = weights or {}
+        columns = []
+        for crop in crop_types:
+            crop_weights = weights.get(crop, CROP_WEIGHTS.get(crop, CROP_WEIGHTS['rice']))
+            _, layers = self.get_layers(crop, precision)
+            columns.append(layers @ weight_vector(crop_weights))
+
+        level_df = self.get_level(crop_types[0], precision)
+        return (level_df['name'].tolist(), level_df['parent'].tolist(),
+                level_df['area'].to_numpy(), np.column_stack(columns))
+
+    def clear(self):
+        """清空已缓存的区划结果"""
+        with self._lock:
+            self._levels.clear()
+            self._layers.clear()
+
+
+def summarize_level(level_df):
+    """统计某一层级各适宜性等级的区域数量、占比与面积"""
+    total = len(level_df)
+    grouped = level_df.groupby('zone')['area'].agg(['count', 'sum'])
+    statistics = {}
+    for zone in reversed(ZONE_KEYS):
+        count = int(grouped['count'].get(zone, 0))
+        statistics[zone] = {
+            'count': count,
+            'percentage': round(count / total * 100, 1) if total else 0,
+            'area': round(float(grouped['sum'].get(zone, 0)), 0)
+        }
+    return statistics
+
+
+def summarize_zones(zone_idx, area):
+    """按等级下标统计各等级的区域数量、占比与面积（与 summarize_level 输出一致）"""
+    total = len(zone_idx)
+    counts = np.bincount(zone_idx, minlength=len(ZONE_KEYS))
+    areas = np.bincount(zone_idx, weights=area, minlength=len(ZONE_KEYS))
+    statistics = {}
+    for i in reversed(range(len(ZONE_KEYS))):
+        statistics[ZONE_KEYS[i]] = {
+            'count': int(counts[i]),
+            'percentage': round(counts[i] / total * 100, 1) if total else 0,
+            'area': round(float(areas[i]), 0)
+        }
+    return statistics
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+区划权重敏感性分析（蒙特卡洛）
+在配置权重附近按Dirichlet分布抽样权重向量，每批次用一次矩阵乘法对全部区域重新评分，
+统计各区域落入各适宜性等级的概率
+"""
+
+import os
+import time
+import threading
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.zoning_pyramid import ZONE_THRESHOLDS, ZONE_KEYS, ZONE_LABELS, classify_scores, stable_seed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLES = 5000
+DEFAULT_CONCENTRATION = 50.0
+MAX_SAMPLES = 100000
+
+# 单批次评分矩阵 (区域数 × 批大小) 的元素上限，约40MB
+MAX_BATCH_ELEMENTS = 5000000
+
+# 区域数 × 样本数超过该值时才使用进程池
+PARALLEL_THRESHOLD = 20000000
+
+# 进程池大小
+POOL_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """进程池（首次使用时创建）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS)
+    return _pool
+
+
+def sample_weights(base_weights, n_samples, concentration=DEFAULT_CONCENTRATION, seed=0):
+    """以配置权重为均值的Dirichlet抽样，concentration越大越集中"""
+    rng = np.random.default_rng(seed)
+    alpha = np.asarray(base_weights, dtype=float) * concentration
+    return rng.dirichlet(alpha, size=n_samples)
+
+
+def accumulate_level_counts(layers, weight_samples):
+    """
+    统计一组权重样本下各区域的等级次数与评分一、二阶矩
+    返回 (等级次数 (区域数, 等级数), 评分和, 评分平方和)
+    """
+    n_regions = layers.shape[0]
+    batch = max(1, MAX_BATCH_ELEMENTS // max(n_regions, 1))
+    counts = np.zeros((n_regions, len(ZONE_KEYS)), dtype=np.int64)
+    score_sum = np.zeros(n_regions)
+    score_sq = np.zeros(n_regions)
+
+    for start in range(0, len(weight_samples), batch):
+        scores = layers @ weight_samples[start:start + batch].T   # (区域数, 批大小)
+        # 评分不低于各阈值的次数，相邻相减即为各等级次数
+        at_least = np.stack([np.count_nonzero(scores >= t, axis=1) for t in ZONE_THRESHOLDS], axis=1)
+        total = scores.shape[1]
+        bounds = np.column_stack([np.full(n_regions, total), at_least, np.zeros(n_regions, dtype=np.int64)])
+        counts += bounds[:, :-1] - bounds[:, 1:]
+        score_sum += scores.sum(axis=1)
+        score_sq += np.einsum('ij,ij->i', scores, scores)
+
+    return counts, score_sum, score_sq
+
+
+def run_sensitivity(layers, base_weights, n_samples=DEFAULT_SAMPLES, concentration=DEFAULT_CONCENTRATION,
+                    seed=0, workers=None):
+    """
+    运行蒙特卡洛权重敏感性分析
+
+    参数:
+        layers: (区域数, 3) 温度/水分/土壤评分层
+        base_weights: 配置权重向量
+        workers: 进程数；None 时按计算量自动决定，1 表示只在当前进程计算，
+                 0 表示使用整个进程池，其余取值不超过进程池大小
+    返回:
+        dict，包括各等级概率、基准等级稳定概率与评分均值/标准差
+    """
+    start_time = time.time()
+    layers = np.asarray(layers, dtype=float)
+    n_samples = int(min(max(n_samples, 1), MAX_SAMPLES))
+    samples = sample_weights(base_weights, n_samples, concentration, seed)
+
+    if workers is None:
+        workers = 0 if layers.shape[0] * n_samples >= PARALLEL_THRESHOLD else 1
+    if workers < 0:
+        raise ValueError(f"进程数不能为负数: {workers}")
+
+    if workers == 1:
+        counts, score_sum, score_sq = accumulate_level_counts(layers, samples)
+    else:
+        pool = _get_pool()
+        n_chunks = min(workers, POOL_WORKERS) if workers else POOL_WORKERS
+        chunks = np.array_split(samples, n_chunks)
+        counts = 0
+        score_sum = 0
+        score_sq = 0
+        for c, s, sq in pool.map(accumulate_level_counts, [layers] * len(chunks), chunks):
+            counts = counts + c
+            score_sum = score_sum + s
+            score_sq = score_sq + sq
+
+    probabilities = counts / n_samples
+    baseline = classify_scores(layers @ np.asarray(base_weights, dtype=float))
+    stability = probabilities[np.arange(len(baseline)), baseline]
+    mean = score_sum / n_samples
+    std = np.sqrt(np.maximum(score_sq / n_samples - np.square(mean), 0))
+
+    elapsed = time.time() - start_time
+    logger.info(f"✅ 权重敏感性分析完成: {layers.shape[0]}个区域 × {n_samples}组权重, 耗时{elapsed:.3f}秒")
+
+    return {
+        'probabilities': probabilities,
+        'baseline': baseline,
+        'stability': stability,
+        'most_likely': probabilities.argmax(axis=1),
+        'score_mean': mean,
+        'score_std': std,
+        'samples': n_samples,
+        'elapsed': elapsed
+    }
+
+
+def sensitivity_records(names, parents, result):
+    """将敏感性分析结果整理为逐区域记录"""
+    records = []
+    for i, name in enumerate(names):
+        records.append({
+            'name': name,
+            'parent': parents[i],
+            'baseline_level': ZONE_LABELS[result['baseline'][i]],
+            'most_likely_level': ZONE_LABELS[result['most_likely'][i]],
+            'stability': round(float(result['stability'][i]), 4),
+            'probabilities': {
+                zone: round(float(p), 4)
+                for zone, p in zip(ZONE_KEYS, result['probabilities'][i])
+            },
+            'score_mean': round(float(result['score_mean'][i]), 2),
+            'score_std': round(float(result['score_std'][i]), 2)
+        })
+    return records
+
+
+def default_seed(crop_type, precision):
+    """同一作物、精度默认使用固定随机种子，保证结果可复现"""
+    return stable_seed('sensitivity', crop_type, precision)